@@ -0,0 +1,346 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import ujson
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from tools.decode import decode_page
+from tools.ledger_store import write_ledger
+from tools.moving_window import DEFAULT_LIMITS, ENDPOINT_LIMITS, plan_windows
+from tools.parse_transactions import parse_json, transform_keys
+from tools.process_csv import CHUNK_ROWS, add_usd_prices, all_coins_avg
+from tools.send_request import get_endpoint
+from tools.synthetic import (
+    generate_converts,
+    generate_deposits,
+    generate_fiat_payments,
+    generate_ledger,
+    generate_trades,
+    generate_withdrawals,
+    prices_at,
+)
+
+SIZES = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+DEFAULT_SIZES = ["1k", "100k"]
+TRANSACTION_TYPES = ["convert", "deposit", "withdraw", "fiat", "trade"]
+ASSETS = ["BTC", "ETH", "BNB", "SOL", "ADA"]
+START, END = 1_672_531_200_000, 1_735_689_600_000
+# Rows of an API response page, and distinct pages cycled through, so that
+# payload benchmarks stay within memory at any size
+PAGE_ROWS = 1_000
+DISTINCT_PAGES = 16
+PAYLOAD_CASES = ["parse_json", "transform_keys", "decode_page"]
+LEDGER_CASES = [
+    "write_csv",
+    "write_parquet",
+    "add_usd_prices",
+    "all_coins_avg",
+    "all_coins_avg_streamed",
+]
+
+
+class StubPriceStore:
+    """
+    In-process stand-in for the price store, serving the synthetic prices
+    without any request or database.
+    """
+
+    def load_prices(
+        self, symbol: str, timestamps: Iterable[int], interval: str = "1s"
+    ) -> pd.DataFrame:
+        open_time = np.unique(np.asarray(timestamps, dtype="int64"))
+        return pd.DataFrame(
+            {"open_time": open_time, "price": prices_at(symbol, open_time)}
+        )
+
+
+def generate_page(seed: int, transaction_type: str, rows: int) -> Any:
+    """
+    Generate one response page of a transaction type, shaped as the API does.
+
+    Args:
+        seed (int): The seed of the page.
+        transaction_type (str): The type of transaction.
+        rows (int): The number of transactions of the page.
+
+    Returns:
+        Any: The decoded response.
+    """
+    rng = random.Random(seed)
+    if transaction_type == "convert":
+        return {"list": generate_converts(rng, rows, ASSETS, START, END)}
+    if transaction_type == "deposit":
+        return generate_deposits(rng, rows, ASSETS, START, END)
+    if transaction_type == "withdraw":
+        return generate_withdrawals(rng, rows, ASSETS, START, END)
+    if transaction_type == "fiat":
+        return {"data": generate_fiat_payments(rng, rows, ASSETS, START, END)}
+    return generate_trades(rng, rows, "BTCUSDT", START, END)
+
+
+def measure(func: Callable[[], Any], memory: bool) -> Dict[str, Any]:
+    """
+    Time a benchmark case, then run it again under tracemalloc for its peak.
+
+    Tracing slows Python allocations down, so the time comes from an untraced
+    run. The peak only covers the Python heap, not Arrow buffers.
+
+    Args:
+        func (Callable[[], Any]): The case.
+        memory (bool): Whether to measure the peak memory.
+
+    Returns:
+        Dict[str, Any]: The wall time and peak traced memory of the case.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    wall_time = time.perf_counter() - start
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "wall_time": round(wall_time, 6),
+        "peak_memory_mb": round(peak / 2**20, 3) if peak is not None else None,
+    }
+
+
+def payload_cases(seed: int, rows: int) -> Dict[str, Callable[[], Any]]:
+    """
+    Build the cases decoding and normalizing response pages.
+
+    Args:
+        seed (int): The seed of the generated pages.
+        rows (int): The total rows to process.
+
+    Returns:
+        Dict[str, Callable[[], Any]]: The cases, by name.
+    """
+    page_rows = min(rows, PAGE_ROWS)
+    pages = rows // page_rows
+    cases = {}
+    for transaction_type in TRANSACTION_TYPES:
+        decoded = [
+            generate_page(seed + i, transaction_type, page_rows)
+            for i in range(min(pages, DISTINCT_PAGES))
+        ]
+        bodies = [json.dumps(page).encode() for page in decoded]
+        parsed = [parse_json(page, transaction_type) for page in decoded]
+
+        def parse(bodies=bodies, transaction_type=transaction_type):
+            for i in range(pages):
+                parse_json(json.loads(bodies[i % len(bodies)]), transaction_type)
+
+        def transform(parsed=parsed, transaction_type=transaction_type):
+            for i in range(pages):
+                transform_keys(
+                    parsed[i % len(parsed)], transaction_type=transaction_type
+                )
+
+        def decode(bodies=bodies, transaction_type=transaction_type):
+            # Bodies are parsed with ujson, as the request functions do
+            for i in range(pages):
+                decode_page(ujson.loads(bodies[i % len(bodies)]), transaction_type)
+
+        for name, func in zip(PAYLOAD_CASES, (parse, transform, decode)):
+            cases[f"{name}[{transaction_type}]"] = func
+    return cases
+
+
+def ledger_cases(
+    seed: int, rows: int, transaction_type: str, tmp: Path
+) -> Dict[str, Callable[[], Any]]:
+    """
+    Build the cases writing and valuing normalized transactions.
+
+    Args:
+        seed (int): The seed of the generated transactions.
+        rows (int): The number of transactions.
+        transaction_type (str): "convert" or "fiat".
+        tmp (Path): A directory for the written files.
+
+    Returns:
+        Dict[str, Callable[[], Any]]: The cases, by name.
+    """
+    df = generate_ledger(seed, rows, transaction_type, ASSETS, START, END)
+    # The input of the valuation cases, written up front
+    csv_file = str(tmp / f"{transaction_type}.csv")
+    df.to_csv(csv_file, index=False)
+    output = tmp / f"output_{transaction_type}.csv"
+    ledger = tmp / f"ledger_{transaction_type}"
+    cases = {
+        "write_csv": lambda: df.to_csv(output, index=False),
+        "write_parquet": lambda: write_ledger(df, transaction_type, path=ledger),
+        "add_usd_prices": lambda: add_usd_prices(csv_file),
+        "all_coins_avg": lambda: all_coins_avg(csv_file, "buy"),
+        "all_coins_avg_streamed": lambda: all_coins_avg(
+            csv_file, "buy", chunksize=CHUNK_ROWS
+        ),
+    }
+    return {f"{name}[{transaction_type}]": func for name, func in cases.items()}
+
+
+def run_size(label: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Run every benchmark case at one size.
+
+    Cases are built group by group, and the transactions of a group are only
+    generated if one of its cases is selected, so that the largest size fits
+    in memory.
+
+    Args:
+        label (str): The size label, e.g. 100k.
+        args (argparse.Namespace): The benchmark options.
+
+    Returns:
+        List[Dict[str, Any]]: The result of each case.
+    """
+    rows = SIZES[label]
+
+    def selected(name: str) -> bool:
+        return not args.cases or any(case in name for case in args.cases)
+
+    # A range planned into one window per row
+    endpoint = get_endpoint("deposit")
+    span, _ = ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMITS)
+    groups = [
+        (PAYLOAD_CASES, TRANSACTION_TYPES, lambda: payload_cases(args.seed, rows)),
+        (
+            ["plan_windows"],
+            None,
+            lambda: {"plan_windows": lambda: plan_windows(endpoint, 0, rows * span)},
+        ),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for transaction_type in ["convert", "fiat"]:
+            groups.append(
+                (
+                    LEDGER_CASES,
+                    [transaction_type],
+                    lambda transaction_type=transaction_type: ledger_cases(
+                        args.seed, rows, transaction_type, Path(tmp)
+                    ),
+                )
+            )
+        with mock.patch("tools.price_cache._store", StubPriceStore()):
+            for names, transaction_types, build in groups:
+                if transaction_types is not None:
+                    names = [f"{n}[{t}]" for t in transaction_types for n in names]
+                if not any(map(selected, names)):
+                    continue
+                for name, func in build().items():
+                    if not selected(name):
+                        continue
+                    result = {"case": name, "size": label, "rows": rows}
+                    result.update(measure(func, not args.skip_memory))
+                    result["rows_per_sec"] = (
+                        round(rows / result["wall_time"])
+                        if result["wall_time"]
+                        else None
+                    )
+                    peak = result["peak_memory_mb"]
+                    print(
+                        f"{name:<32} {label:>5} {result['wall_time']:>10.4f}s "
+                        f"{result['rows_per_sec'] or 0:>12,} rows/s "
+                        + (f"{peak:>9.1f} MB" if peak is not None else "")
+                    )
+                    results.append(result)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path) -> None:
+    """
+    Print the speedup of each case over a previous report.
+
+    Args:
+        results (List[Dict[str, Any]]): The results of this run.
+        baseline_path (Path): The JSON report of the baseline run.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(r["case"], r["size"]): r for r in baseline["results"]}
+    print(f"\nSpeedup over {baseline.get('commit') or baseline_path}")
+    for result in results:
+        before = previous.get((result["case"], result["size"]))
+        if before is None or not result["wall_time"]:
+            continue
+        print(
+            f"{result['case']:<32} {result['size']:>5} "
+            f"{before['wall_time'] / result['wall_time']:>8.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CPU-bound hot paths on seeded synthetic data."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(SIZES),
+        default=DEFAULT_SIZES,
+        help="The row counts to run, 10m takes several minutes and GBs of RAM.",
+    )
+    parser.add_argument("--cases", nargs="+", help="Only run cases matching these.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-memory", action="store_true", help="Only time the cases."
+    )
+    parser.add_argument("--output", type=Path, help="Write the report as JSON.")
+    parser.add_argument("--baseline", type=Path, help="A report to compare with.")
+    args = parser.parse_args()
+
+    results = []
+    for label in args.sizes:
+        results += run_size(label, args)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: str(v) for k, v in vars(args).items() if k != "output"},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
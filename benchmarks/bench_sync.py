@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+TRANSACTION_TYPES = ["convert", "deposit", "withdraw", "fiat"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_stats(base_url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(f"{base_url}/mock/stats") as response:
+        return json.load(response)
+
+
+def start_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """
+    Start the mock Binance server in its own process, so its CPU time and
+    memory are not counted in the measurements.
+
+    Args:
+        args (argparse.Namespace): The benchmark options.
+
+    Returns:
+        tuple[subprocess.Popen, str]: The server process and its base URL.
+    """
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "tools.mock_server", "--port", str(port)]
+    for option in [
+        "seed",
+        "latency",
+        "trades_per_symbol",
+        "converts",
+        "deposits",
+        "withdrawals",
+        "fiat_payments",
+        "days",
+    ]:
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    server = subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    for _ in range(600):
+        try:
+            _server_stats(base_url)
+            return server, base_url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Mock server did not start")
+
+
+def run_stage(name: str, func: Callable[[], Any], base_url: str) -> Dict[str, Any]:
+    """
+    Run one benchmark stage and measure it.
+
+    Args:
+        name (str): The name of the stage.
+        func (Callable[[], Any]): The stage, returning the rows it produced.
+        base_url (str): The base URL of the mock server.
+
+    Returns:
+        Dict[str, Any]: The wall time, requests, requests/sec, rows and peak
+        traced memory of the stage.
+    """
+    requests_before = _server_stats(base_url)["requests"]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = func()
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    requests = _server_stats(base_url)["requests"] - requests_before
+    stage = {
+        "stage": name,
+        "wall_time": round(wall_time, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall_time, 1) if wall_time else None,
+        "rows": result if isinstance(result, int) else len(result),
+        "peak_memory_mb": round(peak / 2**20, 1),
+    }
+    print(
+        f"{name:<12} {stage['wall_time']:>8.2f}s {requests:>6} requests "
+        f"{stage['requests_per_sec'] or 0:>8.1f} req/s {stage['rows']:>7} rows "
+        f"{stage['peak_memory_mb']:>7.1f} MB"
+    )
+    return stage
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark a full sync and a valuation pass against a local "
+        "Binance stand-in."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--trades-per-symbol", type=int, default=2_000)
+    parser.add_argument("--converts", type=int, default=500)
+    parser.add_argument("--deposits", type=int, default=200)
+    parser.add_argument("--withdrawals", type=int, default=200)
+    parser.add_argument("--fiat-payments", type=int, default=300)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument(
+        "--orchestrated",
+        action="store_true",
+        help="Sync every type in one concurrent run instead of one stage each.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the report as JSON.")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args)
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            # Set before importing tools, which read them at import time
+            os.environ["BINANCE_BASE_URL"] = base_url
+            os.environ["CRYPTO_TRACKER_DATA"] = data_dir
+            os.environ.setdefault("BINANCE_API_KEY", "benchmark")
+            os.environ.setdefault("BINANCE_SECRET_KEY", "benchmark")
+
+            from tools.process_csv import add_usd_prices
+            from tools.sync import sync_trades, sync_transactions
+            from tools.sync_all import sync_all
+
+            tracemalloc.start()
+            stages = []
+            total = time.perf_counter()
+            if args.orchestrated:
+                sync = lambda: sync_all(verbose=False)["rows"]
+                stages.append(run_stage("sync_all", sync, base_url))
+            else:
+                for transaction_type in TRANSACTION_TYPES:
+                    stages.append(
+                        run_stage(
+                            transaction_type,
+                            lambda: sync_transactions(transaction_type),
+                            base_url,
+                        )
+                    )
+                stages.append(run_stage("trades", sync_trades, base_url))
+            for transaction_type in ["convert", "fiat"]:
+                stages.append(
+                    run_stage(
+                        f"value_{transaction_type}",
+                        lambda: add_usd_prices(transaction_type),
+                        base_url,
+                    )
+                )
+            total = time.perf_counter() - total
+            tracemalloc.stop()
+        stats = _server_stats(base_url)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "options": {k: str(v) for k, v in vars(args).items() if k != "output"},
+        "wall_time": round(total, 3),
+        "requests": sum(stage["requests"] for stage in stages),
+        "rate_limited": stats["rate_limited"],
+        "requests_by_endpoint": stats["requests_by_endpoint"],
+        "peak_memory_mb": max(stage["peak_memory_mb"] for stage in stages),
+        "stages": stages,
+    }
+    print(
+        f"{'total':<12} {report['wall_time']:>8.2f}s {report['requests']:>6} requests"
+    )
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.append("..")
+
+from tools.mock_server import MockBinance, MockServer
+
+API_KEYS = {"BINANCE_API_KEY": "key", "BINANCE_SECRET_KEY": "secret"}
+# No history at all, so each test only generates the one it needs
+EMPTY_HISTORY = {
+    "trades_per_symbol": 0,
+    "converts": 0,
+    "deposits": 0,
+    "withdrawals": 0,
+    "fiat_payments": 0,
+    "latency": 0,
+}
+
+
+class MockExchangeTestCase(unittest.TestCase):
+    """
+    Serve a MockBinance to the request paths under test, with dummy API keys.
+
+    Subclasses set exchange_options to fill in the histories they need, and
+    patch any other module pointing at the API with self.patch.
+    """
+
+    exchange_options = {}
+    base_url_targets = ["tools.send_request.BASE_URL", "tools.async_request.BASE_URL"]
+
+    def setUp(self):
+        self.exchange = MockBinance(**{**EMPTY_HISTORY, **self.exchange_options})
+        self.server = MockServer(self.exchange)
+        self.base_url = self.server.start()
+        self.ws_url = self.base_url.replace("http", "ws", 1)
+        self.addCleanup(self.server.stop)
+        self.patch(mock.patch.dict(os.environ, API_KEYS))
+        for target in self.base_url_targets:
+            self.patch(mock.patch(target, self.base_url))
+
+    def patch(self, patcher):
+        """
+        Start a patch for the duration of the test.
+
+        Args:
+            patcher: The patcher, e.g. from mock.patch.
+
+        Returns:
+            The patched value.
+        """
+        value = patcher.start()
+        self.addCleanup(patcher.stop)
+        return value
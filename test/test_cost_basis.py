@@ -0,0 +1,61 @@
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.append("..")
+
+from tools.cost_basis import compute_cost_basis
+
+
+def make_fills(rows):
+    return pd.DataFrame(rows, columns=["dt", "asset", "qty", "value", "source"])
+
+
+class TestCostBasis(unittest.TestCase):
+
+    def setUp(self):
+        # Buy 1 BTC at 100, 1 BTC at 200, sell 1.5 BTC for 450
+        self.fills = make_fills(
+            [
+                (3, "BTC", -1.5, 450.0, "trade"),
+                (1, "BTC", 1.0, 100.0, "trade"),
+                (2, "BTC", 1.0, 200.0, "convert"),
+                (1, "ETH", 2.0, 10.0, "fiat"),
+            ]
+        )
+
+    def test_fifo_consumes_oldest_lots(self):
+        disposals, positions = compute_cost_basis(self.fills, "fifo")
+        self.assertEqual(disposals["cost_basis"].tolist(), [200.0])
+        self.assertEqual(disposals["realized_pnl"].tolist(), [250.0])
+        self.assertEqual(positions.loc["BTC", "quantity"], 0.5)
+        self.assertEqual(positions.loc["BTC", "cost"], 100.0)
+
+    def test_lifo_consumes_newest_lots(self):
+        disposals, positions = compute_cost_basis(self.fills, "lifo")
+        self.assertEqual(disposals["cost_basis"].tolist(), [250.0])
+        self.assertEqual(positions.loc["BTC", "cost"], 50.0)
+
+    def test_average_cost(self):
+        disposals, positions = compute_cost_basis(self.fills, "average")
+        self.assertEqual(disposals["cost_basis"].tolist(), [225.0])
+        self.assertEqual(positions.loc["BTC", "cost"], 75.0)
+        self.assertEqual(positions.loc["ETH", "realized_pnl"], 0.0)
+
+    def test_oversold_quantity_has_no_cost(self):
+        fills = make_fills(
+            [(1, "SOL", 1.0, 10.0, "trade"), (2, "SOL", -3.0, 90.0, "trade")]
+        )
+        for method in ["fifo", "lifo", "average"]:
+            disposals, positions = compute_cost_basis(fills, method)
+            self.assertEqual(disposals["cost_basis"].tolist(), [10.0])
+            self.assertEqual(positions.loc["SOL", "quantity"], 0.0)
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            compute_cost_basis(self.fills, "hifo")
+
+
+if __name__ == "__main__":
+    unittest.main()
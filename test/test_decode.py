@@ -0,0 +1,73 @@
+import random
+import sys
+import unittest
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+sys.path.append("..")
+
+from tools.decode import decode_page
+from tools.ledger_store import _to_table
+from tools.parse_transactions import parse_json, transform_frame
+from tools.synthetic import (
+    generate_converts,
+    generate_deposits,
+    generate_fiat_payments,
+    generate_trades,
+    generate_withdrawals,
+)
+
+# Spring 2024, away from the ambiguous hour of the DST change
+START, END = 1711965600000, 1714557600000
+
+
+class TestDecodePage(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        assets = ["BTC", "ETH"]
+        self.pages = {
+            "convert": {"list": generate_converts(rng, 50, assets, START, END)},
+            "deposit": generate_deposits(rng, 50, assets, START, END),
+            "withdraw": generate_withdrawals(rng, 50, assets, START, END),
+            "fiat": {"data": generate_fiat_payments(rng, 50, assets, START, END)},
+            "trade": generate_trades(rng, 50, "BTCUSDT", START, END),
+        }
+
+    def test_matches_transform_frame(self):
+        for transaction_type, page in self.pages.items():
+            with self.subTest(transaction_type=transaction_type):
+                expected = transform_frame(
+                    parse_json(page, transaction_type),
+                    transaction_type=transaction_type,
+                )
+                decoded = decode_page(page, transaction_type)
+                self.assertEqual(
+                    _to_table(decoded, transaction_type),
+                    _to_table(expected, transaction_type),
+                )
+
+    def test_failed_payments_and_errors(self):
+        decoded = decode_page(self.pages["fiat"], "fiat")
+        self.assertNotIn("Failed", set(decoded["status"]))
+        self.assertTrue(decode_page({"code": -1121, "msg": ""}, "trade").empty)
+
+    def test_withdrawal_times_are_utc(self):
+        withdrawal = {
+            **self.pages["withdraw"][0],
+            "completeTime": "2024-04-01 12:00:00",
+        }
+        with mock.patch(
+            "tools.parse_transactions.get_localzone",
+            return_value=ZoneInfo("America/New_York"),
+        ):
+            decoded = decode_page([withdrawal], "withdraw")
+            legacy = _to_table(
+                transform_frame([withdrawal], transaction_type="withdraw"), "withdraw"
+            )
+        self.assertEqual(decoded["dt"][0], 1711972800000)
+        self.assertEqual(legacy["dt"][0].as_py(), 1711972800000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,32 +1,14 @@
 import sys
-import pandas as pd
 
 sys.path.append("..")
 
-from tools.send_request import send_signed_request, set_payload, get_endpoint
-from datetime import date
-from tools.parse_transactions import transform_keys, parse_json, select_config
-from tools.moving_window import moving_window
+from tools.sync import sync_transactions
 
 
 def main():
-
     transaction_type = "deposit"
-    start = "01-07-2023"
-    end = date.today().strftime("%d-%m-%Y")
-    endpoint = get_endpoint(transaction_type)
-    key_config = select_config(transaction_type)
-    df = pd.DataFrame()
-
-    if start is not None and end is not None:
-        for window in moving_window(start, end):
-            params = set_payload(endpoint, start=window[0], end=window[1])
-            response = send_signed_request("GET", endpoint, params)
-            transactions = parse_json(response, transaction_type)
-            filtered_transactions = transform_keys(transactions, key_config)
-            df = pd.concat([df, pd.DataFrame(filtered_transactions)])
-    df = df.sort_values(by="dt")
-    df.to_csv("../csv/deposit.csv", index=False)
+    df = sync_transactions(transaction_type)
+    print(f"{len(df)} new {transaction_type} transactions")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,22 @@
+import random
 import sys
 import unittest
+from unittest import mock
+from zoneinfo import ZoneInfo
 
 sys.path.append("..")
 
-from tools.parse_transactions import transform_keys
+from tools.parse_transactions import parse_json, transform_frame, transform_keys
+from tools.synthetic import (
+    generate_converts,
+    generate_deposits,
+    generate_fiat_payments,
+    generate_trades,
+    generate_withdrawals,
+)
+
+# Autumn 2024, across the DST change of New York
+START, END = 1730250000000, 1730850000000
 
 
 class TestTransformKeys(unittest.TestCase):
@@ -93,6 +106,29 @@ class TestTransformKeys(unittest.TestCase):
         ]
         self.assertEqual(result, expected)
 
+    def test_matches_transform_frame(self):
+        rng = random.Random(7)
+        assets = ["BTC", "ETH"]
+        pages = {
+            "convert": {"list": generate_converts(rng, 50, assets, START, END)},
+            "deposit": generate_deposits(rng, 50, assets, START, END),
+            "withdraw": generate_withdrawals(rng, 50, assets, START, END),
+            "fiat": {"data": generate_fiat_payments(rng, 50, assets, START, END)},
+            "trade": generate_trades(rng, 50, "BTCUSDT", START, END),
+        }
+        for transaction_type, page in pages.items():
+            with self.subTest(transaction_type=transaction_type), mock.patch(
+                "tools.parse_transactions.get_localzone",
+                return_value=ZoneInfo("America/New_York"),
+            ):
+                transactions = parse_json(page, transaction_type)
+                df = transform_frame(transactions, transaction_type=transaction_type)
+                df["dt"] = df["dt"].dt.strftime("%Y-%m-%d %H:%M:%S")
+                self.assertEqual(
+                    transform_keys(transactions, transaction_type=transaction_type),
+                    df.to_dict("records"),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import unittest
+from decimal import ROUND_HALF_EVEN, Decimal, localcontext
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+from tools.fixed_point import (
+    add,
+    asset_decimals,
+    divide,
+    group_sum,
+    multiply,
+    to_float,
+    to_units,
+)
+
+
+def reference(a, a_decimals, b, b_decimals, decimals, operation):
+    with localcontext() as context:
+        context.prec = 100
+        x = Decimal(int(a)).scaleb(-int(a_decimals))
+        y = Decimal(int(b)).scaleb(-int(b_decimals))
+        exact = operation(x, y).scaleb(decimals)
+        return int(exact.quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+class TestFixedPoint(unittest.TestCase):
+
+    def test_parse_and_sum_exactly(self):
+        units = to_units(["758.00000000", "0.16900000", "1e-5", None, 0.1], 8)
+        self.assertEqual(list(units), [75800000000, 16900000, 1000, 0, 10000000])
+        # Half to even, from strings and floats alike
+        self.assertEqual(list(to_units(["0.125", "0.135"], 2)), [12, 14])
+        self.assertEqual(list(to_units(np.array([0.125, 0.135]), 2)), [12, 14])
+        self.assertEqual(list(to_units(["100", "1.239"], [2, 8])), [10000, 123900000])
+        tenths = to_units(np.full(1_000_000, 0.1), 8)
+        self.assertEqual(tenths.sum(), 100_000 * 10**8)
+        self.assertEqual(to_float(tenths.sum(), 8), 100_000.0)
+
+    def test_kernels_match_decimal_arithmetic(self):
+        rng = np.random.default_rng(0)
+        n = 500
+        a = rng.integers(-(10**9), 10**9, n)
+        b = rng.integers(1, 10**10, n)
+        a_decimals = asset_decimals(rng.choice(["BTC", "BONK"], n))
+        products = multiply(a, a_decimals, b, 12, 8)
+        quotients = divide(a, a_decimals, b, 12, 8)
+        for i in range(n):
+            self.assertEqual(
+                products[i],
+                reference(a[i], a_decimals[i], b[i], 12, 8, Decimal.__mul__),
+            )
+            self.assertEqual(
+                quotients[i],
+                reference(a[i], a_decimals[i], b[i], 12, 8, Decimal.__truediv__),
+            )
+
+    def test_overflow_is_detected(self):
+        with self.assertRaises(OverflowError):
+            add(np.array([2**62]), np.array([2**62]))
+        with self.assertRaises(OverflowError):
+            multiply(np.array([10**18]), 0, np.array([100]), 0, 0)
+        with self.assertRaises(ZeroDivisionError):
+            divide(np.array([1]), 0, np.array([0]), 0, 0)
+        units = pd.DataFrame({"amount": [2**62, 2**62, -1]}, index=["A", "B", "A"])
+        self.assertEqual(list(group_sum(units)["amount"]), [2**62 - 1, 2**62])
+        with self.assertRaises(OverflowError):
+            group_sum(pd.DataFrame({"amount": [2**62, 2**62]}, index=["A", "A"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append("..")
+
+from tools import get_key as credentials
+from tools.get_key import get_key, register_provider
+
+NAME = "CRYPTO_TRACKER_TEST_KEY"
+
+
+class TestGetKey(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "credentials.json"
+        self.keyring = types.SimpleNamespace(get_password=mock.Mock(return_value=None))
+        self.cmd = mock.Mock(return_value=subprocess.CompletedProcess([], 0, "", ""))
+        patches = [
+            mock.patch.dict(os.environ),
+            mock.patch.object(credentials, "CREDENTIALS_PATH", self.path),
+            mock.patch.object(credentials, "PROVIDERS", list(credentials.PROVIDERS)),
+            mock.patch.dict(sys.modules, {"keyring": self.keyring}),
+            mock.patch("shutil.which", return_value=None),
+            mock.patch("subprocess.run", self.cmd),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        os.environ.pop(NAME, None)
+        get_key.cache_clear()
+        self.addCleanup(get_key.cache_clear)
+
+    def write_file(self, credentials):
+        with open(self.path, "w") as credentials_file:
+            json.dump(credentials, credentials_file)
+
+    def resolve(self):
+        get_key.cache_clear()
+        return get_key(NAME, required=False)
+
+    def test_provider_priority(self):
+        os.environ[NAME] = "env"
+        self.write_file({NAME: "file"})
+        self.keyring.get_password.return_value = "keyring"
+        self.cmd.return_value.stdout = "windows\r\n"
+        with mock.patch("shutil.which", return_value="/mnt/c/Windows/cmd.exe"):
+            self.assertEqual(self.resolve(), "env")
+            del os.environ[NAME]
+            self.assertEqual(self.resolve(), "file")
+            self.write_file({})
+            self.assertEqual(self.resolve(), "keyring")
+            self.keyring.get_password.return_value = None
+            self.assertEqual(self.resolve(), "windows")
+            # cmd.exe echoes unset variables unexpanded
+            self.cmd.return_value.stdout = f"%{NAME}%\r\n"
+            self.assertIsNone(self.resolve())
+
+    def test_results_are_cached_until_a_provider_is_registered(self):
+        os.environ[NAME] = "env"
+        self.assertEqual(get_key(NAME), "env")
+        os.environ[NAME] = "rotated"
+        self.assertEqual(get_key(NAME), "env")
+        register_provider(lambda name: "registered")
+        self.assertEqual(get_key(NAME), "registered")
+
+    def test_missing_key_without_cmd_exe(self):
+        self.assertIsNone(get_key(NAME, required=False))
+        self.cmd.assert_not_called()
+        with self.assertRaises(ValueError):
+            get_key(NAME)
+
+
+if __name__ == "__main__":
+    unittest.main()
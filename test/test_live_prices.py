@@ -0,0 +1,101 @@
+import math
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append("..")
+
+from test.mock_exchange import MockExchangeTestCase
+from tools import live_prices
+from tools.get_account_info import get_account_value
+from tools.live_prices import LivePriceService, PriceTable
+
+
+class TestPriceTable(unittest.TestCase):
+
+    def test_mid_price_then_last_price(self):
+        table = PriceTable(capacity=1)
+        table.update_last("BTCUSDT", 100.0)
+        self.assertEqual(table.get("BTCUSDT"), 100.0)
+        table.update_book("BTCUSDT", 99.0, 103.0)
+        self.assertEqual(table.get("BTCUSDT"), 101.0)
+        self.assertIsNone(table.get("ETHUSDT"))
+
+    def test_columns_grow_and_keep_prices(self):
+        table = PriceTable(capacity=2)
+        for i in range(5):
+            table.update_last(f"A{i}USDT", float(i))
+        self.assertEqual(len(table.bid), 8)
+        self.assertEqual([table.get(f"A{i}USDT") for i in range(5)], [0, 1, 2, 3, 4])
+
+    def test_stale_price(self):
+        table = PriceTable()
+        table.update_last("BTCUSDT", 100.0)
+        table.updated[table.slot("BTCUSDT")] -= 120
+        self.assertIsNone(table.get("BTCUSDT", max_age=60))
+
+
+class TestLivePriceService(MockExchangeTestCase):
+
+    exchange_options = {"assets": ["BTC", "ETH"]}
+
+    def setUp(self):
+        super().setUp()
+        self.patch(mock.patch("tools.live_prices.MARKET_STREAM_URL", self.ws_url))
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+    def tickers(self):
+        return self.exchange.requests_by_endpoint[live_prices.TICKER_ENDPOINT]
+
+    def test_streamed_prices_skip_rest(self):
+        with LivePriceService(["BTCUSDT", "ETHUSDT"]) as service:
+            self.wait_for(lambda: service.table.get("ETHUSDT") is not None)
+            value = service.value({"BTC": 1.0, "ETH": 2.0, "USDT": 5.0})
+            self.assertEqual(service.fallbacks, 0)
+        btc, eth = service.table.get("BTCUSDT"), service.table.get("ETHUSDT")
+        self.assertAlmostEqual(value, btc + 2 * eth + 5)
+
+    def test_rest_fallback(self):
+        service = LivePriceService()
+        self.assertGreater(service.price("BTCUSDT"), 0)
+        self.assertTrue(math.isnan(service.price("XYZUSDT")))
+        # The fetched price is cached until it goes stale
+        service.price("BTCUSDT")
+        self.assertEqual(service.fallbacks, 2)
+
+    def test_batch_fallback_is_one_request(self):
+        service = LivePriceService()
+        btc, eth, xyz = service.prices(["BTCUSDT", "ETHUSDT", "XYZUSDT"])
+        self.assertGreater(btc, 0)
+        self.assertGreater(eth, 0)
+        self.assertTrue(math.isnan(xyz))
+        self.assertEqual(self.tickers(), 1)
+
+    def test_shared_service_streams_held_symbols(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.patch(mock.patch("tools.symbols.DATA_DIR", Path(tmp.name)))
+        self.patch(mock.patch("tools.symbols._symbols", None))
+        self.patch(mock.patch("tools.live_prices._service", None))
+        get_account_value()
+        service = live_prices.get_price_service()
+        self.addCleanup(service.stop)
+        self.assertEqual(service.symbols, ["BTCUSDT", "ETHUSDT"])
+        self.assertLessEqual(self.tickers(), 1)
+        self.wait_for(lambda: service.table.get("ETHUSDT") is not None)
+        self.wait_for(lambda: service.table.get("BTCUSDT") is not None)
+        requests = self.tickers()
+        get_account_value()
+        self.assertEqual(self.tickers(), requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
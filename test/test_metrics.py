@@ -0,0 +1,75 @@
+import asyncio
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append("..")
+
+from test.mock_exchange import MockExchangeTestCase
+from tools.async_request import create_session, send_signed_request_async
+from tools.metrics import RequestMetrics
+from tools.send_request import send_public_request
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def test_histogram_and_errors(self):
+        metrics = RequestMetrics(enabled=True, buckets=(0.1, 1.0))
+        for latency in (0.05, 0.5, 5.0):
+            metrics.record("/x", 200, latency, 10, 0.0, {}, 0, [])
+        metrics.record("/x", 400, 0.05, 40, 0.0, {}, 1, {"code": -1121, "msg": ""})
+        snapshot = metrics.snapshot()["endpoints"]["/x"]
+        self.assertEqual(snapshot["latency_buckets"], {"0.1": 2, "1.0": 1, "+Inf": 1})
+        self.assertEqual(snapshot["bytes"], 70)
+        self.assertEqual(snapshot["retries"], 1)
+        self.assertEqual(snapshot["errors"], {"-1121": 1})
+        text = metrics.prometheus()
+        self.assertIn(
+            'binance_request_duration_seconds_bucket{endpoint="/x",le="1.0"} 3', text
+        )
+        self.assertIn('binance_api_errors_total{endpoint="/x",code="-1121"} 1', text)
+
+
+class TestInstrumentedRequests(MockExchangeTestCase):
+
+    exchange_options = {"assets": ["BTC"], "trades_per_symbol": 10}
+
+    def setUp(self):
+        super().setUp()
+        self.metrics = RequestMetrics(enabled=True)
+        self.patch(mock.patch("tools.metrics._metrics", self.metrics))
+
+    def test_both_request_paths_are_recorded(self):
+        send_public_request("/api/v3/ticker/price", {"symbol": "BTCUSDT"})
+
+        async def fetch():
+            async with create_session() as session:
+                await send_signed_request_async(
+                    session, "GET", "/api/v3/myTrades", {"symbol": "XYZUSDT"}
+                )
+
+        asyncio.run(fetch())
+        snapshot = self.metrics.snapshot()
+        ticker = snapshot["endpoints"]["/api/v3/ticker/price"]
+        self.assertEqual(ticker["requests"], 1)
+        self.assertGreater(ticker["bytes"], 0)
+        trades = snapshot["endpoints"]["/api/v3/myTrades"]
+        self.assertEqual(trades["errors"], {"-1121": 1})
+        self.assertEqual(snapshot["used_weight"]["api"], 2 + 20)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.json"
+            self.metrics.export(path)
+            with open(path) as metrics_file:
+                self.assertEqual(json.load(metrics_file), snapshot)
+
+    def test_disabled_metrics_record_nothing(self):
+        self.metrics.enabled = False
+        send_public_request("/api/v3/ticker/price", {"symbol": "BTCUSDT"})
+        self.assertEqual(self.metrics.snapshot()["endpoints"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
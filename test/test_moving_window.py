@@ -0,0 +1,33 @@
+import sys
+import unittest
+
+sys.path.append("..")
+
+from tools.moving_window import DAY_MS, is_full, plan_windows, split_window
+
+
+class TestWindowPlanner(unittest.TestCase):
+
+    def test_windows_use_endpoint_span_without_overlap(self):
+        endpoint = "/sapi/v1/capital/deposit/hisrec"
+        windows = plan_windows(endpoint, 0, 200 * DAY_MS)
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0], (0, 90 * DAY_MS - 1))
+        for previous, current in zip(windows, windows[1:]):
+            self.assertEqual(previous[1] + 1, current[0])
+        self.assertEqual(windows[-1][1], 200 * DAY_MS)
+
+    def test_split_window_covers_window(self):
+        first, second = split_window((0, 99))
+        self.assertEqual(first, (0, 49))
+        self.assertEqual(second, (50, 99))
+
+    def test_full_page_detection(self):
+        endpoint = "/sapi/v1/convert/tradeFlow"
+        self.assertTrue(is_full(endpoint, {"list": [{}] * 1000}))
+        self.assertFalse(is_full(endpoint, {"list": [{}] * 999}))
+        self.assertFalse(is_full(endpoint, {"code": -1000, "msg": "error"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
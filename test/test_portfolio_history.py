@@ -0,0 +1,83 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+import tools.price_cache as price_cache
+from tools.ledger_store import write_ledger
+from tools.portfolio_history import holdings_history, portfolio_history
+from tools.price_cache import PriceStore
+
+DAY_MS = 86_400_000
+START = 1_700_006_400_000  # A UTC midnight
+
+
+def daily_klines(symbol, interval, start, end, limit):
+    # One kline per day, BTC at 100 USDT and ETH at 10 USDT
+    price = {"BTCUSDT": "100", "ETHUSDT": "10"}[symbol]
+    first = -(-start // DAY_MS) * DAY_MS
+    return [
+        [t, "0", price, price]
+        for t in range(first, min(end + 1, first + limit * DAY_MS), DAY_MS)
+    ]
+
+
+class TestPortfolioHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = Path(self.tmp.name) / "ledger"
+        day = lambda n: START + n * DAY_MS + 3_600_000
+        write_ledger(
+            pd.DataFrame(
+                {"id": ["d1"], "dt": [day(0)], "to_asset": ["BTC"], "to_amount": [2.0]}
+            ),
+            "deposit",
+            self.ledger,
+        )
+        write_ledger(
+            pd.DataFrame(
+                {
+                    "id": ["c1"],
+                    "dt": [day(2)],
+                    "from_asset": ["BTC"],
+                    "from_amount": [1.0],
+                    "to_asset": ["ETH"],
+                    "to_amount": [10.0],
+                }
+            ),
+            "convert",
+            self.ledger,
+        )
+        self.store = PriceStore(Path(self.tmp.name) / "p.sqlite", fetch=daily_klines)
+        price_cache._store = self.store
+        self.end = START + 4 * DAY_MS
+
+    def tearDown(self):
+        price_cache._store = None
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_holdings_accumulate_over_a_dense_grid(self):
+        holdings = holdings_history("1d", end=self.end, ledger_path=self.ledger)
+        self.assertEqual(len(holdings), 4)
+        np.testing.assert_array_equal(holdings["BTC"], [2, 2, 1, 1])
+        np.testing.assert_array_equal(holdings["ETH"], [0, 0, 10, 10])
+
+    def test_values_join_daily_prices(self):
+        values = portfolio_history("1d", end=self.end, ledger_path=self.ledger)
+        np.testing.assert_array_equal(values["total"], [200, 200, 200, 200])
+        self.assertEqual(self.store.requests, 2)
+
+    def test_invalid_frequency(self):
+        with self.assertRaises(ValueError):
+            holdings_history("1w", ledger_path=self.ledger)
+
+
+if __name__ == "__main__":
+    unittest.main()
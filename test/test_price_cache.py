@@ -0,0 +1,69 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.append("..")
+
+from tools.price_cache import PriceStore
+
+
+def fake_klines(symbol, interval, start, end, limit):
+    # One kline per second with high = low = seconds since epoch
+    first = -(-start // 1000) * 1000
+    return [
+        [t, "0", str(t / 1000), str(t / 1000)]
+        for t in range(first, min(end + 1, first + limit * 1000), 1000)
+    ]
+
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "prices.sqlite"
+        self.store = PriceStore(self.path, fetch=fake_klines)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_lookup_rounds_up_to_next_kline(self):
+        self.assertEqual(
+            self.store.get_price("BTCUSDT", 1_700_000_000_500), 1_700_000_001
+        )
+
+    def test_neighbouring_lookups_are_answered_locally(self):
+        for offset in range(0, 600_000, 7_000):
+            self.store.get_price("BTCUSDT", 1_700_000_000_000 + offset)
+        self.assertEqual(self.store.requests, 1)
+
+    def test_second_pass_makes_no_request(self):
+        self.store.get_price("ETHUSDT", 1_700_000_000_000)
+        self.store.close()
+        self.store = PriceStore(self.path, fetch=None)
+        self.assertEqual(
+            self.store.get_price("ETHUSDT", 1_700_000_000_000), 1_700_000_000
+        )
+        self.assertEqual(self.store.requests, 0)
+
+    def test_klines_still_to_come_are_fetched_later(self):
+        # The API only has the klines up to a few seconds ago
+        available = [int(time.time() * 1000) - 10_000]
+
+        def fetch(symbol, interval, start, end, limit):
+            return fake_klines(symbol, interval, start, min(end, available[0]), limit)
+
+        store = PriceStore(Path(self.tmp.name) / "live.sqlite", fetch=fetch)
+        self.addCleanup(store.close)
+        timestamp = available[0] - 5_000
+        self.assertEqual(store.get_price("BTCUSDT", timestamp), -(-timestamp // 1000))
+        available[0] += 5_000
+        timestamp = available[0] - 2_000
+        self.assertEqual(store.get_price("BTCUSDT", timestamp), -(-timestamp // 1000))
+        self.assertEqual(store.requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+from tools.ledger_store import append_ledger, write_ledger
+from tools.price_cache import PriceStore
+from tools.process_csv import _usd_convert_value, add_usd_prices, all_coins_avg
+
+
+class TestAllCoinsAvg(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        n = 1_000
+        # Converts paid in USDT, valued without any price lookup
+        self.df = pd.DataFrame(
+            {
+                "id": [f"c{i}" for i in range(n)],
+                "dt": 1_700_000_000_000 + np.arange(n) * 60_000,
+                "from_asset": "USDT",
+                "from_amount": rng.uniform(10, 100, n).round(2),
+                "to_asset": rng.choice(["BTC", "ETH", "SOL"], n),
+                "to_amount": rng.uniform(0.1, 1, n).round(4),
+            }
+        )
+        self.csv = str(Path(self.tmp.name) / "convert.csv")
+        self.df.to_csv(self.csv, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streaming_matches_one_pass(self):
+        expected = all_coins_avg(self.csv, "buy")
+        streamed = all_coins_avg(self.csv, "buy", chunksize=64)
+        pd.testing.assert_frame_equal(streamed, expected)
+        totals = self.df.groupby("to_asset", sort=False)["from_amount"].sum()
+        np.testing.assert_allclose(
+            expected["avg_buy_value"] * expected["total_amount"], totals
+        )
+
+    def test_streaming_from_the_ledger(self):
+        ledger = Path(self.tmp.name) / "ledger"
+        write_ledger(self.df, "convert", ledger)
+        with mock.patch("tools.ledger_store.LEDGER_DIR", ledger):
+            streamed = all_coins_avg("convert", "buy", chunksize=100)
+        expected = all_coins_avg(self.csv, "buy")
+        pd.testing.assert_frame_equal(
+            streamed.sort_index(), expected.sort_index(), check_exact=False
+        )
+
+    def test_fiat_sides_from_the_ledger(self):
+        ledger = Path(self.tmp.name) / "ledger"
+        fiat = pd.DataFrame(
+            {
+                "id": ["f1"],
+                "dt": [1_700_000_000_000],
+                "side": ["SELL"],
+                "status": ["Completed"],
+                "from_asset": ["USDC"],
+                "from_amount": [101.0],
+                "to_asset": ["USDT"],
+                "to_amount": [100.0],
+                "price": [1.01],
+                "fee_cost": [0.5],
+            }
+        )
+        csv = str(Path(self.tmp.name) / "fiat.csv")
+        fiat.to_csv(csv, index=False)
+        append_ledger(fiat, "fiat", keys=["id"], path=ledger)
+        with mock.patch("tools.ledger_store.LEDGER_DIR", ledger):
+            valued = add_usd_prices("fiat")
+            for side in ("buy", "sell"):
+                pd.testing.assert_frame_equal(
+                    all_coins_avg("fiat", side), all_coins_avg(csv, side)
+                )
+        self.assertEqual(set(valued.columns), set(fiat.columns) | {"price_in_usd"})
+
+
+class TestUsdValue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+        def fetch(symbol, interval, start, end, limit):
+            # BTC trades at 100, nothing is listed for XYZ
+            if symbol != "BTCUSDT":
+                return []
+            first = -(-start // 1000) * 1000
+            return [[first, "0", "100", "100"]]
+
+        self.store = PriceStore(Path(self.tmp.name) / "prices.sqlite", fetch=fetch)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_unpriced_rows_are_nan(self):
+        df = pd.DataFrame(
+            {
+                "dt": [1_700_000_000_000, 1_700_000_060_000, 1_700_000_120_000],
+                "from_asset": ["BTC", "XYZ", "USDT"],
+                "from_amount": [0.5, 3.0, 20.0],
+                "to_asset": ["ETH", "ETH", "BTC"],
+                "to_amount": [10.0, 1.0, 0.2],
+            }
+        )
+        self.assertEqual(
+            list(self.store.load_prices("XYZUSDT", df["dt"]).dtypes),
+            [np.int64, np.float64],
+        )
+        with mock.patch("tools.price_cache._store", self.store):
+            df = _usd_convert_value(df)
+        self.assertEqual(df["usd_value"][0], 50.0)
+        self.assertTrue(np.isnan(df["usd_value"][1]))
+        self.assertEqual(df["usd_value"][2], 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
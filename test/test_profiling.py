@@ -0,0 +1,78 @@
+import json
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append("..")
+
+from tools.process_csv import all_coins_avg
+from tools.profiling import profiling, stage
+
+MIB = 2**20
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_peaks_are_attributed_to_open_stages(self):
+        with profiling() as profiler:
+            with stage("outer"):
+                with stage("inner"):
+                    buffer = bytearray(20 * MIB)
+                    del buffer
+                with stage("light"):
+                    pass
+        stages = profiler.report()["stages"]
+        self.assertGreaterEqual(stages["inner"]["memory_increase_mb"], 20)
+        self.assertGreaterEqual(stages["outer"]["memory_increase_mb"], 20)
+        self.assertLess(stages["light"]["memory_increase_mb"], 1)
+        self.assertEqual(stages["outer"]["calls"], 1)
+
+    def test_pipeline_stages_and_outputs(self):
+        csv = self.dir / "convert.csv"
+        pd.DataFrame(
+            {
+                "dt": [1, 2],
+                "from_asset": ["USDT", "USDT"],
+                "from_amount": [10.0, 20.0],
+                "to_asset": ["BTC", "ETH"],
+                "to_amount": [1.0, 2.0],
+            }
+        ).to_csv(csv, index=False)
+        report_path = self.dir / "report.json"
+        with profiling(
+            report_path,
+            cprofile_path=self.dir / "run.prof",
+            collapsed_path=self.dir / "run.folded",
+            sample_interval=0.001,
+            label="test",
+        ):
+            for _ in range(2):
+                all_coins_avg(str(csv), "buy")
+            time.sleep(0.02)
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report["label"], "test")
+        self.assertEqual(set(report["stages"]), {"load", "value", "aggregate"})
+        self.assertEqual(report["stages"]["load"]["calls"], 2)
+        self.assertGreater(pstats.Stats(str(self.dir / "run.prof")).total_calls, 0)
+        with open(self.dir / "run.folded") as stacks_file:
+            self.assertRegex(stacks_file.readline(), r"^\S+(;\S+)* \d+$")
+
+    def test_stages_are_free_when_profiling_is_off(self):
+        self.assertIs(stage("a"), stage("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
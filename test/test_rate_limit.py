@@ -0,0 +1,46 @@
+import sys
+import unittest
+
+sys.path.append("..")
+
+from tools.rate_limit import ENDPOINT_WEIGHTS, RateLimiter
+
+WITHDRAWALS = "/sapi/v1/capital/withdraw/history"
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(
+            limits={"api": 100},
+            weights={"/api/v3/myTrades": ("api", 20)},
+            safety_margin=1.0,
+        )
+
+    def test_weight_is_drawn_per_endpoint(self):
+        for _ in range(5):
+            self.assertEqual(self.limiter._wait_time("/api/v3/myTrades"), 0)
+        self.assertGreater(self.limiter._wait_time("/api/v3/myTrades"), 0)
+
+    def test_bucket_follows_server_used_weight(self):
+        self.limiter.update({"X-MBX-USED-WEIGHT-1M": "90"}, 200)
+        self.assertGreater(self.limiter._wait_time("/api/v3/myTrades"), 0)
+
+    def test_retry_after_blocks_every_request(self):
+        retry_after = self.limiter.update({"Retry-After": "30"}, 429)
+        self.assertEqual(retry_after, 30)
+        self.assertGreater(self.limiter._wait_time("/api/v3/myTrades"), 29)
+        self.assertIsNone(self.limiter.update({}, 200))
+
+    def test_withdrawals_draw_from_a_per_second_pool(self):
+        limiter = RateLimiter(safety_margin=1.0)
+        for _ in range(10):
+            self.assertEqual(limiter._wait_time(WITHDRAWALS), 0)
+        self.assertLessEqual(limiter._wait_time(WITHDRAWALS), 0.1)
+        pool, _ = ENDPOINT_WEIGHTS[WITHDRAWALS]
+        self.assertEqual(limiter.buckets["sapi_uid"].tokens, 180_000)
+        self.assertEqual(limiter.buckets[pool].rate, 180_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
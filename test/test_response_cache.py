@@ -0,0 +1,80 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.append("..")
+
+from tools.response_cache import REPLAY_MISS, ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.closed = {"startTime": 1_000, "endTime": 2_000, "timestamp": 1}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_ignores_timestamp_and_signature(self):
+        signed = {**self.closed, "timestamp": 5, "signature": "abc"}
+        self.assertEqual(
+            ResponseCache.key("/x", self.closed), ResponseCache.key("/x", signed)
+        )
+        self.assertNotEqual(
+            ResponseCache.key("/x", self.closed), ResponseCache.key("/y", self.closed)
+        )
+
+    def test_closed_windows_never_expire(self):
+        cache = ResponseCache(self.dir, mode="record", ttl=-1)
+        cache.store("GET", "/x", self.closed, [1, 2])
+        cache.store("GET", "/x", {"startTime": 1_000}, [3])
+        self.assertEqual(cache.lookup("GET", "/x", self.closed), [1, 2])
+        self.assertIsNone(cache.lookup("GET", "/x", {"startTime": 1_000}))
+
+    def test_identical_responses_share_a_blob(self):
+        cache = ResponseCache(self.dir, mode="record")
+        cache.store("GET", "/x", self.closed, [])
+        cache.store("GET", "/y", self.closed, [])
+        self.assertEqual(len(list((self.dir / "blobs").rglob("*.gz"))), 1)
+
+    def test_errors_are_not_cached(self):
+        cache = ResponseCache(self.dir, mode="record")
+        cache.store("GET", "/x", self.closed, {"code": -1003, "msg": "Too many."})
+        self.assertIsNone(cache.lookup("GET", "/x", self.closed))
+
+    def test_replay_miss_returns_error(self):
+        cache = ResponseCache(self.dir, mode="replay")
+        response = cache.lookup("GET", "/x", {"endTime": int(time.time() * 1000)})
+        self.assertEqual(response["code"], REPLAY_MISS)
+        # Live data is never recorded, so it is never sent either
+        for url_path in ("/api/v3/time", "/api/v3/ticker/price"):
+            self.assertEqual(cache.lookup("GET", url_path, {})["code"], REPLAY_MISS)
+        record = ResponseCache(self.dir, mode="record")
+        self.assertIsNone(record.lookup("GET", "/api/v3/ticker/price", {}))
+
+    def test_open_windows_ignore_their_end_time(self):
+        now = int(time.time() * 1000)
+        cache = ResponseCache(self.dir, mode="record")
+        cache.store("GET", "/x", {"startTime": 1_000, "endTime": now}, [1])
+        later = {"startTime": 1_000, "endTime": now + 5_000}
+        self.assertEqual(cache.lookup("GET", "/x", later), [1])
+        # Expired open windows are still replayed
+        replay = ResponseCache(self.dir, mode="replay", ttl=-1)
+        self.assertEqual(replay.lookup("GET", "/x", later), [1])
+        expired = ResponseCache(self.dir, mode="record", ttl=-1)
+        expired.store("GET", "/y", later, [2])
+        self.assertIsNone(expired.lookup("GET", "/y", later))
+
+    def test_off_mode_is_a_no_op(self):
+        cache = ResponseCache(self.dir, mode="off")
+        cache.store("GET", "/x", self.closed, [1])
+        self.assertIsNone(cache.lookup("GET", "/x", self.closed))
+        self.assertFalse(self.dir.joinpath("refs").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
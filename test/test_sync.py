@@ -0,0 +1,223 @@
+import bisect
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.append("..")
+
+from test.mock_exchange import MockExchangeTestCase
+from tools.decode import decode_page
+from tools.ledger_store import (
+    TRADE_KEYS,
+    LedgerAccumulator,
+    append_ledger,
+    read_ledger,
+    write_ledger,
+)
+from tools.response_cache import ResponseCache
+from tools.sync import sync_trades, sync_transactions
+from tools.sync_state import SyncState
+
+
+class TestIncrementalSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_skips_stored_transactions(self):
+        ledger = self.dir / "ledger"
+        first = pd.DataFrame(
+            {
+                "id": [1, 2],
+                "dt": ["2024-01-01 10:00:00", "2024-02-01 10:00:00"],
+                "from_amount": ["1.50000000", "2.00000000"],
+                "from_asset": ["BTC", "ETH"],
+            }
+        )
+        second = pd.DataFrame(
+            {
+                "id": [2, 3],
+                "dt": ["2024-02-01 10:00:00", "2024-03-01 10:00:00"],
+                "from_amount": ["2.00000000", "3.00000000"],
+                "from_asset": ["ETH", "BTC"],
+            }
+        )
+        append_ledger(first, "convert", keys=["id"], path=ledger)
+        appended = append_ledger(second, "convert", keys=["id"], path=ledger)
+        self.assertEqual(list(appended["id"]), [3])
+        stored = read_ledger("convert", path=ledger).sort_values("dt")
+        self.assertEqual(list(stored["id"]), ["1", "2", "3"])
+        self.assertEqual(list(stored["from_amount"]), [1.5, 2.0, 3.0])
+
+    def test_read_pushes_down_time_range(self):
+        ledger = self.dir / "ledger"
+        df = pd.DataFrame(
+            {
+                "id": [1, 2, 3],
+                "dt": [1704103200000, 1706781600000, 1709287200000],
+                "to_asset": ["BTC", "ETH", "BTC"],
+            }
+        )
+        write_ledger(df, "deposit", path=ledger)
+        stored = read_ledger(
+            "deposit",
+            columns=["id", "to_asset"],
+            start=1706000000000,
+            end=1709000000000,
+            path=ledger,
+        )
+        self.assertEqual(list(stored.columns), ["id", "to_asset"])
+        self.assertEqual(list(stored["id"]), ["2"])
+
+    def test_cursors_persist_per_symbol(self):
+        path = self.dir / "sync_state.json"
+        SyncState(path).update("trade", "BTCUSDT", id=42)
+        state = SyncState(path)
+        self.assertEqual(state.get("trade", "BTCUSDT"), {"id": 42})
+        self.assertIsNone(state.get("trade", "ETHUSDT"))
+
+    def test_accumulator_dedups_overlapping_pages(self):
+        accumulator = LedgerAccumulator("convert", keys=["id"])
+        accumulator.add(pd.DataFrame({"id": ["2", "1"], "dt": [20, 10]}))
+        accumulator.add(pd.DataFrame())
+        accumulator.add(pd.DataFrame({"id": ["2", "3", "4"], "dt": [20, 20, 5]}))
+        self.assertEqual(len(accumulator), 5)
+        assembled = accumulator.assemble()
+        self.assertEqual(list(assembled["id"]), ["4", "1", "2", "3"])
+        self.assertEqual(list(assembled.index), [0, 1, 2, 3])
+
+    def test_fills_of_one_order_are_kept_apart(self):
+        fill = {
+            "symbol": "BTCUSDT",
+            "id": 7,
+            "orderId": 70,
+            "qty": "0.1",
+            "quoteQty": "4000",
+            "commission": "0.0001",
+            "commissionAsset": "BTC",
+            "time": 1_700_000_000_100,
+            "isBuyer": True,
+        }
+        # Two fills of the same order, in the same second, with the same qty
+        page = decode_page(
+            [fill, {**fill, "id": 8, "time": 1_700_000_000_900}], "trade"
+        )
+        accumulator = LedgerAccumulator("trade", keys=TRADE_KEYS)
+        accumulator.add(page)
+        accumulator.add(page)
+        self.assertEqual(list(accumulator.assemble()["trade_id"]), ["7", "8"])
+        ledger = self.dir / "ledger"
+        self.assertEqual(len(append_ledger(page, "trade", TRADE_KEYS, ledger)), 2)
+        self.assertTrue(append_ledger(page, "trade", TRADE_KEYS, ledger).empty)
+
+    def test_error_payloads_keep_the_cursor(self):
+        state = SyncState(self.dir / "sync_state.json")
+        error = {"code": -1003, "msg": "Too many requests."}
+        with mock.patch.dict(
+            os.environ, {"BINANCE_API_KEY": "key", "BINANCE_SECRET_KEY": "secret"}
+        ), mock.patch(
+            "tools.async_request.send_signed_request_async", return_value=error
+        ):
+            for transaction_type in ("convert", "deposit", "withdraw", "fiat"):
+                with self.assertRaises(ValueError):
+                    sync_transactions(
+                        transaction_type, state=state, ledger_path=self.dir / "ledger"
+                    )
+                self.assertIsNone(state.get(transaction_type))
+
+    def test_failed_symbols_keep_their_cursor(self):
+        state = SyncState(self.dir / "sync_state.json")
+        trade = {
+            "symbol": "BTCUSDT",
+            "id": 7,
+            "orderId": 70,
+            "qty": "0.1",
+            "quoteQty": "4000",
+            "commission": "0.0001",
+            "commissionAsset": "BTC",
+            "time": 1_700_000_000_100,
+            "isBuyer": True,
+        }
+
+        async def send(session, method, endpoint, params):
+            if params["symbol"] == "BTCUSDT":
+                return [trade]
+            return {"code": -1003, "msg": "Too many requests."}
+
+        ledger = self.dir / "ledger"
+        with mock.patch.dict(
+            os.environ, {"BINANCE_API_KEY": "key", "BINANCE_SECRET_KEY": "secret"}
+        ), mock.patch("tools.sync.send_signed_request_async", send):
+            with self.assertRaisesRegex(ValueError, "ETHUSDT"):
+                sync_trades(["BTCUSDT", "ETHUSDT"], state=state, ledger_path=ledger)
+        self.assertEqual(state.get("trade", "BTCUSDT")["id"], 7)
+        self.assertIsNone(state.get("trade", "ETHUSDT"))
+        self.assertEqual(list(read_ledger("trade", path=ledger)["trade_id"]), ["7"])
+
+
+class TestResumedSync(MockExchangeTestCase):
+
+    exchange_options = {"assets": ["BTC", "ETH"], "deposits": 5, "days": 10}
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.state = SyncState(self.dir / "sync_state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, state=None, ledger="ledger"):
+        start = (datetime.now() - timedelta(days=11)).strftime("%d-%m-%Y")
+        return sync_transactions(
+            "deposit",
+            start,
+            state=state or self.state,
+            ledger_path=self.dir / ledger,
+        )
+
+    def test_recorded_sync_replays_offline(self):
+        cache = self.dir / "cache"
+        with mock.patch(
+            "tools.response_cache._cache", ResponseCache(cache, mode="record")
+        ):
+            recorded = self.sync()
+        requests = self.exchange.requests
+        with mock.patch(
+            "tools.response_cache._cache", ResponseCache(cache, mode="replay")
+        ):
+            replayed = self.sync(SyncState(self.dir / "replay.json"), "replay")
+        self.assertEqual(self.exchange.requests, requests)
+        pd.testing.assert_frame_equal(replayed, recorded)
+
+    def test_late_deposit_is_picked_up(self):
+        self.assertEqual(len(self.sync()), 5)
+        # A deposit pending at the last sync is listed once credited, at the
+        # time it was made
+        times, records = self.exchange.history["deposit"]
+        late = {
+            **records[-1],
+            "id": "1",
+            "insertTime": self.state.get("deposit")["time"] - 60_000,
+        }
+        index = bisect.bisect(times, late["insertTime"])
+        times.insert(index, late["insertTime"])
+        records.insert(index, late)
+        appended = self.sync()
+        self.assertEqual(list(appended["id"]), ["1"])
+        self.assertEqual(len(read_ledger("deposit", path=self.dir / "ledger")), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
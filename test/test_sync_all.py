@@ -0,0 +1,78 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.append("..")
+
+from test.mock_exchange import MockExchangeTestCase
+from tools.ledger_store import read_ledger
+from tools.sync_all import SyncOrchestrator
+from tools.sync_state import SyncState
+
+
+class TestSyncOrchestrator(MockExchangeTestCase):
+
+    exchange_options = {
+        "assets": ["BTC", "ETH"],
+        "trades_per_symbol": 30,
+        "converts": 20,
+        "deposits": 10,
+        "withdrawals": 10,
+        "fiat_payments": 10,
+        "days": 60,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        # Keep to one window of each endpoint
+        self.start = (datetime.now() - timedelta(days=61)).strftime("%d-%m-%Y")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def orchestrator(self, **kwargs):
+        return SyncOrchestrator(
+            start=self.start,
+            state=SyncState(self.dir / "state.json"),
+            ledger_path=self.dir / "ledger",
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_every_stage_lands_in_one_ledger(self):
+        report = self.orchestrator(symbols=["BTCUSDT", "ETHUSDT"]).run()
+        for stage, stats in report["stages"].items():
+            self.assertEqual(stats["status"], "done", stage)
+            self.assertGreater(stats["requests"], 0, stage)
+        ledger = read_ledger(path=self.dir / "ledger")
+        counts = ledger["transaction_type"].value_counts()
+        self.assertEqual(counts["trade"], 60)
+        self.assertEqual(counts["convert"], 20)
+        self.assertEqual(report["rows"], len(ledger))
+        # A second run resumes from the cursors and appends nothing
+        self.assertEqual(
+            self.orchestrator(symbols=["BTCUSDT", "ETHUSDT"]).run()["rows"], 0
+        )
+
+    def test_failed_stage_does_not_stop_the_others(self):
+        with mock.patch(
+            "tools.sync_all.sync_transactions_async", side_effect=OSError("down")
+        ):
+            report = self.orchestrator(
+                stages=["trade", "deposit"], symbols=["BTCUSDT"]
+            ).run()
+        self.assertEqual(report["stages"]["deposit"]["status"], "failed")
+        self.assertEqual(report["stages"]["trade"]["rows"], 30)
+
+    def test_invalid_stage(self):
+        with self.assertRaises(ValueError):
+            self.orchestrator(stages=["margin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append("..")
+
+from test.mock_exchange import MockExchangeTestCase
+from tools.ledger_store import read_ledger
+from tools.sync_state import SyncState
+from tools.user_stream import UserStream, normalize_execution
+
+
+class TestUserStream(MockExchangeTestCase):
+
+    exchange_options = {"assets": ["BTC"], "trades_per_symbol": 20}
+    base_url_targets = MockExchangeTestCase.base_url_targets + [
+        "tools.user_stream.BASE_URL"
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.patch(mock.patch("tools.user_stream.STREAM_URL", self.ws_url))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.stream = UserStream(
+            symbols=["BTCUSDT"],
+            state=SyncState(self.dir / "state.json"),
+            ledger_path=self.dir / "ledger",
+            flush_interval=0.1,
+        )
+        self.loop = asyncio.new_event_loop()
+        self.stop = asyncio.Event()
+        self.thread = threading.Thread(
+            target=self.loop.run_until_complete, args=(self.stream.run(self.stop),)
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join()
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+    def trades(self):
+        return read_ledger("trade", path=self.dir / "ledger")
+
+    def test_fills_are_appended_and_gaps_caught_up(self):
+        self.wait_for(lambda: len(self.trades()) == 20)
+        self.server.run(self.exchange.fill("BTCUSDT"))
+        self.wait_for(lambda: len(self.trades()) == 21)
+        self.assertEqual(self.stream.fills, 1)
+        # A fill missed while disconnected is caught up through REST
+        self.server.run(self.exchange.disconnect())
+        trade = self.server.run(self.exchange.fill("BTCUSDT"))
+        self.wait_for(lambda: len(self.trades()) == 22)
+        self.assertEqual(self.stream.state.get("trade", "BTCUSDT")["id"], trade["id"])
+
+    def test_normalized_fill_matches_rest_trade(self):
+        self.wait_for(lambda: self.stream.connections == 1)
+        trade = self.server.run(self.exchange.fill("BTCUSDT"))
+        self.wait_for(lambda: len(self.trades()) == 21)
+        stored = self.trades().sort_values("dt").iloc[-1]
+        self.assertEqual(stored["id"], str(trade["orderId"]))
+        self.assertEqual(stored["amount"], float(trade["qty"]))
+        self.assertEqual(stored["side"], "BUY" if trade["isBuyer"] else "SELL")
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_execution_report(self):
+        event = {
+            "t": 7,
+            "i": 70,
+            "T": 1_700_000_000_000,
+            "s": "BTCUSDT",
+            "l": "0.5",
+            "Y": "10",
+            "n": "0.001",
+            "N": "BNB",
+            "S": "SELL",
+        }
+        trade = normalize_execution(event)
+        self.assertEqual(trade["orderId"], 70)
+        self.assertFalse(trade["isBuyer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
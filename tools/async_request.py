@@ -0,0 +1,224 @@
+import asyncio
+import aiohttp
+import time
+import ujson
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from tools.metrics import get_metrics
+from tools.moving_window import MIN_SPAN, is_full, plan_windows, split_window
+from tools.rate_limit import MAX_ATTEMPTS, MAX_RETRY_AFTER, get_rate_limiter
+from tools.response_cache import get_response_cache, is_error
+from tools.send_request import (
+    BASE_URL,
+    TIME_ENDPOINT,
+    TIMESTAMP_ERROR,
+    api_headers,
+    build_signed_query,
+    set_payload,
+    set_time_offset,
+    to_milliseconds,
+)
+
+MAX_CONCURRENCY = 8
+
+
+def create_session(max_concurrency: int = MAX_CONCURRENCY) -> aiohttp.ClientSession:
+    """
+    Create an aiohttp session configured for the Binance API.
+
+    Args:
+        max_concurrency (int, optional): The maximum number of open connections.
+            Defaults to MAX_CONCURRENCY.
+
+    Returns:
+        aiohttp.ClientSession: The session, to be used as an async context manager.
+    """
+    return aiohttp.ClientSession(
+        headers=api_headers(),
+        connector=aiohttp.TCPConnector(limit=max_concurrency),
+    )
+
+
+async def _send_async(
+    session: aiohttp.ClientSession,
+    http_method: str,
+    url_path: str,
+    build_url: Callable[[], str],
+) -> Any:
+    """
+    Send a request through the rate limiter, retrying when rate limited.
+
+    Args:
+        session (aiohttp.ClientSession): The session used to send the request.
+        http_method (str): The HTTP method (GET, POST, PUT, DELETE).
+        url_path (str): The URL path for the request.
+        build_url (Callable[[], str]): Builds the full URL of each attempt, so
+            signed requests get a fresh timestamp.
+
+    Returns:
+        Any: The decoded response from the API.
+    """
+    limiter = get_rate_limiter()
+    metrics = get_metrics()
+    for attempt in range(MAX_ATTEMPTS):
+        await limiter.acquire_async(url_path)
+        sent = time.perf_counter()
+        async with session.request(http_method, build_url()) as response:
+            body = await response.read()
+        received = time.perf_counter()
+        data = ujson.loads(body) if body.strip() else None
+        if metrics.enabled:
+            metrics.record(
+                url_path,
+                response.status,
+                received - sent,
+                len(body),
+                time.perf_counter() - received,
+                response.headers,
+                attempt,
+                data,
+            )
+        retry_after = limiter.update(response.headers, response.status)
+        # Retry once the limiter has waited out Retry-After, unless it is too long
+        if retry_after is None or retry_after > MAX_RETRY_AFTER:
+            break
+    return data
+
+
+async def sync_server_time_async(session: aiohttp.ClientSession) -> None:
+    """
+    Fetch the server time and cache its offset to the local clock.
+
+    Args:
+        session (aiohttp.ClientSession): The session used to send the request.
+    """
+    sent = int(time.time() * 1000)
+    response = await send_public_request_async(session, TIME_ENDPOINT)
+    set_time_offset(response["serverTime"], sent, int(time.time() * 1000))
+
+
+async def send_signed_request_async(
+    session: aiohttp.ClientSession,
+    http_method: str,
+    url_path: str,
+    payload: Dict[str, Any] = {},
+) -> Dict[str, Any]:
+    """
+    Send a signed request to the Binance API asynchronously.
+
+    Args:
+        session (aiohttp.ClientSession): The session used to send the request.
+        http_method (str): The HTTP method (GET, POST, PUT, DELETE).
+        url_path (str): The URL path for the request.
+        payload (Dict[str, Any], optional): The payload for the request. Defaults to {}.
+
+    Returns:
+        Dict[str, Any]: The response from the API.
+    """
+    cache = get_response_cache()
+    if (response := cache.lookup(http_method, url_path, payload)) is not None:
+        return response
+    build_url = lambda: BASE_URL + url_path + "?" + build_signed_query(payload)
+    response = await _send_async(session, http_method, url_path, build_url)
+    if isinstance(response, dict) and response.get("code") == TIMESTAMP_ERROR:
+        # The local clock drifted from the server's: resync it once and retry
+        await sync_server_time_async(session)
+        response = await _send_async(session, http_method, url_path, build_url)
+    cache.store(http_method, url_path, payload, response)
+    return response
+
+
+async def send_public_request_async(
+    session: aiohttp.ClientSession, url_path: str, payload: Dict[str, Any] = {}
+) -> Dict[str, Any]:
+    """
+    Send a public request to the Binance API asynchronously.
+
+    Args:
+        session (aiohttp.ClientSession): The session used to send the request.
+        url_path (str): The URL path for the request.
+        payload (Dict[str, Any], optional): The payload for the request. Defaults to {}.
+
+    Returns:
+        Dict[str, Any]: The response from the API.
+    """
+    cache = get_response_cache()
+    if (response := cache.lookup("GET", url_path, payload)) is not None:
+        return response
+    query_str = urlencode(payload, True)
+    url = BASE_URL + url_path
+    if query_str:
+        url = url + "?" + query_str
+    response = await _send_async(session, "GET", url_path, lambda: url)
+    cache.store("GET", url_path, payload, response)
+    return response
+
+
+async def fetch_windows(
+    endpoint: str,
+    start: str | int,
+    end: str | int,
+    session: Optional[aiohttp.ClientSession] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    decode: Optional[Callable[[Any], Any]] = None,
+    **kwargs: Any,
+) -> List[Any]:
+    """
+    Fetch every window of a time range concurrently.
+
+    The range is planned into the widest windows the endpoint accepts. A window
+    whose response fills a whole page may have been truncated, so it is split
+    in two and both halves are fetched again, recursively. The signature of
+    each request is computed once a slot is acquired so that queued windows do
+    not expire against the server's recvWindow. An error payload, e.g. once
+    the rate limit or clock resync retries are exhausted, fails the whole
+    fetch rather than passing for an empty window.
+
+    Args:
+        endpoint (str): The endpoint URL path.
+        start (str | int): The start of the range, as a day-first date string
+            or a timestamp in milliseconds.
+        end (str | int): The end of the range (inclusive).
+        session (aiohttp.ClientSession, optional): A session to reuse. A new one
+            is opened and closed around the fetch if omitted.
+        semaphore (asyncio.Semaphore, optional): Bounds the number of requests in
+            flight. Share one between calls to bound their combined fan-out.
+        decode (Callable[[Any], Any], optional): Applied to each response as
+            soon as it is complete, so that only its result is kept.
+        **kwargs (Any): Additional keyword arguments passed to set_payload.
+
+    Returns:
+        List[Any]: The responses, or their decoded results, in window order.
+
+    Raises:
+        ValueError: If a window is answered with an error payload.
+    """
+    if session is None:
+        async with create_session() as session:
+            return await fetch_windows(
+                endpoint,
+                start,
+                end,
+                session=session,
+                semaphore=semaphore,
+                decode=decode,
+                **kwargs,
+            )
+
+    semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def fetch(window: Tuple[int, int]) -> List[Any]:
+        params = set_payload(endpoint, start=window[0], end=window[1], **kwargs)
+        async with semaphore:
+            response = await send_signed_request_async(session, "GET", endpoint, params)
+        if is_error(response):
+            raise ValueError(f"Error fetching {endpoint} {window}: {response}")
+        if is_full(endpoint, response) and window[1] - window[0] > MIN_SPAN:
+            halves = await asyncio.gather(*map(fetch, split_window(window)))
+            return halves[0] + halves[1]
+        return [decode(response) if decode is not None else response]
+
+    windows = plan_windows(endpoint, to_milliseconds(start), to_milliseconds(end))
+    responses = await asyncio.gather(*map(fetch, windows))
+    return [response for window in responses for response in window]
@@ -0,0 +1,282 @@
+from array import array
+from pathlib import Path
+from typing import List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.ledger_store import read_ledger
+from tools.live_prices import get_price_service
+from tools.process_csv import _lookup_usdt_prices, _usd_convert_value
+from tools.symbols import QUOTE_ASSETS
+
+METHODS = ("fifo", "lifo", "average")
+FILL_COLUMNS = ["dt", "asset", "qty", "value", "source"]
+
+
+def _is_cash(assets: pd.Series) -> pd.Series:
+    # USD and stablecoins are the unit of account, not positions
+    return assets.astype(str).str.contains("USD")
+
+
+def _fills(dt, asset, qty, value, source: str) -> pd.DataFrame:
+    fills = pd.DataFrame(
+        {
+            "dt": np.asarray(dt, dtype="int64"),
+            "asset": np.asarray(asset, dtype=object).astype(str),
+            "qty": np.asarray(qty, dtype=float),
+            "value": np.asarray(value, dtype=float),
+            "source": source,
+        }
+    )
+    return fills[~_is_cash(fills["asset"])]
+
+
+def _trade_fills(trades: pd.DataFrame) -> pd.DataFrame:
+    pairs = trades["pair"].astype(str)
+    base = pd.Series(None, index=trades.index, dtype=object)
+    for quote in QUOTE_ASSETS:
+        quoted = pairs.str.endswith(quote) & base.isna()
+        base[quoted] = pairs[quoted].str[: -len(quote)]
+    trades = trades.assign(base=base)[base.notna()]
+    sign = np.where(trades["side"].astype(str) == "SELL", -1.0, 1.0)
+    return _fills(
+        trades["dt"], trades["base"], sign * trades["amount"], trades["value"], "trade"
+    )
+
+
+def _convert_fills(converts: pd.DataFrame) -> pd.DataFrame:
+    converts = _usd_convert_value(converts)
+    disposed = _fills(
+        converts["dt"],
+        converts["from_asset"],
+        -converts["from_amount"],
+        converts["usd_value"],
+        "convert",
+    )
+    acquired = _fills(
+        converts["dt"],
+        converts["to_asset"],
+        converts["to_amount"],
+        converts["usd_value"],
+        "convert",
+    )
+    return pd.concat([disposed, acquired])
+
+
+def _fiat_fills(payments: pd.DataFrame) -> pd.DataFrame:
+    rate = pd.Series(1.0, index=payments.index)
+    foreign = ~_is_cash(payments["from_asset"])
+    if foreign.any():
+        rate[foreign] = _lookup_usdt_prices(
+            payments.loc[foreign, "from_asset"].astype(str) + "USDT",
+            payments.loc[foreign, "dt"],
+        )
+    # The crypto is bought with fiat (side 0) or sold for fiat (side 1)
+    sign = np.where(payments["side"].astype(str) == "SELL", -1.0, 1.0)
+    return _fills(
+        payments["dt"],
+        payments["to_asset"],
+        sign * payments["to_amount"],
+        payments["from_amount"] * rate,
+        "fiat",
+    )
+
+
+def load_fills(
+    start: Optional[str | int] = None,
+    end: Optional[str | int] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Load the acquisitions and disposals of every asset from the ledger.
+
+    Trades, converts and fiat payments are flattened into one fill per asset
+    moved, valued in USD. Legs in USD or stablecoins are left out, since they
+    are the unit of account. Deposits and withdrawals move assets without
+    changing their cost, so they are not fills.
+
+    Args:
+        start (str | int, optional): The start of the range (inclusive).
+        end (str | int, optional): The end of the range (exclusive).
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The fills, with their time in milliseconds, asset, signed
+        quantity (positive when acquired), USD value and transaction type.
+    """
+    frames = []
+    loaders = {"trade": _trade_fills, "convert": _convert_fills, "fiat": _fiat_fills}
+    for transaction_type, to_fills in loaders.items():
+        df = read_ledger(transaction_type, start=start, end=end, path=ledger_path)
+        if not df.empty:
+            frames.append(to_fills(df))
+    if not frames:
+        return pd.DataFrame(columns=FILL_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _match_lots(
+    qty: List[float], value: List[float], method: str
+) -> Tuple[array, float, float]:
+    """
+    Run the lot queue of one asset over its fills, in time order.
+
+    Lots are held in two preallocated arrays (quantity and unit cost), consumed
+    from the head for FIFO and from the tail for LIFO. Average cost only keeps
+    the running quantity and cost. Disposals exceeding the quantity held (e.g.
+    deposited coins) have a cost basis of zero.
+
+    Args:
+        qty (List[float]): The signed quantity of each fill.
+        value (List[float]): The USD value of each fill.
+        method (str): One of METHODS.
+
+    Returns:
+        Tuple[array, float, float]: The cost basis of each fill (0 for
+        acquisitions), and the quantity and cost still held.
+    """
+    n = len(qty)
+    basis = array("d", bytes(8 * n))
+    lot_qty = array("d", bytes(8 * n))
+    lot_cost = array("d", bytes(8 * n))
+    head = tail = 0
+    held_qty = held_cost = 0.0
+    for i in range(n):
+        q = qty[i]
+        if q > 0:
+            if method == "average":
+                held_qty += q
+                held_cost += value[i]
+            else:
+                lot_qty[tail] = q
+                lot_cost[tail] = value[i] / q
+                tail += 1
+            continue
+        remaining = -q
+        cost = 0.0
+        if method == "average":
+            if held_qty > 0:
+                matched = min(remaining, held_qty)
+                cost = held_cost * matched / held_qty
+                held_qty -= matched
+                held_cost -= cost
+        elif method == "fifo":
+            while remaining > 0 and head < tail:
+                if remaining >= lot_qty[head]:
+                    cost += lot_qty[head] * lot_cost[head]
+                    remaining -= lot_qty[head]
+                    head += 1
+                else:
+                    cost += remaining * lot_cost[head]
+                    lot_qty[head] -= remaining
+                    remaining = 0.0
+        else:
+            while remaining > 0 and tail > head:
+                if remaining >= lot_qty[tail - 1]:
+                    cost += lot_qty[tail - 1] * lot_cost[tail - 1]
+                    remaining -= lot_qty[tail - 1]
+                    tail -= 1
+                else:
+                    cost += remaining * lot_cost[tail - 1]
+                    lot_qty[tail - 1] -= remaining
+                    remaining = 0.0
+        basis[i] = cost
+    if method != "average":
+        lots = np.frombuffer(lot_qty, count=tail)[head:]
+        held_qty = float(lots.sum())
+        held_cost = float(lots @ np.frombuffer(lot_cost, count=tail)[head:])
+    return basis, held_qty, held_cost
+
+
+def compute_cost_basis(
+    fills: pd.DataFrame, method: str = "fifo"
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compute the cost basis and realized PnL of every disposal.
+
+    Fills are sorted once by asset and time, then each asset's slice runs
+    through its lot queue.
+
+    Args:
+        fills (pd.DataFrame): The fills, as returned by load_fills.
+        method (str, optional): One of METHODS. Defaults to "fifo".
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The disposals with their proceeds,
+        cost basis and realized PnL, and the quantity, cost and realized PnL of
+        each asset.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid cost basis method: {method}")
+    fills = fills.sort_values(["asset", "dt"], kind="stable", ignore_index=True)
+    qty = fills["qty"].to_numpy()
+    value = fills["value"].to_numpy()
+    assets = fills["asset"].to_numpy()
+    bounds = np.flatnonzero(assets[1:] != assets[:-1]) + 1
+    starts = np.r_[0, bounds] if len(fills) else []
+    ends = np.r_[bounds, len(fills)]
+    basis = np.zeros(len(fills))
+    positions = []
+    for start, end in zip(starts, ends):
+        group_basis, held_qty, held_cost = _match_lots(
+            qty[start:end].tolist(), value[start:end].tolist(), method
+        )
+        basis[start:end] = np.frombuffer(group_basis)
+        positions.append((assets[start], held_qty, held_cost))
+    disposed = qty < 0
+    disposals = fills[disposed].assign(
+        qty=-qty[disposed], proceeds=value[disposed], cost_basis=basis[disposed]
+    )
+    disposals["realized_pnl"] = disposals["proceeds"] - disposals["cost_basis"]
+    disposals = disposals.drop(columns="value").reset_index(drop=True)
+    positions = pd.DataFrame(positions, columns=["asset", "quantity", "cost"])
+    positions = positions.set_index("asset")
+    positions["realized_pnl"] = disposals.groupby("asset")["realized_pnl"].sum()
+    positions["realized_pnl"] = positions["realized_pnl"].fillna(0.0)
+    return disposals, positions
+
+
+def latest_usd_prices(assets: List[str]) -> pd.Series:
+    """
+    Get the latest USDT price of each asset from the shared price service.
+
+    Args:
+        assets (List[str]): The assets.
+
+    Returns:
+        pd.Series: The price of each asset, NaN if it has no USDT market.
+    """
+    service = get_price_service()
+    return pd.Series(service.prices(f"{asset}USDT" for asset in assets), index=assets)
+
+
+def portfolio_pnl(
+    method: str = "fifo",
+    prices: Optional[Mapping[str, float]] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Compute the realized and unrealized PnL of each asset over the whole ledger.
+
+    Args:
+        method (str, optional): One of METHODS. Defaults to "fifo".
+        prices (Mapping[str, float], optional): The current USD price of each
+            asset. Defaults to the latest prices from the API.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The quantity held, remaining cost, average cost, market
+        value, realized and unrealized PnL of each asset.
+    """
+    _, positions = compute_cost_basis(load_fills(ledger_path=ledger_path), method)
+    held = positions.index[positions["quantity"] > 0]
+    if prices is None:
+        prices = latest_usd_prices(list(held))
+    positions["price"] = pd.Series(prices, dtype=float).reindex(positions.index)
+    positions["avg_cost"] = positions["cost"] / positions["quantity"].where(
+        positions["quantity"] > 0
+    )
+    positions["market_value"] = positions["quantity"] * positions["price"]
+    positions["unrealized_pnl"] = positions["market_value"] - positions["cost"]
+    return positions
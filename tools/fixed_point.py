@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from decimal import Decimal
+from typing import Any, Iterator, Tuple
+
+# Binance quotes amounts with 8 decimals
+DEFAULT_DECIMALS = 8
+USD_DECIMALS = 8
+# Prices of small-cap coins need more decimals than amounts
+PRICE_DECIMALS = 12
+# Assets held in quantities too large for 8 decimals to fit in int64 units
+ASSET_DECIMALS = {
+    "1000SATS": 2,
+    "BONK": 2,
+    "BTTC": 2,
+    "FLOKI": 2,
+    "LUNC": 2,
+    "PEPE": 2,
+    "SHIB": 2,
+    "XEC": 2,
+}
+# Digits of the widest int64, and of the decimals parsed from strings
+INT64_DIGITS = 19
+PARSE_SCALE = 30
+# Integers above this are not all representable as float64
+FLOAT_EXACT = 2.0**53
+# A wrapped int64 sum is off by at least 2**64 from the float64 sum
+WRAP_TOLERANCE = 2.0**62
+
+
+def asset_decimals(assets: Any) -> np.ndarray:
+    """
+    Get the fixed-point precision of each asset.
+
+    Args:
+        assets (Any): The assets, e.g. a column of the ledger.
+
+    Returns:
+        np.ndarray: The number of decimals of each asset.
+    """
+    assets = np.asarray(assets, dtype=object)
+    decimals = np.full(len(assets), DEFAULT_DECIMALS, dtype=np.int64)
+    for asset, precision in ASSET_DECIMALS.items():
+        decimals[assets == asset] = precision
+    return decimals
+
+
+def _scales(n: int, *decimals: Any) -> Iterator[Tuple[Any, Tuple[int, ...]]]:
+    # The rows sharing each combination of decimals, so that every kernel call
+    # works on Arrow decimals of a single scale
+    if n == 0:
+        return
+    stacked = np.stack([np.broadcast_to(np.asarray(d, np.int64), n) for d in decimals])
+    if (stacked == stacked[:, :1]).all():
+        yield slice(None), tuple(int(d) for d in stacked[:, 0])
+        return
+    combinations, inverse = np.unique(stacked, axis=1, return_inverse=True)
+    for i in range(combinations.shape[1]):
+        yield inverse.ravel() == i, tuple(int(d) for d in combinations[:, i])
+
+
+def _decimal(units: np.ndarray, scale: int) -> pa.Array:
+    # Reinterpret int64 units as the unscaled values of 256-bit decimals,
+    # sign-extended over four little-endian words
+    units = np.ascontiguousarray(units, dtype=np.int64)
+    words = np.empty((len(units), 4), dtype=np.int64)
+    words[:, 0] = units
+    words[:, 1:] = (units >> 63)[:, None]
+    return pa.Array.from_buffers(
+        pa.decimal256(INT64_DIGITS, scale),
+        len(units),
+        [None, pa.py_buffer(words.tobytes())],
+    )
+
+
+def _shift(array: pa.Array, digits: int) -> pa.Array:
+    if digits == 0:
+        return array
+    power = pa.scalar(Decimal(10**digits), pa.decimal256(digits + 1, 0))
+    return pc.multiply(array, power)
+
+
+def _units(array: pa.Array, decimals: int) -> np.ndarray:
+    # Round half to even to the given decimals and extract the unscaled values
+    rounded = pc.round(array, ndigits=decimals, round_mode="half_to_even")
+    rounded = rounded.cast(pa.decimal256(76, decimals))
+    words = np.frombuffer(rounded.buffers()[1], dtype=np.int64).reshape(-1, 4)
+    words = words[rounded.offset : rounded.offset + len(rounded)]
+    if (words[:, 1:] != (words[:, :1] >> 63)).any():
+        raise OverflowError(f"Amount out of the int64 range at {decimals} decimals")
+    return words[:, 0].copy()
+
+
+def to_units(values: Any, decimals: Any) -> np.ndarray:
+    """
+    Parse amounts into int64 fixed-point units.
+
+    Decimal strings are parsed exactly, then rounded half to even to the given
+    decimals. Float columns, e.g. the ledger amounts, are scaled and rounded
+    directly while the units stay within the exact integers of a float64,
+    which gives the same units for values read from decimal strings of up to
+    the given decimals. Missing amounts are 0.
+
+    Args:
+        values (Any): The amounts, as decimal strings or numbers.
+        decimals (Any): The decimals of the units, for all rows or each row.
+
+    Returns:
+        np.ndarray: The amounts in units of 10**-decimals.
+    """
+    if np.asarray(values).dtype.kind == "f":
+        scaled = np.nan_to_num(np.asarray(values, dtype=np.float64))
+        scaled = scaled * 10.0 ** np.asarray(decimals)
+        if np.abs(scaled).max(initial=0) < FLOAT_EXACT:
+            return np.rint(scaled).astype(np.int64)
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed numbers and decimal strings
+        values = pd.Series(values, dtype=object).astype("string")
+        array = pa.array(values, from_pandas=True)
+    if not pa.types.is_string(array.type):
+        array = array.cast(pa.string())
+    array = pc.fill_null(array, "0").cast(pa.decimal256(76, PARSE_SCALE))
+    units = np.empty(len(array), dtype=np.int64)
+    for rows, (scale,) in _scales(len(array), decimals):
+        subset = array if isinstance(rows, slice) else array.filter(pa.array(rows))
+        units[rows] = _units(subset, scale)
+    return units
+
+
+def to_float(units: np.ndarray, decimals: Any) -> np.ndarray:
+    """
+    Convert fixed-point units to floats, for display.
+
+    Args:
+        units (np.ndarray): The amounts in units.
+        decimals (Any): The decimals of the units, for all rows or each row.
+
+    Returns:
+        np.ndarray: The amounts as floats.
+    """
+    return np.asarray(units, dtype=np.int64) / 10.0 ** np.asarray(decimals)
+
+
+def add(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Add amounts of the same decimals exactly.
+
+    Args:
+        a (np.ndarray): The first amounts, in units.
+        b (np.ndarray): The second amounts, in the same units.
+
+    Returns:
+        np.ndarray: The sums, in the same units.
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    total = a + b
+    # Wrapped around if both operands have the same sign and the sum does not
+    if (((a ^ total) & (b ^ total)) < 0).any():
+        raise OverflowError("Sum out of the int64 range")
+    return total
+
+
+def group_sum(units: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sum int64 units by index label, in order of first appearance.
+
+    Integer sums wrap around silently on overflow, so each sum is checked
+    against the same sum in float64, whose rounding error is far smaller than
+    the 2**64 a wrapped sum is off by.
+
+    Args:
+        units (pd.DataFrame): The int64 units, indexed by group.
+
+    Returns:
+        pd.DataFrame: The exact sums of each group.
+    """
+    totals = units.groupby(level=0, sort=False).sum()
+    approx = units.astype(np.float64).groupby(level=0, sort=False).sum()
+    if (np.abs(approx.to_numpy() - totals.to_numpy()) > WRAP_TOLERANCE).any():
+        raise OverflowError("Sum out of the int64 range")
+    return totals
+
+
+def multiply(
+    a: np.ndarray, a_decimals: Any, b: np.ndarray, b_decimals: Any, decimals: int
+) -> np.ndarray:
+    """
+    Multiply amounts exactly, rounding half to even to the given decimals.
+
+    The product is computed on 256-bit decimals, so it never overflows before
+    being rounded.
+
+    Args:
+        a (np.ndarray): The first amounts, in units.
+        a_decimals (Any): The decimals of a, for all rows or each row.
+        b (np.ndarray): The second amounts, in units.
+        b_decimals (Any): The decimals of b, for all rows or each row.
+        decimals (int): The decimals of the products.
+
+    Returns:
+        np.ndarray: The products, in units of 10**-decimals.
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    product = np.empty(len(a), dtype=np.int64)
+    for rows, (a_scale, b_scale) in _scales(len(a), a_decimals, b_decimals):
+        exact = pc.multiply(_decimal(a[rows], a_scale), _decimal(b[rows], b_scale))
+        product[rows] = _units(exact, decimals)
+    return product
+
+
+def divide(
+    a: np.ndarray, a_decimals: Any, b: np.ndarray, b_decimals: Any, decimals: int
+) -> np.ndarray:
+    """
+    Divide amounts, rounding the exact quotient half to even to the given
+    decimals.
+
+    Args:
+        a (np.ndarray): The dividends, in units.
+        a_decimals (Any): The decimals of a, for all rows or each row.
+        b (np.ndarray): The divisors, in units. None of them may be 0.
+        b_decimals (Any): The decimals of b, for all rows or each row.
+        decimals (int): The decimals of the quotients.
+
+    Returns:
+        np.ndarray: The quotients, in units of 10**-decimals.
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    if (b == 0).any():
+        raise ZeroDivisionError("Division of an amount by 0")
+    quotient = np.empty(len(a), dtype=np.int64)
+    for rows, (a_scale, b_scale) in _scales(len(a), a_decimals, b_decimals):
+        # Integer division of a * 10**shift by b gives the quotient in units.
+        # Arrow truncates it to more digits than b has, which is enough for
+        # rounding to the nearest integer to be exact.
+        shift = decimals + b_scale - a_scale
+        dividend = _shift(_decimal(a[rows], 0), max(shift, 0))
+        divisor = _shift(_decimal(b[rows], 0), max(-shift, 0))
+        quotient[rows] = _units(pc.divide(dividend, divisor), 0)
+    return quotient
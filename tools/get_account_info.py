@@ -1,3 +1,4 @@
+from tools.live_prices import get_price_service, held_symbols
 from tools.send_request import send_signed_request, set_payload
 import pandas as pd
 
@@ -14,3 +15,25 @@ def get_account_info():
     response = send_signed_request("GET", endpoint, params)
     df = pd.DataFrame(response["balances"]).set_index("asset")
     return df
+
+
+def get_balances():
+    """
+    Get the total quantity of each asset of the account, free and locked.
+
+    Returns:
+        dict: The quantity of each asset.
+    """
+    df = get_account_info()
+    return (df["free"].astype(float) + df["locked"].astype(float)).to_dict()
+
+
+def get_account_value():
+    """
+    Get the value of the account balances at the latest prices.
+
+    Returns:
+        float: The total value in USDT.
+    """
+    balances = get_balances()
+    return get_price_service(held_symbols(balances)).value(balances)
@@ -1,9 +1,126 @@
-from subprocess import run
+import json
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Optional
+
+CREDENTIALS_PATH = Path(
+    os.environ.get(
+        "CRYPTO_TRACKER_CREDENTIALS",
+        Path.home() / ".config" / "crypto-tracker" / "credentials.json",
+    )
+)
+KEYRING_SERVICE = "crypto-tracker"
+
+
+def env_provider(env_var: str) -> Optional[str]:
+    """
+    Read a credential from the process environment.
+
+    Args:
+        env_var (str): The name of the credential.
+
+    Returns:
+        Optional[str]: The credential, or None if it is not set.
+    """
+    return os.environ.get(env_var)
+
+
+def file_provider(env_var: str) -> Optional[str]:
+    """
+    Read a credential from the JSON credentials file.
+
+    Args:
+        env_var (str): The name of the credential.
+
+    Returns:
+        Optional[str]: The credential, or None if it is not in CREDENTIALS_PATH.
+    """
+    if not CREDENTIALS_PATH.exists():
+        return None
+    with open(CREDENTIALS_PATH, "r") as credentials_file:
+        return json.load(credentials_file).get(env_var)
+
+
+def keyring_provider(env_var: str) -> Optional[str]:
+    """
+    Read a credential from the system keyring, if the keyring package is installed.
+
+    Args:
+        env_var (str): The name of the credential.
+
+    Returns:
+        Optional[str]: The credential, or None if it is not in the keyring.
+    """
+    try:
+        import keyring
+    except ImportError:
+        return None
+    return keyring.get_password(KEYRING_SERVICE, env_var)
+
+
+def windows_env_provider(env_var: str) -> Optional[str]:
+    """
+    Read a credential from the Windows environment, e.g. from WSL.
+
+    Args:
+        env_var (str): The name of the credential.
+
+    Returns:
+        Optional[str]: The credential, or None if cmd.exe is not available or
+        the variable is not set.
+    """
+    if shutil.which("cmd.exe") is None:
+        return None
+    from subprocess import run
 
-def get_key(env_var):
     key = run(
-        ['cmd.exe', '/c', f'echo %{env_var}%'],
-        capture_output=True,
-        text=True
+        ["cmd.exe", "/c", f"echo %{env_var}%"], capture_output=True, text=True
     ).stdout.strip()
-    return key
\ No newline at end of file
+    # cmd.exe echoes unset variables unexpanded
+    return None if key == f"%{env_var}%" else key
+
+
+PROVIDERS: List[Callable[[str], Optional[str]]] = [
+    env_provider,
+    file_provider,
+    keyring_provider,
+    windows_env_provider,
+]
+
+
+def register_provider(provider: Callable[[str], Optional[str]]) -> None:
+    """
+    Add a credential provider, tried before the existing ones.
+
+    Args:
+        provider (Callable[[str], Optional[str]]): Returns the credential of a
+            name, or None if it does not have it.
+    """
+    PROVIDERS.insert(0, provider)
+    get_key.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_key(env_var: str, required: bool = True) -> Optional[str]:
+    """
+    Get a credential from the first provider that has it.
+
+    The result is cached, so each credential is resolved once per process.
+
+    Args:
+        env_var (str): The name of the credential, e.g. BINANCE_API_KEY.
+        required (bool, optional): Whether a missing credential is an error.
+            Defaults to True.
+
+    Returns:
+        Optional[str]: The credential, or None if it is missing and not required.
+    """
+    for provider in PROVIDERS:
+        key = provider(env_var)
+        if key:
+            return key
+    if required:
+        raise ValueError(f"Credential {env_var} not found by any provider")
+    return None
@@ -0,0 +1,81 @@
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Optional, Tuple
+from urllib3.util.retry import Retry
+
+POOL_SIZE = 10
+TIMEOUT = (3.05, 10)
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    Long-lived HTTP client holding a pooled keep-alive session.
+
+    Connections to the API host are opened once and reused across requests,
+    so only the first request to a host pays for the TCP and TLS handshakes.
+    Idempotent requests are retried at the transport level on connection
+    errors and transient server errors.
+
+    Args:
+        headers (Dict[str, str], optional): Headers sent with every request.
+        pool_size (int, optional): The maximum number of kept-alive connections
+            per host. Defaults to POOL_SIZE.
+        timeout (Tuple[float, float], optional): The (connect, read) timeouts in
+            seconds. Defaults to TIMEOUT.
+        retries (int, optional): The number of transport-level retries.
+            Defaults to RETRIES.
+        backoff_factor (float, optional): The exponential backoff factor between
+            retries, in seconds. Defaults to BACKOFF_FACTOR.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = POOL_SIZE,
+        timeout: Tuple[float, float] = TIMEOUT,
+        retries: int = RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+    ) -> None:
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, http_method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request on the pooled session.
+
+        Args:
+            http_method (str): The HTTP method (GET, POST, PUT, DELETE).
+            url (str): The full URL for the request.
+            **kwargs (Any): Additional keyword arguments passed to requests.
+
+        Returns:
+            requests.Response: The response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(http_method, url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Close every pooled connection.
+        """
+        self.session.close()
@@ -0,0 +1,350 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional
+from uuid import uuid4
+
+from tools.parse_transactions import datetime_to_milliseconds
+from tools.paths import DATA_DIR
+from tools.send_request import to_milliseconds
+
+LEDGER_DIR = DATA_DIR / "ledger"
+CONFIG_PATH = Path(__file__).parent / "transaction_configs.json"
+AMOUNT_COLUMNS = {
+    "from_amount",
+    "to_amount",
+    "amount",
+    "value",
+    "fee",
+    "fee_cost",
+    "price",
+}
+DEFAULT_BATCH_SIZE = 100_000
+DICTIONARY_COLUMNS = {"from_asset", "to_asset", "pair", "fee_asset", "side", "status"}
+# The id of a trade, unlike the id of its order, is only unique within its pair
+TRADE_KEYS = ["pair", "trade_id"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("transaction_type", pa.string()), ("month", pa.string())]),
+    flavor="hive",
+)
+
+
+@lru_cache(maxsize=None)
+def ledger_schema() -> pa.Schema:
+    """
+    Build the schema shared by every transaction type of the ledger.
+
+    The columns are the union of the configured keys of each transaction type,
+    plus the trade/fiat side. Timestamps are int64 milliseconds, amounts are
+    float64, and assets, symbols and statuses are dictionary-encoded.
+
+    Returns:
+        pa.Schema: The ledger schema, without the partition columns.
+    """
+    with open(CONFIG_PATH, "r") as config_file:
+        configs = json.load(config_file)
+    names = ["id", "dt"]
+    for config in configs.values():
+        names += [key for key in config["keys"] if key not in names]
+    names.append("side")
+    fields = []
+    for name in names:
+        if name == "dt":
+            fields.append(pa.field(name, pa.int64()))
+        elif name in AMOUNT_COLUMNS:
+            fields.append(pa.field(name, pa.float64()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def _strings(column: pd.Series) -> pa.Array:
+    try:
+        return pa.array(column, pa.string(), from_pandas=True)
+    except pa.ArrowTypeError:
+        # Numbers, e.g. integer ids, are stored as their string representation
+        return pa.array(column.astype("string"), pa.string(), from_pandas=True)
+
+
+def _to_table(df: pd.DataFrame, transaction_type: str) -> pa.Table:
+    """
+    Convert normalized transactions to a typed Arrow table.
+
+    Args:
+        df (pd.DataFrame): The transactions, as returned by transform_frame.
+        transaction_type (str): The type of transaction.
+
+    Returns:
+        pa.Table: The typed table, with its partition columns.
+    """
+    # Columns are converted one by one, without copying the whole frame
+    dt = datetime_to_milliseconds(df["dt"]).to_numpy(dtype="int64")
+    arrays = []
+    for field in ledger_schema():
+        if field.name == "dt":
+            arrays.append(pa.array(dt))
+        elif field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), field.type))
+        elif field.name in AMOUNT_COLUMNS:
+            arrays.append(pa.array(pd.to_numeric(df[field.name]), pa.float64()))
+        else:
+            arrays.append(_strings(df[field.name]).cast(field.type))
+    arrays.append(pa.repeat(pa.scalar(transaction_type), len(df)))
+    months = dt.astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+    arrays.append(pa.array(months))
+    return pa.Table.from_arrays(arrays, schema=_dataset_schema())
+
+
+def write_ledger(
+    df: pd.DataFrame, transaction_type: str, path: Optional[Path] = None
+) -> None:
+    """
+    Write transactions to the ledger, partitioned by type and month.
+
+    Each call adds new files to the partitions, so existing data is kept. Files
+    are written to a staging directory (ignored by readers) and then moved into
+    place, so concurrent readers never see a partial file.
+
+    Args:
+        df (pd.DataFrame): The transactions, as returned by transform_frame.
+        transaction_type (str): The type of transaction.
+        path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+    """
+    if df.empty:
+        return
+    path = Path(path or LEDGER_DIR)
+    batch = uuid4().hex
+    staging = path / f"_staging-{batch}"
+    ds.write_dataset(
+        _to_table(df, transaction_type),
+        staging,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{batch}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    for staged in staging.rglob("*.parquet"):
+        target = path / staged.relative_to(staging)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged, target)
+    shutil.rmtree(staging)
+
+
+def _month(timestamp: int) -> str:
+    return pd.Timestamp(timestamp, unit="ms").strftime("%Y-%m")
+
+
+def _dataset_schema() -> pa.Schema:
+    schema = ledger_schema()
+    schema = schema.append(pa.field("transaction_type", pa.string()))
+    return schema.append(pa.field("month", pa.string()))
+
+
+def _scanner(
+    transaction_type: Optional[str],
+    columns: Optional[List[str]],
+    start: Optional[str | int],
+    end: Optional[str | int],
+    path: Optional[Path],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Optional[ds.Scanner]:
+    path = Path(path or LEDGER_DIR)
+    if not path.exists():
+        return None
+    dataset = ds.dataset(
+        path, schema=_dataset_schema(), format="parquet", partitioning=PARTITIONING
+    )
+    expression = None
+    conditions = []
+    if transaction_type is not None:
+        conditions.append(ds.field("transaction_type") == transaction_type)
+    if start is not None:
+        start = to_milliseconds(start)
+        conditions.append(ds.field("month") >= _month(start))
+        conditions.append(ds.field("dt") >= start)
+    if end is not None:
+        end = to_milliseconds(end)
+        conditions.append(ds.field("month") <= _month(end))
+        conditions.append(ds.field("dt") < end)
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.scanner(columns=columns, filter=expression, batch_size=batch_size)
+
+
+def read_ledger(
+    transaction_type: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    start: Optional[str | int] = None,
+    end: Optional[str | int] = None,
+    path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Read transactions from the ledger.
+
+    The transaction type and time range are pushed down to the dataset, so only
+    the matching partitions are opened and only the requested columns are read.
+
+    Args:
+        transaction_type (str, optional): The type of transaction to read.
+            Defaults to every type.
+        columns (List[str], optional): The columns to read. Defaults to all.
+        start (str | int, optional): The start of the range, as a day-first date
+            string or a timestamp in milliseconds (inclusive).
+        end (str | int, optional): The end of the range (exclusive).
+        path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The transactions, with dt as timestamps in milliseconds.
+    """
+    scanner = _scanner(transaction_type, columns, start, end, path)
+    if scanner is None:
+        schema = _dataset_schema()
+        return schema.empty_table().select(columns or schema.names).to_pandas()
+    return scanner.to_table().to_pandas()
+
+
+def iter_ledger(
+    transaction_type: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    start: Optional[str | int] = None,
+    end: Optional[str | int] = None,
+    path: Optional[Path] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read transactions from the ledger one record batch at a time.
+
+    Takes the same filters as read_ledger, but only one batch is held in memory.
+
+    Args:
+        transaction_type (str, optional): The type of transaction to read.
+            Defaults to every type.
+        columns (List[str], optional): The columns to read. Defaults to all.
+        start (str | int, optional): The start of the range (inclusive).
+        end (str | int, optional): The end of the range (exclusive).
+        path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+        batch_size (int, optional): The maximum rows of a batch.
+            Defaults to DEFAULT_BATCH_SIZE.
+
+    Yields:
+        pd.DataFrame: The transactions of each non-empty batch.
+    """
+    scanner = _scanner(transaction_type, columns, start, end, path, batch_size)
+    if scanner is None:
+        return
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def append_ledger(
+    df: pd.DataFrame,
+    transaction_type: str,
+    keys: Optional[List[str]] = None,
+    path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Append transactions to the ledger, skipping those already stored.
+
+    Args:
+        df (pd.DataFrame): The transactions, as returned by transform_frame.
+        transaction_type (str): The type of transaction.
+        keys (List[str], optional): The columns identifying a transaction.
+            Defaults to every column.
+        path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The transactions actually appended.
+    """
+    if df.empty:
+        return df
+    keys = keys or list(df.columns)
+    table = _to_table(df, transaction_type)
+    new = table.select(keys).to_pandas()
+    # A transaction always has the same time, so only its time range can hold it
+    dt = table["dt"].to_numpy()
+    existing = read_ledger(
+        transaction_type,
+        columns=keys,
+        start=int(dt.min()),
+        end=int(dt.max()) + 1,
+        path=path,
+    )
+    stored = row_hashes(existing, transaction_type) if len(existing) else []
+    df = df[~np.isin(row_hashes(new, transaction_type), stored)]
+    write_ledger(df, transaction_type, path=path)
+    return df
+
+
+def row_hashes(df: pd.DataFrame, transaction_type: str) -> np.ndarray:
+    """
+    Hash the natural id of each transaction: its type and the given columns.
+
+    Args:
+        df (pd.DataFrame): The columns identifying each transaction.
+        transaction_type (str): The type of transaction.
+
+    Returns:
+        np.ndarray: The uint64 hash of each row.
+    """
+    type_hash = pd.util.hash_array(np.array([transaction_type], dtype=object))
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashes ^ type_hash[0]
+
+
+class LedgerAccumulator:
+    """
+    Collect the pages of a fetch and assemble them once.
+
+    Pages are kept in a list, so assembling a full history is a single
+    concatenation rather than one per page. Transactions are then
+    deduplicated on a hash of their type and natural id, since overlapping
+    windows, or an API filtering on another time than the one stored, can
+    return the same transaction twice, and sorted by time with a stable sort
+    so that transactions at the same time keep their fetch order.
+
+    Args:
+        transaction_type (str): The type of transaction.
+        keys (List[str], optional): The columns identifying a transaction.
+            Defaults to every column.
+    """
+
+    def __init__(self, transaction_type: str, keys: Optional[List[str]] = None):
+        self.transaction_type = transaction_type
+        self.keys = keys
+        self.pages: List[pd.DataFrame] = []
+
+    def __len__(self) -> int:
+        return sum(len(page) for page in self.pages)
+
+    def add(self, page: pd.DataFrame) -> None:
+        """
+        Add a page of normalized transactions.
+
+        Args:
+            page (pd.DataFrame): The transactions, as returned by decode_page.
+        """
+        if not page.empty:
+            self.pages.append(page)
+
+    def assemble(self) -> pd.DataFrame:
+        """
+        Concatenate, deduplicate and sort every page added.
+
+        Returns:
+            pd.DataFrame: The distinct transactions, in time order.
+        """
+        if not self.pages:
+            return pd.DataFrame()
+        df = pd.concat(self.pages, ignore_index=True)
+        hashes = row_hashes(df[self.keys or list(df.columns)], self.transaction_type)
+        df = df[~pd.Index(hashes).duplicated()]
+        return df.sort_values("dt", kind="stable", ignore_index=True)
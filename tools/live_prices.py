@@ -0,0 +1,350 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import websockets
+
+from tools.send_request import send_public_request
+from tools.symbols import candidate_symbols
+
+MARKET_STREAM_URL = os.environ.get(
+    "BINANCE_MARKET_STREAM_URL", "wss://stream.binance.com:9443"
+)
+TICKER_ENDPOINT = "/api/v3/ticker/price"
+QUOTE_ASSET = "USDT"
+# Prices older than this are refreshed through REST
+MAX_AGE = 60.0
+INITIAL_CAPACITY = 64
+MAX_BACKOFF = 60.0
+
+_service = None
+
+
+def _grow(column: np.ndarray, fill: float) -> np.ndarray:
+    return np.concatenate([column, np.full(len(column), fill)])
+
+
+class PriceTable:
+    """
+    Latest prices of many symbols, in preallocated columns indexed by slot.
+
+    Each symbol gets a fixed slot on first use, so lookups are a dict access
+    and array reads. Writes, from the stream or from REST fallbacks in any
+    consumer thread, hold the table lock so that none is lost while the
+    columns grow. Reads take no lock.
+
+    Args:
+        capacity (int, optional): The initial number of slots.
+            Defaults to INITIAL_CAPACITY.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self.slots: Dict[str, int] = {}
+        self.bid = np.zeros(capacity)
+        self.ask = np.zeros(capacity)
+        self.last = np.full(capacity, np.nan)
+        self.updated = np.zeros(capacity)
+        self._lock = threading.RLock()
+
+    def slot(self, symbol: str) -> int:
+        """
+        Get the slot of a symbol, allocating it on first use.
+
+        Args:
+            symbol (str): The symbol.
+
+        Returns:
+            int: The slot.
+        """
+        slot = self.slots.get(symbol)
+        if slot is not None:
+            return slot
+        with self._lock:
+            if symbol in self.slots:
+                return self.slots[symbol]
+            slot = len(self.slots)
+            if slot == len(self.bid):
+                # Double the columns before publishing the new slot
+                self.bid = _grow(self.bid, 0.0)
+                self.ask = _grow(self.ask, 0.0)
+                self.last = _grow(self.last, np.nan)
+                self.updated = _grow(self.updated, 0.0)
+            self.slots[symbol] = slot
+            return slot
+
+    def update_book(self, symbol: str, bid: float, ask: float) -> None:
+        with self._lock:
+            slot = self.slot(symbol)
+            self.bid[slot] = bid
+            self.ask[slot] = ask
+            self.updated[slot] = time.time()
+
+    def update_last(self, symbol: str, price: float) -> None:
+        with self._lock:
+            slot = self.slot(symbol)
+            self.last[slot] = price
+            self.updated[slot] = time.time()
+
+    def get(self, symbol: str, max_age: float = MAX_AGE) -> Optional[float]:
+        """
+        Get the latest price of a symbol: the mid of its book if known, else its
+        last trade price.
+
+        Args:
+            symbol (str): The symbol.
+            max_age (float, optional): The maximum age of the price in seconds.
+                Defaults to MAX_AGE.
+
+        Returns:
+            Optional[float]: The price, or None if it is unknown or too old.
+        """
+        slot = self.slots.get(symbol)
+        if slot is None or time.time() - self.updated[slot] > max_age:
+            return None
+        bid, ask = self.bid[slot], self.ask[slot]
+        price = (bid + ask) / 2 if bid > 0 and ask > 0 else self.last[slot]
+        return None if math.isnan(price) else float(price)
+
+
+class LivePriceService:
+    """
+    Price service kept up to date by the miniTicker and bookTicker streams.
+
+    The streams run on their own event loop in a background thread, so any
+    consumer in the process can read prices without blocking. Symbols that
+    are not subscribed, or whose price went stale, are fetched through REST
+    and stored in the table, with a single request for every ticker when a
+    batch misses more than one.
+
+    Args:
+        symbols (Iterable[str], optional): The symbols to subscribe to.
+            Defaults to none, answering every lookup through REST.
+        max_age (float, optional): The maximum age of a price in seconds.
+            Defaults to MAX_AGE.
+    """
+
+    def __init__(
+        self, symbols: Optional[Iterable[str]] = None, max_age: float = MAX_AGE
+    ) -> None:
+        self.symbols = list(symbols or [])
+        self.max_age = max_age
+        self.table = PriceTable(max(INITIAL_CAPACITY, 2 * len(self.symbols)))
+        self.messages = 0
+        self.fallbacks = 0
+        self.connected = threading.Event()
+        self._loop = None
+        self._thread = None
+        self._stop = None
+
+    def handle(self, message: str) -> None:
+        """
+        Update the table from a combined stream message.
+
+        Args:
+            message (str): The raw stream message.
+        """
+        data = json.loads(message).get("data", {})
+        self.messages += 1
+        if "b" in data and "a" in data:
+            self.table.update_book(data["s"], float(data["b"]), float(data["a"]))
+        elif data.get("e") == "24hrMiniTicker":
+            self.table.update_last(data["s"], float(data["c"]))
+
+    async def _listen(self) -> None:
+        streams = "/".join(
+            f"{symbol.lower()}@{stream}"
+            for symbol in self.symbols
+            for stream in ("miniTicker", "bookTicker")
+        )
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                url = f"{MARKET_STREAM_URL}/stream?streams={streams}"
+                async with websockets.connect(url) as socket:
+                    self.connected.set()
+                    backoff = 1.0
+                    while not self._stop.is_set():
+                        try:
+                            message = await asyncio.wait_for(socket.recv(), 1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.handle(message)
+            except (websockets.ConnectionClosed, OSError) as e:
+                self.connected.clear()
+                print(f"Market stream disconnected: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def start(self) -> "LivePriceService":
+        """
+        Start streaming the subscribed symbols in a background thread.
+
+        Returns:
+            LivePriceService: The service.
+        """
+        if not self.symbols or self._thread is not None:
+            return self
+        self._loop = asyncio.new_event_loop()
+        self._stop = asyncio.Event()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete, args=(self._listen(),), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop streaming and wait for the background thread.
+        """
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+    def _fetch(self, symbol: str) -> float:
+        self.fallbacks += 1
+        response = send_public_request(TICKER_ENDPOINT, {"symbol": symbol})
+        if "price" not in response:
+            return math.nan
+        price = float(response["price"])
+        self.table.update_last(symbol, price)
+        return price
+
+    def _fetch_all(self, symbols: List[str]) -> Dict[str, float]:
+        # Every ticker weighs as much as a few single ones, and unlike the
+        # symbols parameter it does not fail on unlisted symbols
+        self.fallbacks += 1
+        response = send_public_request(TICKER_ENDPOINT)
+        if not isinstance(response, list):
+            return {}
+        wanted = set(symbols)
+        prices = {}
+        for ticker in response:
+            if ticker["symbol"] in wanted:
+                prices[ticker["symbol"]] = float(ticker["price"])
+                self.table.update_last(ticker["symbol"], prices[ticker["symbol"]])
+        return prices
+
+    def price(self, symbol: str) -> float:
+        """
+        Get the latest price of a symbol.
+
+        Args:
+            symbol (str): The symbol, e.g. BTCUSDT.
+
+        Returns:
+            float: The price, or NaN if the symbol does not exist.
+        """
+        price = self.table.get(symbol, self.max_age)
+        return self._fetch(symbol) if price is None else price
+
+    def prices(self, symbols: Iterable[str]) -> List[float]:
+        """
+        Get the latest price of many symbols, fetching every missing one with
+        a single request.
+
+        Args:
+            symbols (Iterable[str]): The symbols.
+
+        Returns:
+            List[float]: The prices, in the same order, NaN for the symbols
+            that do not exist.
+        """
+        symbols = list(symbols)
+        prices = [self.table.get(symbol, self.max_age) for symbol in symbols]
+        missing = list(dict.fromkeys(s for s, p in zip(symbols, prices) if p is None))
+        if len(missing) == 1:
+            fetched = {missing[0]: self._fetch(missing[0])}
+        else:
+            fetched = self._fetch_all(missing) if missing else {}
+        return [
+            fetched.get(symbol, math.nan) if price is None else price
+            for symbol, price in zip(symbols, prices)
+        ]
+
+    def value(self, balances: Mapping[str, float], quote: str = "USDT") -> float:
+        """
+        Value balances in a quote asset at the latest prices.
+
+        Args:
+            balances (Mapping[str, float]): The quantity of each asset.
+            quote (str, optional): The quote asset. Defaults to "USDT".
+
+        Returns:
+            float: The total value. USD and stablecoins count at 1, and assets
+            without a market against the quote count as 0.
+        """
+        held = {asset: quantity for asset, quantity in balances.items() if quantity}
+        priced = [asset for asset in held if "USD" not in asset]
+        prices = dict(zip(priced, self.prices(asset + quote for asset in priced)))
+        total = 0.0
+        for asset, quantity in held.items():
+            price = prices.get(asset, 1.0)
+            if not math.isnan(price):
+                total += quantity * price
+        return total
+
+    def __enter__(self) -> "LivePriceService":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def held_symbols(balances: Mapping[str, float], quote: str = QUOTE_ASSET) -> List[str]:
+    """
+    Get the listed symbols pricing the held assets in a quote asset.
+
+    Args:
+        balances (Mapping[str, float]): The quantity of each asset.
+        quote (str, optional): The quote asset. Defaults to QUOTE_ASSET.
+
+    Returns:
+        List[str]: The symbols, sorted.
+    """
+    held = [asset for asset, quantity in balances.items() if quantity]
+    return candidate_symbols([a for a in held if "USD" not in a], quotes=[quote])
+
+
+def get_price_service(symbols: Optional[Iterable[str]] = None) -> LivePriceService:
+    """
+    Get the price service shared by the process, starting it on first use.
+
+    The first call subscribes the service to the given symbols, or by default
+    to those of the assets held by the account, so their prices are streamed
+    rather than fetched through REST on every lookup.
+
+    Args:
+        symbols (Iterable[str], optional): The symbols to subscribe to, if the
+            service is not started yet. Defaults to the held symbols.
+
+    Returns:
+        LivePriceService: The shared price service.
+    """
+    global _service
+    if _service is None:
+        if symbols is None:
+            # Imported here, as the account info values balances with this service
+            from tools.get_account_info import get_balances
+
+            symbols = held_symbols(get_balances())
+        _service = LivePriceService(symbols).start()
+    return _service
+
+
+def set_price_service(service: LivePriceService) -> None:
+    """
+    Install the price service shared by the process.
+
+    Args:
+        service (LivePriceService): The service, usually started.
+    """
+    global _service
+    _service = service
@@ -0,0 +1,246 @@
+import bisect
+import json
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from tools.rate_limit import BUCKET_HEADERS
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "binance"
+
+_metrics = None
+
+
+class EndpointMetrics:
+    """
+    Counters and latency histogram of the requests to one endpoint.
+
+    Args:
+        buckets (tuple): The upper bounds of the latency buckets, in seconds.
+    """
+
+    def __init__(self, buckets: tuple) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_counts = [0] * (len(buckets) + 1)
+        self.decode_seconds = 0.0
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.errors: Dict[int, int] = defaultdict(int)
+
+
+class RequestMetrics:
+    """
+    Request-level metrics of the Binance client.
+
+    Both request paths record every attempt: its latency in a per-endpoint
+    histogram, the response size and status, the JSON decode time, whether it
+    was a retry, the error code of code/msg payloads, and the weight the
+    server reports as used in each rate-limit pool. When disabled, the request
+    paths skip recording entirely.
+
+    Args:
+        enabled (bool, optional): Whether to record. Defaults to the
+            CRYPTO_TRACKER_METRICS environment variable being set to 1.
+        buckets (tuple, optional): The upper bounds of the latency buckets, in
+            seconds. Defaults to LATENCY_BUCKETS.
+    """
+
+    def __init__(
+        self, enabled: Optional[bool] = None, buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        if enabled is None:
+            enabled = os.environ.get("CRYPTO_TRACKER_METRICS", "0") == "1"
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.used_weight: Dict[str, float] = {}
+        self.max_used_weight: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        endpoint: str,
+        status: int,
+        latency: float,
+        size: int,
+        decode_time: float,
+        headers: Mapping[str, str],
+        attempt: int,
+        response: Any,
+    ) -> None:
+        """
+        Record one attempt of a request.
+
+        Args:
+            endpoint (str): The endpoint URL path.
+            status (int): The HTTP status.
+            latency (float): The seconds from sending to the full body received.
+            size (int): The size of the response body in bytes.
+            decode_time (float): The seconds spent decoding the JSON body.
+            headers (Mapping[str, str]): The response headers.
+            attempt (int): The attempt number, 0 for the first one.
+            response (Any): The decoded response.
+        """
+        code = None
+        if isinstance(response, dict) and "code" in response and "msg" in response:
+            code = response["code"]
+        slot = bisect.bisect_left(self.buckets, latency)
+        with self._lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics(self.buckets)
+            metrics.requests += 1
+            metrics.retries += attempt > 0
+            metrics.bytes += size
+            metrics.latency_sum += latency
+            metrics.latency_counts[slot] += 1
+            metrics.decode_seconds += decode_time
+            metrics.statuses[status] += 1
+            if code is not None:
+                metrics.errors[code] += 1
+            for header, value in headers.items():
+                pool = BUCKET_HEADERS.get(header.lower())
+                if pool is not None:
+                    self.used_weight[pool] = float(value)
+                    self.max_used_weight[pool] = max(
+                        float(value), self.max_used_weight.get(pool, 0.0)
+                    )
+
+    def reset(self) -> None:
+        """
+        Clear every recorded metric.
+        """
+        with self._lock:
+            self.endpoints.clear()
+            self.used_weight.clear()
+            self.max_used_weight.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serializable snapshot of the metrics.
+
+        Returns:
+            Dict[str, Any]: The metrics of each endpoint, and the used weight of
+            each rate-limit pool.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        with self._lock:
+            endpoints = {}
+            for endpoint, metrics in self.endpoints.items():
+                endpoints[endpoint] = {
+                    "requests": metrics.requests,
+                    "retries": metrics.retries,
+                    "bytes": metrics.bytes,
+                    "latency_sum": round(metrics.latency_sum, 6),
+                    "latency_mean": round(metrics.latency_sum / metrics.requests, 6),
+                    "latency_buckets": dict(zip(bounds, metrics.latency_counts)),
+                    "decode_seconds": round(metrics.decode_seconds, 6),
+                    "statuses": {str(k): v for k, v in metrics.statuses.items()},
+                    "errors": {str(k): v for k, v in metrics.errors.items()},
+                }
+            return {
+                "endpoints": endpoints,
+                "used_weight": dict(self.used_weight),
+                "max_used_weight": dict(self.max_used_weight),
+            }
+
+    def prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def sample(name: str, value: float, **labels: Any) -> None:
+            label_str = ",".join(f'{key}="{value}"' for key, value in labels.items())
+            lines.append(f"{PREFIX}_{name}{{{label_str}}} {value}")
+
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            family("request_duration_seconds", "histogram", "Latency of requests.")
+            for endpoint, metrics in endpoints:
+                cumulative = 0
+                for bound, count in zip(bounds, metrics.latency_counts):
+                    cumulative += count
+                    sample(
+                        "request_duration_seconds_bucket",
+                        cumulative,
+                        endpoint=endpoint,
+                        le=bound,
+                    )
+                sample(
+                    "request_duration_seconds_sum",
+                    metrics.latency_sum,
+                    endpoint=endpoint,
+                )
+                sample(
+                    "request_duration_seconds_count",
+                    metrics.requests,
+                    endpoint=endpoint,
+                )
+            family("requests_total", "counter", "Requests by HTTP status.")
+            for endpoint, metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    sample("requests_total", count, endpoint=endpoint, status=status)
+            family("request_retries_total", "counter", "Retried requests.")
+            for endpoint, metrics in endpoints:
+                sample("request_retries_total", metrics.retries, endpoint=endpoint)
+            family("response_bytes_total", "counter", "Response body bytes.")
+            for endpoint, metrics in endpoints:
+                sample("response_bytes_total", metrics.bytes, endpoint=endpoint)
+            family("json_decode_seconds_total", "counter", "Time decoding JSON.")
+            for endpoint, metrics in endpoints:
+                sample(
+                    "json_decode_seconds_total",
+                    metrics.decode_seconds,
+                    endpoint=endpoint,
+                )
+            family("api_errors_total", "counter", "Responses with an error code.")
+            for endpoint, metrics in endpoints:
+                for code, count in sorted(metrics.errors.items()):
+                    sample("api_errors_total", count, endpoint=endpoint, code=code)
+            family("used_weight", "gauge", "Weight used in the current minute.")
+            for pool, weight in sorted(self.used_weight.items()):
+                sample("used_weight", weight, pool=pool)
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path) -> None:
+        """
+        Write the metrics to a file, as JSON if its suffix is .json, else in
+        the Prometheus text format.
+
+        Args:
+            path (Path): The output file.
+        """
+        path = Path(path)
+        with open(path, "w") as metrics_file:
+            if path.suffix == ".json":
+                json.dump(self.snapshot(), metrics_file, indent=4)
+            else:
+                metrics_file.write(self.prometheus())
+
+
+def get_metrics() -> RequestMetrics:
+    """
+    Get the request metrics shared by every request path.
+
+    Returns:
+        RequestMetrics: The shared request metrics.
+    """
+    global _metrics
+    if _metrics is None:
+        _metrics = RequestMetrics()
+    return _metrics
@@ -0,0 +1,591 @@
+import argparse
+import asyncio
+import bisect
+import random
+import json
+import threading
+import time
+import uuid
+from aiohttp import web
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.rate_limit import (
+    BUCKET_HEADERS,
+    BUCKET_LIMITS,
+    BUCKET_PERIODS,
+    DEFAULT_WEIGHT,
+    ENDPOINT_WEIGHTS,
+)
+from tools.synthetic import (
+    DAY_MS,
+    QUOTE_ASSET,
+    interval_ms,
+    price_at,
+    generate_converts,
+    generate_deposits,
+    generate_fiat_payments,
+    generate_klines,
+    generate_trades,
+    generate_withdrawals,
+)
+
+DEFAULT_ASSETS = ["BTC", "ETH", "BNB", "SOL", "ADA", "DOT", "PHA", "BONK"]
+SIGNED_ENDPOINTS = {
+    "/api/v3/myTrades",
+    "/api/v3/account",
+    "/sapi/v1/fiat/payments",
+    "/sapi/v1/convert/tradeFlow",
+    "/sapi/v1/capital/deposit/hisrec",
+    "/sapi/v1/capital/withdraw/history",
+}
+POOL_HEADERS = {pool: header.upper() for header, pool in BUCKET_HEADERS.items()}
+# Seconds between two ticks of the market streams
+TICK_INTERVAL = 0.1
+
+
+class MockBinance:
+    """
+    Synthetic account history served like the Binance REST API.
+
+    Every history is generated once from a seed, so runs are reproducible.
+
+    Args:
+        seed (int, optional): The random seed. Defaults to 0.
+        assets (List[str], optional): The crypto assets of the account.
+            Defaults to DEFAULT_ASSETS.
+        trades_per_symbol (int, optional): The trades of each <asset>USDT symbol.
+        converts (int, optional): The number of convert trades.
+        deposits (int, optional): The number of deposits.
+        withdrawals (int, optional): The number of withdrawals.
+        fiat_payments (int, optional): The number of fiat payments per side.
+        days (int, optional): The length of the history, ending now.
+        latency (float, optional): The latency added to each response, in seconds.
+        limits (Dict[str, int], optional): The weight limit of each rate-limit
+            pool, over its period in BUCKET_PERIODS or a minute. Defaults to
+            BUCKET_LIMITS.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        assets: Optional[List[str]] = None,
+        trades_per_symbol: int = 2_000,
+        converts: int = 2_000,
+        deposits: int = 200,
+        withdrawals: int = 200,
+        fiat_payments: int = 300,
+        days: int = 730,
+        latency: float = 0.05,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        rng = random.Random(seed)
+        self.rng = rng
+        self.assets = assets or DEFAULT_ASSETS
+        self.latency = latency
+        self.limits = limits or BUCKET_LIMITS
+        self.end = int(time.time() * 1000)
+        self.start = self.end - days * DAY_MS
+        span = (self.start, self.end)
+        self.trades = {
+            asset
+            + QUOTE_ASSET: generate_trades(
+                rng, trades_per_symbol, asset + QUOTE_ASSET, *span
+            )
+            for asset in self.assets
+        }
+        self.symbols = {
+            asset + quote: (asset, quote)
+            for asset in self.assets + ["EUR"]
+            for quote in (QUOTE_ASSET, "USDC")
+        }
+        self.history = {
+            "convert": self._index(
+                generate_converts(rng, converts, self.assets, *span), "createTime"
+            ),
+            "deposit": self._index(
+                generate_deposits(rng, deposits, self.assets, *span), "insertTime"
+            ),
+            "withdraw": self._index(
+                generate_withdrawals(rng, withdrawals, self.assets, *span),
+                "applyTime",
+            ),
+            "fiat_0": self._index(
+                generate_fiat_payments(rng, fiat_payments, self.assets, *span),
+                "createTime",
+            ),
+            "fiat_1": self._index(
+                generate_fiat_payments(rng, fiat_payments, self.assets, *span),
+                "createTime",
+            ),
+        }
+        self.requests = 0
+        self.requests_by_endpoint: Dict[str, int] = defaultdict(int)
+        self.rate_limited = 0
+        self._windows: Dict[str, int] = {}
+        self._used: Dict[str, int] = defaultdict(int)
+        self.listen_keys: set = set()
+        self.sockets: set = set()
+        self.market_sockets: set = set()
+
+    @staticmethod
+    def _index(
+        records: List[Dict[str, Any]], time_key: str
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        times = []
+        for record in records:
+            value = record[time_key]
+            if isinstance(value, str):
+                value = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+                value = int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            times.append(value)
+        return times, records
+
+    def _between(
+        self, name: str, start: Optional[str], end: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        times, records = self.history[name]
+        low = bisect.bisect_left(times, int(start)) if start else 0
+        high = bisect.bisect_right(times, int(end)) if end else len(times)
+        return records[low : min(high, low + limit)]
+
+    def _charge(self, endpoint: str) -> Tuple[Dict[str, str], Optional[int]]:
+        """
+        Charge the weight of a request to its pool for the current period.
+
+        Args:
+            endpoint (str): The endpoint URL path.
+
+        Returns:
+            Tuple[Dict[str, str], Optional[int]]: The used-weight headers, and
+            the seconds until the limit resets if it is exceeded.
+        """
+        now = time.time()
+        pool, weight = ENDPOINT_WEIGHTS.get(endpoint, DEFAULT_WEIGHT)
+        period = BUCKET_PERIODS.get(pool, 60)
+        if self._windows.get(pool) != int(now // period):
+            self._windows[pool] = int(now // period)
+            self._used[pool] = 0
+        self._used[pool] += weight
+        # Only the per-minute pools are reported in the headers
+        headers = {}
+        if pool in POOL_HEADERS:
+            headers[POOL_HEADERS[pool]] = str(self._used[pool])
+        if self._used[pool] > self.limits[pool]:
+            return headers, int(period - now % period) + 1
+        return headers, None
+
+    def respond(self, endpoint: str, query: Dict[str, str]) -> Any:
+        """
+        Build the response body of a request.
+
+        Args:
+            endpoint (str): The endpoint URL path.
+            query (Dict[str, str]): The query parameters.
+
+        Returns:
+            Any: The JSON-serializable response body.
+        """
+        start, end = query.get("startTime"), query.get("endTime")
+        match endpoint:
+            case "/api/v3/time":
+                return {"serverTime": int(time.time() * 1000)}
+            case "/api/v3/exchangeInfo":
+                return {
+                    "symbols": [
+                        {
+                            "symbol": symbol,
+                            "status": "TRADING",
+                            "baseAsset": base,
+                            "quoteAsset": quote,
+                        }
+                        for symbol, (base, quote) in self.symbols.items()
+                    ]
+                }
+            case "/api/v3/userDataStream":
+                if "listenKey" in query:
+                    return {}
+                listen_key = uuid.uuid4().hex
+                self.listen_keys.add(listen_key)
+                return {"listenKey": listen_key}
+            case "/api/v3/ticker/price":
+                symbol = query.get("symbol")
+                now = int(time.time() * 1000)
+                if symbol is None:
+                    return [
+                        {"symbol": symbol, "price": f"{price_at(symbol, now):.8f}"}
+                        for symbol in self.symbols
+                    ]
+                if symbol not in self.symbols:
+                    return {"code": -1121, "msg": "Invalid symbol."}
+                return {"symbol": symbol, "price": f"{price_at(symbol, now):.8f}"}
+            case "/api/v3/account":
+                return {
+                    "balances": [
+                        {"asset": asset, "free": "1.00000000", "locked": "0.00000000"}
+                        for asset in self.assets + [QUOTE_ASSET]
+                    ]
+                }
+            case "/api/v3/klines":
+                return generate_klines(
+                    query["symbol"],
+                    interval_ms(query.get("interval", "1m")),
+                    int(start or self.end),
+                    int(end or int(time.time() * 1000)),
+                    min(int(query.get("limit", 500)), 1000),
+                )
+            case "/api/v3/myTrades":
+                symbol = query.get("symbol")
+                if symbol not in self.trades and symbol not in self.symbols:
+                    return {"code": -1121, "msg": "Invalid symbol."}
+                trades = self.trades.get(symbol, [])
+                limit = min(int(query.get("limit", 500)), 1000)
+                if "fromId" not in query:
+                    return trades[-limit:]
+                ids = [trade["id"] for trade in trades]
+                low = bisect.bisect_left(ids, int(query["fromId"]))
+                return trades[low : low + limit]
+            case "/sapi/v1/convert/tradeFlow":
+                limit = min(int(query.get("limit", 100)), 1000)
+                rows = self._between("convert", start, end, limit + 1)
+                return {
+                    "list": rows[:limit],
+                    "startTime": start,
+                    "endTime": end,
+                    "limit": limit,
+                    "moreData": len(rows) > limit,
+                }
+            case "/sapi/v1/fiat/payments":
+                rows = self._between(
+                    f"fiat_{query.get('transactionType', 0)}",
+                    query.get("beginTime"),
+                    end,
+                    min(int(query.get("rows", 100)), 500),
+                )
+                return {
+                    "code": "000000",
+                    "message": "success",
+                    "data": rows,
+                    "total": len(rows),
+                    "success": True,
+                }
+            case "/sapi/v1/capital/deposit/hisrec":
+                limit = min(int(query.get("limit", 1000)), 1000)
+                return self._between("deposit", start, end, limit)
+            case "/sapi/v1/capital/withdraw/history":
+                limit = min(int(query.get("limit", 1000)), 1000)
+                return self._between("withdraw", start, end, limit)
+        return None
+
+    async def user_stream(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        Serve a user-data stream, pushing the events published to it.
+
+        Args:
+            request (web.Request): The websocket upgrade request.
+
+        Returns:
+            web.WebSocketResponse: The websocket, once closed.
+        """
+        if request.match_info["listen_key"] not in self.listen_keys:
+            raise web.HTTPBadRequest(text="Invalid listen key.")
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self.sockets.add(socket)
+        try:
+            async for _ in socket:
+                pass
+        finally:
+            self.sockets.discard(socket)
+        return socket
+
+    async def market_stream(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        Serve a combined miniTicker/bookTicker stream, ticking every
+        TICK_INTERVAL seconds.
+
+        Args:
+            request (web.Request): The websocket upgrade request, with the
+                streams query parameter.
+
+        Returns:
+            web.WebSocketResponse: The websocket, once closed.
+        """
+        streams = [
+            stream.split("@")
+            for stream in request.query.get("streams", "").split("/")
+            if "@" in stream
+        ]
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self.market_sockets.add(socket)
+        ticker = asyncio.create_task(self._tick(socket, streams))
+        try:
+            # Read until the client closes, so its close handshake is answered
+            async for _ in socket:
+                pass
+        finally:
+            ticker.cancel()
+            self.market_sockets.discard(socket)
+        return socket
+
+    async def _tick(
+        self, socket: web.WebSocketResponse, streams: List[List[str]]
+    ) -> None:
+        try:
+            while not socket.closed:
+                now = int(time.time() * 1000)
+                for name, stream in streams:
+                    symbol = name.upper()
+                    price = price_at(symbol, now)
+                    if stream == "miniTicker":
+                        data = {"e": "24hrMiniTicker", "E": now, "s": symbol}
+                        data["c"] = f"{price:.8f}"
+                    else:
+                        data = {"u": now, "s": symbol}
+                        data["b"] = f"{price * 0.9999:.8f}"
+                        data["a"] = f"{price * 1.0001:.8f}"
+                    message = {"stream": f"{name}@{stream}", "data": data}
+                    await socket.send_str(json.dumps(message))
+                await asyncio.sleep(TICK_INTERVAL)
+        except ConnectionResetError:
+            pass
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """
+        Push an event to every open user-data stream.
+
+        Args:
+            event (Dict[str, Any]): The event.
+        """
+        for socket in list(self.sockets):
+            await socket.send_str(json.dumps(event))
+
+    async def fill(self, symbol: str) -> Dict[str, Any]:
+        """
+        Execute a new trade, listed by myTrades and pushed as an executionReport.
+
+        Args:
+            symbol (str): The symbol.
+
+        Returns:
+            Dict[str, Any]: The trade, as returned by /api/v3/myTrades.
+        """
+        now = int(time.time() * 1000)
+        trades = self.trades.setdefault(symbol, [])
+        trade = generate_trades(self.rng, 1, symbol, now, now + 1)[0]
+        trade["id"] = (trades[-1]["id"] if trades else 0) + 1
+        trade["orderId"] = trade["id"] * 10
+        trades.append(trade)
+        await self.publish(
+            {
+                "e": "executionReport",
+                "E": now,
+                "s": symbol,
+                "S": "BUY" if trade["isBuyer"] else "SELL",
+                "x": "TRADE",
+                "X": "FILLED",
+                "i": trade["orderId"],
+                "l": trade["qty"],
+                "L": trade["price"],
+                "n": trade["commission"],
+                "N": trade["commissionAsset"],
+                "T": trade["time"],
+                "t": trade["id"],
+                "m": trade["isMaker"],
+                "Y": trade["quoteQty"],
+            }
+        )
+        return trade
+
+    async def balance_update(self, asset: str, delta: str) -> None:
+        """
+        Push a balanceUpdate event, as for a deposit or withdrawal.
+
+        Args:
+            asset (str): The asset.
+            delta (str): The balance change.
+        """
+        now = int(time.time() * 1000)
+        await self.publish(
+            {"e": "balanceUpdate", "E": now, "a": asset, "d": delta, "T": now}
+        )
+
+    async def disconnect(self) -> None:
+        """
+        Close every open stream, as the exchange does every 24 hours.
+        """
+        for socket in list(self.sockets) + list(self.market_sockets):
+            await socket.close()
+
+    async def stats(self, request: web.Request) -> web.Response:
+        """
+        Serve the request counters, for benchmarks running in another process.
+
+        Args:
+            request (web.Request): The request.
+
+        Returns:
+            web.Response: The JSON counters.
+        """
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "requests_by_endpoint": self.requests_by_endpoint,
+                "rate_limited": self.rate_limited,
+            }
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Serve a REST request with the configured latency and weight limits.
+
+        Args:
+            request (web.Request): The request.
+
+        Returns:
+            web.Response: The JSON response.
+        """
+        endpoint = request.path
+        self.requests += 1
+        self.requests_by_endpoint[endpoint] += 1
+        await asyncio.sleep(self.latency)
+        headers, retry_after = self._charge(endpoint)
+        if retry_after is not None:
+            self.rate_limited += 1
+            headers["Retry-After"] = str(retry_after)
+            body = {"code": -1003, "msg": "Too many requests."}
+            return web.json_response(body, status=429, headers=headers)
+        if endpoint in SIGNED_ENDPOINTS and "signature" not in request.query:
+            body = {
+                "code": -1102,
+                "msg": "Mandatory parameter 'signature' was not sent.",
+            }
+            return web.json_response(body, status=400, headers=headers)
+        body = self.respond(endpoint, dict(request.query))
+        if body is None:
+            return web.json_response(
+                {"code": -1, "msg": "Unknown endpoint."}, status=404
+            )
+        return web.json_response(body, headers=headers)
+
+    def app(self) -> web.Application:
+        """
+        Build the aiohttp application serving this exchange.
+
+        Returns:
+            web.Application: The application.
+        """
+        app = web.Application()
+        app.router.add_get("/mock/stats", self.stats)
+        app.router.add_get("/ws/{listen_key}", self.user_stream)
+        app.router.add_get("/stream", self.market_stream)
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+
+class MockServer:
+    """
+    Run a MockBinance in a background thread, for scripts and benchmarks.
+
+    Args:
+        exchange (MockBinance, optional): The exchange to serve. Defaults to a
+            MockBinance with default settings.
+        host (str, optional): The host to bind. Defaults to 127.0.0.1.
+        port (int, optional): The port to bind. Defaults to a free port.
+    """
+
+    def __init__(
+        self,
+        exchange: Optional[MockBinance] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.exchange = exchange or MockBinance()
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _start(self) -> None:
+        self._runner = web.AppRunner(self.exchange.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> str:
+        """
+        Start serving in a background thread.
+
+        Returns:
+            str: The base URL of the server.
+        """
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self.base_url
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the background event loop.
+        """
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def run(self, coroutine: Any) -> Any:
+        """
+        Run a coroutine of the exchange, e.g. fill, on the server's event loop.
+
+        Args:
+            coroutine (Any): The coroutine.
+
+        Returns:
+            Any: Its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def __enter__(self) -> "MockServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Binance API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--trades-per-symbol", type=int, default=2_000)
+    parser.add_argument("--converts", type=int, default=2_000)
+    parser.add_argument("--deposits", type=int, default=200)
+    parser.add_argument("--withdrawals", type=int, default=200)
+    parser.add_argument("--fiat-payments", type=int, default=300)
+    parser.add_argument("--days", type=int, default=730)
+    args = parser.parse_args()
+    exchange = MockBinance(
+        seed=args.seed,
+        latency=args.latency,
+        trades_per_symbol=args.trades_per_symbol,
+        converts=args.converts,
+        deposits=args.deposits,
+        withdrawals=args.withdrawals,
+        fiat_payments=args.fiat_payments,
+        days=args.days,
+    )
+    web.run_app(exchange.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
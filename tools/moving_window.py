@@ -1,17 +1,70 @@
-from dateutil.relativedelta import relativedelta
-from dateutil.parser import parse
-
-
-# function to split the date range into moving windows of 1 month
-def moving_window(start_date, end_date):
-    start_date = parse(start_date, dayfirst=True)
-    end_date = parse(end_date, dayfirst=True)
-    while start_date < end_date:
-        if start_date + relativedelta(months=1) > end_date:
-            break
-        yield (
-            start_date.strftime("%d-%m-%Y"),
-            (start_date + relativedelta(months=1)).strftime("%d-%m-%Y"),
-        )
-        start_date = start_date + relativedelta(months=1)
-    yield (start_date.strftime("%d-%m-%Y"), end_date.strftime("%d-%m-%Y"))
+DAY_MS = 86_400_000
+# Don't split a full window below this span, in milliseconds
+MIN_SPAN = 60_000
+# Maximum time span and page size of each windowed endpoint
+ENDPOINT_LIMITS = {
+    "/sapi/v1/convert/tradeFlow": (30 * DAY_MS, 1000),
+    "/sapi/v1/fiat/payments": (90 * DAY_MS, 500),
+    "/sapi/v1/capital/deposit/hisrec": (90 * DAY_MS, 1000),
+    "/sapi/v1/capital/withdraw/history": (90 * DAY_MS, 1000),
+}
+DEFAULT_LIMITS = (30 * DAY_MS, None)
+PAGE_KEYS = {"/sapi/v1/convert/tradeFlow": "list", "/sapi/v1/fiat/payments": "data"}
+
+
+def plan_windows(endpoint, start, end):
+    """
+    Split a time range into the widest windows the endpoint accepts.
+
+    Windows don't overlap: each one ends 1 ms before the next one starts.
+
+    Args:
+        endpoint (str): The endpoint URL path.
+        start (int): The start of the range in milliseconds.
+        end (int): The end of the range in milliseconds (inclusive).
+
+    Returns:
+        list: The (start, end) windows in milliseconds, in time order.
+    """
+    span, _ = ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMITS)
+    windows = []
+    while start <= end:
+        windows.append((start, min(start + span - 1, end)))
+        start += span
+    return windows
+
+
+def split_window(window):
+    """
+    Split a window in two halves.
+
+    Args:
+        window (tuple): The (start, end) window in milliseconds.
+
+    Returns:
+        list: The two (start, end) halves, in time order.
+    """
+    start, end = window
+    middle = (start + end) // 2
+    return [(start, middle), (middle + 1, end)]
+
+
+def is_full(endpoint, response):
+    """
+    Check whether a window's response hit the endpoint's page size.
+
+    A full page may have been truncated, so its window must be split and
+    fetched again.
+
+    Args:
+        endpoint (str): The endpoint URL path.
+        response (Any): The response from the API.
+
+    Returns:
+        bool: True if the response holds as many rows as the page size.
+    """
+    _, row_limit = ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMITS)
+    rows = response
+    if endpoint in PAGE_KEYS and isinstance(response, dict):
+        rows = response.get(PAGE_KEYS[endpoint])
+    return row_limit is not None and isinstance(rows, list) and len(rows) >= row_limit
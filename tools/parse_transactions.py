@@ -1,6 +1,13 @@
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple
+from tzlocal import get_localzone
+
+# The readable minutes and seconds of each second of an hour
+MINUTES_SECONDS = [f"{m:02d}:{s:02d}" for m in range(60) for s in range(60)]
 
 
 def _safe_get(data: dict, dot_chained_keys: str):
@@ -26,19 +33,45 @@ def _safe_get(data: dict, dot_chained_keys: str):
     return data
 
 
-def _readable_datetime(timestamp):
+def datetime_to_milliseconds(dt):
+    """
+    Convert local datetimes to timestamps in milliseconds.
+
+    Args:
+        dt (pd.Series): The datetimes or readable datetime strings, in local time.
+            Integer timestamps are returned unchanged.
+
+    Returns:
+        pd.Series: The timestamps in milliseconds.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_integer_dtype(dt):
+        return dt
+    local = pd.to_datetime(dt).dt.tz_localize(
+        get_localzone(),
+        ambiguous=np.ones(len(dt), dtype=bool),
+        nonexistent="shift_forward",
+    )
+    return local.dt.tz_convert("UTC").dt.tz_localize(None).astype("int64") // 10**6
+
+
+def utc_datetime_to_milliseconds(dt):
     """
-    Convert a timestamp to a readable datetime string.
+    Convert UTC datetime strings, as the API returns some times, to timestamps
+    in milliseconds.
 
     Args:
-        timestamp (int): The timestamp in milliseconds.
+        dt (pd.Series): The datetime strings, in UTC.
 
     Returns:
-        str: The readable datetime string.
+        pd.Series: The timestamps in milliseconds.
     """
-    if isinstance(timestamp, str):
-        return timestamp
-    return str(datetime.fromtimestamp(timestamp / 1000)).split(".")[0]
+    import pandas as pd
+
+    utc = pd.to_datetime(dt, utc=True, format="ISO8601")
+    return utc.dt.tz_localize(None).astype("int64") // 10**6
 
 
 def parse_json(transactions, transaction_type):
@@ -62,15 +95,13 @@ def parse_json(transactions, transaction_type):
     return extract_transactions
 
 
-def select_config(transaction_type):
+@lru_cache(maxsize=None)
+def load_configs():
     """
-    Select the appropriate transaction parser based on the transaction type.
-
-    Args:
-        transaction_type (str): The type of transaction.
+    Load the transaction configurations, parsing the config file only once.
 
     Returns:
-        function: A partial function for parsing transactions with the specified configuration.
+        dict: The configuration of each transaction type.
     """
     # Construct path to config file relative to this script
     json_path = Path(__file__).parent / "transaction_configs.json"
@@ -82,11 +113,24 @@ def select_config(transaction_type):
     try:
         # Open and parse the JSON config file
         with open(json_path, "r") as config_file:
-            config = json.load(config_file).get(transaction_type)
+            return json.load(config_file)
     except json.JSONDecodeError as e:
         # Handle JSON parsing errors
         raise ValueError(f"Error decoding JSON from {json_path}: {e}")
 
+
+def select_config(transaction_type):
+    """
+    Select the appropriate transaction parser based on the transaction type.
+
+    Args:
+        transaction_type (str): The type of transaction.
+
+    Returns:
+        dict: The configuration dictionary for the transaction type.
+    """
+    config = load_configs().get(transaction_type)
+
     # Ensure config exists for the requested transaction type
     if config is None:
         raise ValueError(f"No configuration found for {transaction_type}.")
@@ -94,35 +138,182 @@ def select_config(transaction_type):
     return config
 
 
-def transform_keys(transactions, config):
+class KeyMapping(NamedTuple):
+    """
+    Field mapping of a transaction type, compiled once from its configuration.
+
+    Attributes:
+        response_keys (list): The keys of the API response to keep.
+        rename (dict): The unified key of each response key.
+        time_keys (list): The unified keys holding timestamps.
+        keys (list): The unified keys, in output order.
+    """
+
+    response_keys: list
+    rename: dict
+    time_keys: list
+    keys: list
+
+
+@lru_cache(maxsize=None)
+def _compile(keys, response_keys):
+    return KeyMapping(
+        response_keys=list(response_keys),
+        rename=dict(zip(response_keys, keys)),
+        time_keys=[k for k, rk in zip(keys, response_keys) if "time" in rk.lower()],
+        keys=list(keys),
+    )
+
+
+def compile_config(config=None, transaction_type=None):
+    """
+    Get the compiled field mapping of a configuration or transaction type.
+
+    Args:
+        config (dict, optional): The configuration dictionary.
+        transaction_type (str, optional): The type of transaction, whose
+            registered configuration is used if no config is given.
+
+    Returns:
+        KeyMapping: The compiled field mapping.
+    """
+    if config is None and transaction_type is not None:
+        config = select_config(transaction_type)
+    if config is None:
+        raise ValueError("Either a config or a transaction type is required.")
+    return _compile(tuple(config["keys"]), tuple(config["response_keys"]))
+
+
+def _local_datetime(timestamps):
+    """
+    Convert API times to local datetimes, to the second.
+
+    Args:
+        timestamps (pd.Series): The timestamps in milliseconds, or datetime
+            strings in UTC.
+
+    Returns:
+        pd.Series: The local datetimes.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(timestamps):
+        utc = pd.to_datetime(timestamps, unit="ms", utc=True)
+    else:
+        utc = pd.to_datetime(timestamps, utc=True, format="ISO8601")
+    return utc.dt.tz_convert(get_localzone()).dt.tz_localize(None).dt.floor("s")
+
+
+def transform_frame(transactions, config=None, transaction_type=None):
+    """
+    Transform transaction keys column by column into a DataFrame.
+
+    Args:
+        transactions (list): The list of transactions.
+        config (dict, optional): The configuration dictionary for the transaction type.
+        transaction_type (str, optional): The type of transaction, whose
+            registered configuration is used if no config is given.
+
+    Returns:
+        pd.DataFrame: The transformed transactions, with local datetimes.
+    """
+    import numpy as np
+    import pandas as pd
+
+    mapping = compile_config(config, transaction_type)
+    df = pd.DataFrame.from_records(
+        transactions, columns=mapping.response_keys + ["isBuyer"]
+    )
+    is_buyer = df.pop("isBuyer")
+    # Transform each response key to a new key to unify the format
+    df.columns = mapping.keys
+    for key in mapping.time_keys:
+        df[key] = _local_datetime(df[key])
+    # Special handling for trade type transactions to set buy/sell side
+    if is_buyer.notna().any():
+        df["side"] = np.where(is_buyer.astype(bool), "BUY", "SELL")
+    return df
+
+
+class _LocalDatetimeFormatter:
+    """
+    Format API times as readable local datetime strings, to the second.
+
+    The UTC offset of each quarter-hour, when offsets change, and the date and
+    hour of each local hour are computed once, so the rows of a response only
+    look them up.
+
+    Args:
+        zone (tzinfo): The local time zone.
+    """
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.offsets = {}
+        self.hours = {}
+
+    def __call__(self, timestamp):
+        """
+        Format an API time.
+
+        Args:
+            timestamp (int | str): The timestamp in milliseconds, or a datetime
+                string in UTC.
+
+        Returns:
+            str: The readable datetime string, or None for missing times.
+        """
+        if timestamp is None:
+            return None
+        if isinstance(timestamp, str):
+            utc = datetime.fromisoformat(timestamp)
+            if utc.tzinfo is None:
+                utc = utc.replace(tzinfo=timezone.utc)
+            seconds = int(utc.replace(microsecond=0).timestamp())
+        else:
+            seconds = timestamp // 1000
+        quarter = seconds // 900
+        offset = self.offsets.get(quarter)
+        if offset is None:
+            offset = datetime.fromtimestamp(quarter * 900, self.zone).utcoffset()
+            offset = self.offsets[quarter] = int(offset.total_seconds())
+        hour, second = divmod(seconds + offset, 3600)
+        prefix = self.hours.get(hour)
+        if prefix is None:
+            prefix = self.hours[hour] = time.strftime(
+                "%Y-%m-%d %H:", time.gmtime(hour * 3600)
+            )
+        return prefix + MINUTES_SECONDS[second]
+
+
+def transform_keys(transactions, config=None, transaction_type=None):
     """
     Transform transaction keys based on the configuration.
 
+    Rows are transformed one by one with the compiled field mapping, which is
+    faster than building a DataFrame for the list-of-dicts output and does not
+    need pandas. Use transform_frame to get the columns of large responses.
+
     Args:
         transactions (list): The list of transactions.
-        config (dict): The configuration dictionary for the transaction type.
+        config (dict, optional): The configuration dictionary for the transaction type.
+        transaction_type (str, optional): The type of transaction, whose
+            registered configuration is used if no config is given.
 
     Returns:
         list: The list of transformed transactions.
     """
+    mapping = compile_config(config, transaction_type)
+    pairs = list(zip(mapping.keys, mapping.response_keys))
+    readable = _LocalDatetimeFormatter(get_localzone())
     converted_transactions_data = []
-    # Iterate through each transaction in the transactions list
     for transaction in transactions:
-        # Create pairs of keys from config using zip
-        key_pairs = zip(config["keys"], config["response_keys"])
         # Transform each response key to a new key to unify the format
-        data = {
-            key: (
-                # If key contains "time", convert timestamp to readable datetime
-                transaction[response_key]
-                if "time" not in response_key.lower()
-                else _readable_datetime(transaction[response_key])
-            )
-            for key, response_key in key_pairs
-        }
+        data = {key: transaction.get(response_key) for key, response_key in pairs}
+        for key in mapping.time_keys:
+            data[key] = readable(data[key])
         # Special handling for trade type transactions to set buy/sell side
         if "isBuyer" in transaction:
             data["side"] = "BUY" if transaction["isBuyer"] else "SELL"
-        # Add the transformed transaction to the result list
         converted_transactions_data.append(data)
     return converted_transactions_data
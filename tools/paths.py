@@ -0,0 +1,5 @@
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = Path(os.environ.get("CRYPTO_TRACKER_DATA", ROOT_DIR / "data"))
@@ -0,0 +1,223 @@
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from tzlocal import get_localzone
+
+from tools.ledger_store import read_ledger
+from tools.price_cache import INTERVAL_MS, get_price_store
+from tools.send_request import to_milliseconds
+from tools.symbols import QUOTE_ASSETS
+
+# Grid frequencies, each valued with the klines of the same interval
+FREQUENCIES = ("1d", "1h")
+MOVEMENT_COLUMNS = ["dt", "asset", "amount"]
+
+
+def _movements(dt, asset, amount) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "dt": np.asarray(dt, dtype="int64"),
+            "asset": np.asarray(asset, dtype=object).astype(str),
+            "amount": np.asarray(amount, dtype=float),
+        }
+    )
+
+
+def _trade_movements(trades: pd.DataFrame, quotes: pd.Series) -> List[pd.DataFrame]:
+    sign = np.where(trades["side"].astype(str) == "SELL", -1.0, 1.0)
+    pairs = trades["pair"].astype(str)
+    base = pd.Series(
+        [pair[: -len(quote)] for pair, quote in zip(pairs, quotes)], dtype=object
+    )
+    return [
+        _movements(trades["dt"], base, sign * trades["amount"]),
+        _movements(trades["dt"], quotes, -sign * trades["value"]),
+        _movements(trades["dt"], trades["fee_asset"], -trades["fee"]),
+    ]
+
+
+def load_movements(
+    end: Optional[str | int] = None, ledger_path: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Load every balance change recorded in the ledger.
+
+    Trades move the base and quote assets and charge their fee. Converts move
+    both assets, deposits and withdrawals (with their fee) one, and fiat
+    payments the crypto bought or sold.
+
+    Args:
+        end (str | int, optional): The end of the range (exclusive).
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The time in milliseconds, asset and signed amount of each
+        balance change.
+    """
+    read = lambda transaction_type: read_ledger(
+        transaction_type, end=end, path=ledger_path
+    )
+    frames = []
+    trades = read("trade")
+    if not trades.empty:
+        pairs = trades["pair"].astype(str)
+        quotes = pd.Series(None, index=trades.index, dtype=object)
+        for quote in QUOTE_ASSETS:
+            quotes[pairs.str.endswith(quote) & quotes.isna()] = quote
+        known = quotes.notna()
+        frames += _trade_movements(trades[known], quotes[known])
+    converts = read("convert")
+    frames.append(
+        _movements(converts["dt"], converts["from_asset"], -converts["from_amount"])
+    )
+    frames.append(
+        _movements(converts["dt"], converts["to_asset"], converts["to_amount"])
+    )
+    deposits = read("deposit")
+    frames.append(
+        _movements(deposits["dt"], deposits["to_asset"], deposits["to_amount"])
+    )
+    withdrawals = read("withdraw")
+    frames.append(
+        _movements(
+            withdrawals["dt"],
+            withdrawals["from_asset"],
+            -(withdrawals["from_amount"] + withdrawals["fee"].fillna(0)),
+        )
+    )
+    payments = read("fiat")
+    sign = np.where(payments["side"].astype(str) == "SELL", -1.0, 1.0)
+    frames.append(
+        _movements(payments["dt"], payments["to_asset"], sign * payments["to_amount"])
+    )
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=MOVEMENT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _local_index(grid: np.ndarray) -> pd.DatetimeIndex:
+    utc = pd.to_datetime(grid, unit="ms", utc=True)
+    return utc.tz_convert(get_localzone()).tz_localize(None).rename("dt")
+
+
+def _holdings(
+    freq: str,
+    start: Optional[str | int],
+    end: Optional[str | int],
+    ledger_path: Optional[Path],
+) -> pd.DataFrame:
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Invalid frequency: {freq}")
+    step = INTERVAL_MS[freq]
+    end = to_milliseconds(end) if end is not None else int(time.time() * 1000)
+    movements = load_movements(end=end, ledger_path=ledger_path)
+    if movements.empty:
+        return pd.DataFrame(index=np.array([], dtype="int64"))
+    bucket = movements["dt"].to_numpy() // step * step
+    first = to_milliseconds(start) // step * step if start is not None else bucket.min()
+    grid = np.arange(min(first, bucket.min()), end, step, dtype="int64")
+    changes = (
+        movements.groupby([bucket, "asset"])["amount"].sum().unstack(fill_value=0.0)
+    )
+    holdings = changes.reindex(grid, fill_value=0.0).cumsum()
+    holdings.columns.name = None
+    return holdings[holdings.index >= first]
+
+
+def holdings_history(
+    freq: str = "1d",
+    start: Optional[str | int] = None,
+    end: Optional[str | int] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Reconstruct the holdings of each asset over a dense time grid.
+
+    Balance changes are summed per bucket of the grid, then accumulated, so
+    each row holds the balances at the end of its bucket.
+
+    Args:
+        freq (str, optional): The grid step, one of FREQUENCIES. Defaults to "1d".
+        start (str | int, optional): The start of the grid. Defaults to the
+            first transaction.
+        end (str | int, optional): The end of the grid. Defaults to now.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The holdings, one column per asset, indexed by the local
+        start time of each bucket. The grid is aligned on UTC days/hours, as
+        the klines are.
+    """
+    holdings = _holdings(freq, start, end, ledger_path)
+    holdings.index = _local_index(holdings.index.to_numpy())
+    return holdings
+
+
+def price_history(
+    assets: List[str], grid: np.ndarray, freq: str = "1d"
+) -> pd.DataFrame:
+    """
+    Get the USDT price of each asset over a time grid, from cached klines.
+
+    Each symbol's klines are backfilled in bulk on first use. USD and
+    stablecoins are priced at 1, and assets without a USDT market at NaN.
+
+    Args:
+        assets (List[str]): The assets.
+        grid (np.ndarray): The start time of each bucket, in milliseconds.
+        freq (str, optional): The kline interval. Defaults to "1d".
+
+    Returns:
+        pd.DataFrame: The prices, one column per asset, indexed by the grid.
+    """
+    store = get_price_store()
+    frames = []
+    for asset in assets:
+        if "USD" in asset:
+            continue
+        try:
+            klines = store.load_prices(f"{asset}USDT", grid, interval=freq)
+        except ValueError:
+            continue
+        frames.append(klines.assign(asset=asset))
+    prices = pd.DataFrame(np.nan, index=grid, columns=assets)
+    prices[[asset for asset in assets if "USD" in asset]] = 1.0
+    if frames:
+        klines = pd.concat(frames).pivot(
+            index="open_time", columns="asset", values="price"
+        )
+        prices.update(klines.reindex(grid))
+    return prices
+
+
+def portfolio_history(
+    freq: str = "1d",
+    start: Optional[str | int] = None,
+    end: Optional[str | int] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Value the holdings of each asset over a dense time grid.
+
+    Args:
+        freq (str, optional): The grid step, one of FREQUENCIES. Defaults to "1d".
+        start (str | int, optional): The start of the grid. Defaults to the
+            first transaction.
+        end (str | int, optional): The end of the grid. Defaults to now.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The USD value of each asset and the total, indexed by the
+        local start time of each bucket. Assets without a price count as 0 in
+        the total.
+    """
+    holdings = _holdings(freq, start, end, ledger_path)
+    prices = price_history(list(holdings.columns), holdings.index.to_numpy(), freq)
+    values = holdings * prices
+    values["total"] = values.sum(axis=1)
+    values.index = _local_index(values.index.to_numpy())
+    return values
@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tools.paths import DATA_DIR
+from tools.send_request import send_public_request, set_payload
+
+KLINES_ENDPOINT = "/api/v3/klines"
+KLINES_LIMIT = 1000
+INTERVAL_MS = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+LRU_SIZE = 65_536
+# Typed even when empty, so that rows without a price merge to NaN
+PRICE_DTYPES = {"open_time": "int64", "price": "float64"}
+
+_store = None
+
+
+def _fetch_klines(
+    symbol: str, interval: str, start: int, end: int, limit: int
+) -> List[List[Any]]:
+    """
+    Fetch raw klines from the Binance API.
+
+    Args:
+        symbol (str): The symbol to fetch.
+        interval (str): The kline interval.
+        start (int): The start time in milliseconds.
+        end (int): The end time in milliseconds (inclusive).
+        limit (int): The maximum number of klines to return.
+
+    Returns:
+        List[List[Any]]: The klines, as returned by the API.
+    """
+    params = set_payload(
+        KLINES_ENDPOINT,
+        symbol=symbol,
+        start=start,
+        end=end,
+        interval=interval,
+        limit=limit,
+    )
+    return send_public_request(KLINES_ENDPOINT, params)
+
+
+class PriceStore:
+    """
+    Persistent kline store answering price lookups locally.
+
+    Klines are kept in SQLite keyed by symbol, interval and open time, along
+    with the time ranges that have already been fetched. A lookup outside of
+    any fetched range backfills a whole page of klines at the API's maximum
+    limit, so neighbouring lookups are then answered without a request. An
+    in-memory LRU sits in front of the database.
+
+    Args:
+        path (Path, optional): The SQLite database file.
+            Defaults to DATA_DIR / "prices.sqlite".
+        fetch (Callable, optional): The function used to fetch klines, with the
+            signature of _fetch_klines.
+        lru_size (int, optional): The number of lookups kept in memory.
+            Defaults to LRU_SIZE.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        fetch: Callable[..., List[List[Any]]] = _fetch_klines,
+        lru_size: int = LRU_SIZE,
+    ) -> None:
+        self.path = Path(path or DATA_DIR / "prices.sqlite")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fetch = fetch
+        self.requests = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coverage_range
+                ON coverage (symbol, interval, start, end);
+            """)
+        self._cached_price = lru_cache(maxsize=lru_size)(self._price)
+
+    def close(self) -> None:
+        """
+        Close the underlying database connection.
+        """
+        self._conn.close()
+
+    def is_covered(self, symbol: str, interval: str, start: int, end: int) -> bool:
+        """
+        Check whether a time range lies within a single fetched range.
+
+        Args:
+            symbol (str): The symbol.
+            interval (str): The kline interval.
+            start (int): The start time in milliseconds.
+            end (int): The end time in milliseconds (exclusive).
+
+        Returns:
+            bool: True if no request is needed to answer lookups in the range.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM coverage WHERE symbol = ? AND interval = ? "
+                "AND start <= ? AND end >= ? LIMIT 1",
+                (symbol, interval, start, end),
+            ).fetchone()
+        return row is not None
+
+    def backfill(self, symbol: str, interval: str, start: int, end: int) -> None:
+        """
+        Fetch and store every kline of a time range, one full page at a time.
+
+        A range reaching into the future is only recorded as fetched up to its
+        last closed kline, so later lookups fetch the klines still to come.
+
+        Args:
+            symbol (str): The symbol.
+            interval (str): The kline interval.
+            start (int): The start time in milliseconds.
+            end (int): The end time in milliseconds (exclusive).
+        """
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        covered = start
+        cursor = start
+        while cursor < end:
+            klines = self.fetch(symbol, interval, cursor, end - 1, KLINES_LIMIT)
+            self.requests += 1
+            if not isinstance(klines, list):
+                raise ValueError(f"Error fetching {symbol} klines: {klines}")
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (symbol, interval, k[0], float(k[2]), float(k[3]))
+                        for k in klines
+                    ],
+                )
+            if klines:
+                covered = klines[-1][0] + step
+            if len(klines) < KLINES_LIMIT:
+                break
+            cursor = klines[-1][0] + step
+        if end > now:
+            end = min(end, covered, now)
+        if end > start:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO coverage VALUES (?, ?, ?, ?)",
+                    (symbol, interval, start, end),
+                )
+
+    def ensure_range(self, symbol: str, interval: str, start: int, end: int) -> None:
+        """
+        Backfill a time range unless it has already been fetched.
+
+        Args:
+            symbol (str): The symbol.
+            interval (str): The kline interval.
+            start (int): The start time in milliseconds.
+            end (int): The end time in milliseconds (exclusive).
+        """
+        if not self.is_covered(symbol, interval, start, end):
+            self.backfill(symbol, interval, start, end)
+
+    def nearest(self, symbol: str, interval: str, timestamp: int) -> Optional[float]:
+        """
+        Get the average price of the stored kline closest to a timestamp.
+
+        Ties go to the later kline, as the API returns the first kline opening
+        at or after the requested start time.
+
+        Args:
+            symbol (str): The symbol.
+            interval (str): The kline interval.
+            timestamp (int): The time in milliseconds.
+
+        Returns:
+            Optional[float]: The average of the kline's high and low, or None if
+            nothing is stored for the symbol.
+        """
+        with self._lock:
+            after = self._conn.execute(
+                "SELECT open_time, high, low FROM klines WHERE symbol = ? "
+                "AND interval = ? AND open_time >= ? ORDER BY open_time LIMIT 1",
+                (symbol, interval, timestamp),
+            ).fetchone()
+            before = self._conn.execute(
+                "SELECT open_time, high, low FROM klines WHERE symbol = ? "
+                "AND interval = ? AND open_time < ? ORDER BY open_time DESC LIMIT 1",
+                (symbol, interval, timestamp),
+            ).fetchone()
+        candidates = [k for k in (after, before) if k is not None]
+        if not candidates:
+            return None
+        _, high, low = min(candidates, key=lambda k: abs(k[0] - timestamp))
+        return (high + low) / 2
+
+    def load_prices(
+        self, symbol: str, timestamps: Iterable[int], interval: str = "1s"
+    ) -> pd.DataFrame:
+        """
+        Get every stored price around a set of timestamps, backfilling in bulk.
+
+        Timestamps are grouped into spans separated by more than one page of
+        klines, and each span not yet fetched is backfilled with full pages.
+
+        Args:
+            symbol (str): The symbol.
+            timestamps (Iterable[int]): The times in milliseconds.
+            interval (str, optional): The kline interval. Defaults to "1s".
+
+        Returns:
+            pd.DataFrame: The open_time and average price of each kline covering
+            the spans, sorted by open_time.
+        """
+        step = INTERVAL_MS[interval]
+        aligned = np.unique(-(-np.asarray(timestamps, dtype="int64") // step) * step)
+        if aligned.size == 0:
+            return pd.DataFrame(columns=list(PRICE_DTYPES)).astype(PRICE_DTYPES)
+        breaks = np.flatnonzero(np.diff(aligned) > KLINES_LIMIT * step) + 1
+        for span in np.split(aligned, breaks):
+            self.ensure_range(symbol, interval, int(span[0]), int(span[-1]) + step)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT open_time, (high + low) / 2 FROM klines WHERE symbol = ? "
+                "AND interval = ? AND open_time >= ? AND open_time <= ? "
+                "ORDER BY open_time",
+                (symbol, interval, int(aligned[0]), int(aligned[-1]) + step),
+            ).fetchall()
+        return pd.DataFrame(rows, columns=list(PRICE_DTYPES)).astype(PRICE_DTYPES)
+
+    def _price(self, symbol: str, interval: str, timestamp: int) -> float:
+        step = INTERVAL_MS[interval]
+        if not self.is_covered(symbol, interval, timestamp, timestamp + step):
+            self.backfill(symbol, interval, timestamp, timestamp + KLINES_LIMIT * step)
+        price = self.nearest(symbol, interval, timestamp)
+        if price is None:
+            raise ValueError(f"No {interval} kline found for {symbol} at {timestamp}")
+        return price
+
+    def get_price(self, symbol: str, timestamp: int, interval: str = "1s") -> float:
+        """
+        Get the average price of a symbol at a given time.
+
+        Args:
+            symbol (str): The symbol.
+            timestamp (int): The time in milliseconds.
+            interval (str, optional): The kline interval. Defaults to "1s".
+
+        Returns:
+            float: The average of the high and low of the nearest kline.
+        """
+        step = INTERVAL_MS[interval]
+        # Align on the next kline opening, the one the API would have returned
+        aligned = -(-timestamp // step) * step
+        if aligned + step > time.time() * 1000:
+            # The kline has not closed yet, keep it out of the LRU
+            return self._price(symbol, interval, aligned)
+        return self._cached_price(symbol, interval, aligned)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the number of requests made and the LRU statistics.
+
+        Returns:
+            Dict[str, Any]: The statistics.
+        """
+        info = self._cached_price.cache_info()
+        return {"requests": self.requests, "hits": info.hits, "misses": info.misses}
+
+
+def get_price_store() -> PriceStore:
+    """
+    Get the shared price store, opening it on first use.
+
+    Returns:
+        PriceStore: The shared price store.
+    """
+    global _store
+    if _store is None:
+        _store = PriceStore()
+    return _store
@@ -1,9 +1,42 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from tools.send_request import set_payload, send_public_request
+from tools.fixed_point import (
+    PRICE_DECIMALS,
+    USD_DECIMALS,
+    asset_decimals,
+    divide,
+    group_sum,
+    multiply,
+    to_float,
+    to_units,
+)
+from tools.ledger_store import iter_ledger, read_ledger
+from tools.parse_transactions import datetime_to_milliseconds
+from tools.price_cache import INTERVAL_MS, get_price_store
+from tools.profiling import stage
+from tools.send_request import to_milliseconds
 from pprint import pprint
 
+# Rows valued at once in streaming mode
+CHUNK_ROWS = 100_000
+# Both sides of each transaction, so buys and sells can be valued alike
+VALUATION_COLUMNS = {
+    "fiat": [
+        "id",
+        "dt",
+        "side",
+        "status",
+        "from_asset",
+        "from_amount",
+        "to_asset",
+        "to_amount",
+        "price",
+        "fee_cost",
+    ],
+    "convert": ["id", "dt", "from_asset", "from_amount", "to_asset", "to_amount"],
+}
+
 
 def _convert_dt_format(string, from_format, to_format):
     """
@@ -34,69 +67,246 @@ def _get_usdt_price(symbol, start):
     Returns:
         float: The average price.
     """
-    endpoint = "/api/v3/klines"
     old_format = "%Y-%m-%d %H:%M:%S"
     new_format = "%d-%m-%Y %H:%M:%S"
     start_formatted = _convert_dt_format(str(start), old_format, new_format)
-    params = set_payload(endpoint, symbol=symbol, start=start_formatted)
-    response = send_public_request(endpoint, params)
-    avg_price = (float(response[0][2]) + float(response[0][3])) / 2
-    return avg_price
+    return get_price_store().get_price(symbol, to_milliseconds(start_formatted))
 
 
-def _calculate_avg(csv_file, transactions, amount_side):
-    if "fiat" in csv_file:
-        return float(
-            (transactions[amount_side] * transactions["price"]).sum()
-            / transactions[amount_side].sum()
+def _lookup_usdt_prices(symbols, dt):
+    """
+    Resolve the USDT price of many (symbol, datetime) pairs in bulk.
+
+    Each symbol's timestamps are backfilled in one step through the price store,
+    then joined back onto the rows with an as-of merge on the nearest kline.
+
+    Args:
+        symbols (pd.Series): The symbol to price for each row.
+        dt (pd.Series): The datetime strings of each row, in local time.
+
+    Returns:
+        pd.Series: The average prices, aligned on the index of symbols.
+    """
+    store = get_price_store()
+    step = INTERVAL_MS["1s"]
+    rows = pd.DataFrame({"symbol": symbols, "ts": datetime_to_milliseconds(dt)})
+    # Align on the next kline opening, the one the API would have returned
+    rows["ts"] = -(-rows["ts"] // step) * step
+    prices = []
+    for symbol, group in rows.groupby("symbol", sort=False):
+        klines = store.load_prices(symbol, group["ts"])
+        merged = pd.merge_asof(
+            group.rename_axis("row").reset_index().sort_values("ts"),
+            klines,
+            left_on="ts",
+            right_on="open_time",
+            direction="nearest",
         )
-    if "convert" in csv_file:
-        return float(transactions["usd_value"].sum() / transactions[amount_side].sum())
+        prices.append(merged.set_index("row")["price"])
+    if not prices:
+        return pd.Series(np.nan, index=symbols.index, dtype=float)
+    return pd.concat(prices).reindex(symbols.index)
 
 
 def _fiat_price_in_usd(df):
     if "price" not in df.columns:
         raise ValueError("The 'price' column is missing.")
-    df["price_in_usd"] = np.where(
-        df["to_asset"].str.contains("USD"),
-        1 / df["price"],
-        [_get_usdt_price("EURUSDT", dt) for dt in df["dt"].values],
-    )
+    in_usd = df["to_asset"].str.contains("USD")
+    df["price_in_usd"] = 1 / df["price"]
+    if not in_usd.all():
+        df.loc[~in_usd, "price_in_usd"] = _lookup_usdt_prices(
+            pd.Series("EURUSDT", index=df.index[~in_usd]), df.loc[~in_usd, "dt"]
+        )
     return df
 
 
 def _usd_convert_value(df):
-    mask = df["to_asset"].str.contains("USD") | df["from_asset"].str.contains("USD")
-    missing_usd_value = lambda row: row["from_amount"] * _get_usdt_price(
-        f"{row['from_asset']}USDT", row["dt"]
-    )
-    df["usd_value"] = np.where(~mask, df[~mask].apply(missing_usd_value, axis=1), "")
-    copy_usd_value = lambda row: (
-        row["from_amount"] if "USD" in row["from_asset"] else row["to_amount"]
-    )
-    df.loc[mask, "usd_value"] = df[mask].apply(copy_usd_value, axis=1)
+    from_usd = df["from_asset"].str.contains("USD")
+    mask = df["to_asset"].str.contains("USD") | from_usd
+    df["usd_value"] = np.where(from_usd, df["from_amount"], df["to_amount"])
     df["usd_value"] = df["usd_value"].astype(float)
+    if not mask.all():
+        priced = df.loc[~mask]
+        prices = _lookup_usdt_prices(
+            priced["from_asset"].astype(str) + "USDT", priced["dt"]
+        )
+        # Exact product of the amount and the price, rounded to the USD precision
+        decimals = asset_decimals(priced["from_asset"].astype(str))
+        value = multiply(
+            to_units(priced["from_amount"], decimals),
+            decimals,
+            to_units(prices, PRICE_DECIMALS),
+            PRICE_DECIMALS,
+            USD_DECIMALS,
+        )
+        df.loc[~mask, "usd_value"] = np.where(
+            prices.isna(), np.nan, to_float(value, USD_DECIMALS)
+        )
     return df
 
 
-def add_usd_prices(csv_file):
-    df = pd.read_csv(csv_file)
-    if "fiat" in csv_file:
+def _load_transactions(source):
+    """
+    Load transactions from a CSV file or from the ledger.
+
+    Args:
+        source (str): The path of a CSV file, or a transaction type to read from
+            the ledger.
+
+    Returns:
+        pd.DataFrame: The transactions.
+    """
+    if str(source).endswith(".csv"):
+        return pd.read_csv(source)
+    return read_ledger(source, columns=VALUATION_COLUMNS.get(source))
+
+
+def _iter_transactions(source, chunksize):
+    """
+    Load transactions from a CSV file or from the ledger in chunks.
+
+    Args:
+        source (str): The path of a CSV file, or a transaction type to read from
+            the ledger.
+        chunksize (int): The maximum rows of a chunk.
+
+    Yields:
+        pd.DataFrame: The transactions of each chunk.
+    """
+    if str(source).endswith(".csv"):
+        with pd.read_csv(source, chunksize=chunksize) as reader:
+            yield from reader
+    else:
+        columns = VALUATION_COLUMNS.get(source)
+        yield from iter_ledger(source, columns=columns, batch_size=chunksize)
+
+
+def _value_transactions(df, source):
+    if "fiat" in source:
         df = _fiat_price_in_usd(df)
-    if "convert" in csv_file:
+    if "convert" in source:
         df = _usd_convert_value(df)
     return df
 
 
-def all_coins_avg(csv_file, side):
-    df = add_usd_prices(csv_file)
-    avg_values = {}
+def add_usd_prices(csv_file):
+    with stage("load"):
+        df = _load_transactions(csv_file)
+    with stage("value"):
+        return _value_transactions(df, csv_file)
+
+
+def iter_usd_prices(csv_file, chunksize=CHUNK_ROWS):
+    """
+    Add USD prices to transactions one chunk at a time.
+
+    Args:
+        csv_file (str): The path of a CSV file, or a transaction type to read
+            from the ledger.
+        chunksize (int, optional): The maximum rows of a chunk.
+            Defaults to CHUNK_ROWS.
+
+    Yields:
+        pd.DataFrame: Each chunk, with the same columns as add_usd_prices.
+    """
+    chunks = _iter_transactions(csv_file, chunksize)
+    while True:
+        with stage("load"):
+            df = next(chunks, None)
+        if df is None:
+            return
+        with stage("value"):
+            df = _value_transactions(df, csv_file)
+        yield df
+
+
+def _side_totals(df, csv_file, side):
+    """
+    Sum the amount and USD value of each coin, in fixed-point units.
+
+    Args:
+        df (pd.DataFrame): The transactions, with their USD value.
+        csv_file (str): The path of a CSV file, or a transaction type.
+        side (str): "buy" or "sell".
+
+    Returns:
+        pd.DataFrame: The int64 amount, in units of the coin's precision, and
+        usd_value, in units of USD_DECIMALS, of each coin.
+    """
     asset_side = {"buy": "to_asset", "sell": "from_asset"}.get(side)
     amount_side = {"buy": "to_amount", "sell": "from_amount"}.get(side)
-    for coin in df[asset_side].unique():
-        transactions = df[df[asset_side] == coin]
-        avg_values[coin] = {
-            f"avg_{side}_value": _calculate_avg(csv_file, transactions, amount_side),
-            "total_amount": float(transactions[amount_side].sum()),
-        }
-    return pd.DataFrame(avg_values).transpose()
+    assets = df[asset_side].astype(str)
+    decimals = asset_decimals(assets)
+    amounts = to_units(df[amount_side], decimals)
+    if "fiat" in csv_file:
+        usd_value = multiply(
+            amounts,
+            decimals,
+            to_units(df["price"], PRICE_DECIMALS),
+            PRICE_DECIMALS,
+            USD_DECIMALS,
+        )
+    else:
+        usd_value = to_units(df["usd_value"], USD_DECIMALS)
+    # Sums of int64 units are exact, or fail rather than wrap around
+    return group_sum(
+        pd.DataFrame(
+            {"amount": amounts, "usd_value": usd_value}, index=assets.to_numpy()
+        )
+    )
+
+
+def all_coins_avg(csv_file, side, chunksize=None):
+    """
+    Get the average USD price and total amount of each coin bought or sold.
+
+    In streaming mode, the transactions are valued chunk by chunk and folded
+    into running per-coin sums, so peak memory depends on the chunk size and
+    the number of coins, not on the number of transactions.
+
+    Args:
+        csv_file (str): The path of a CSV file, or a transaction type to read
+            from the ledger.
+        side (str): "buy" or "sell".
+        chunksize (int, optional): The maximum rows of a chunk. Defaults to
+            loading every transaction at once.
+
+    Returns:
+        pd.DataFrame: The avg_<side>_value and total_amount of each coin.
+    """
+    if chunksize is None:
+        df = add_usd_prices(csv_file)
+        with stage("aggregate"):
+            totals = _side_totals(df, csv_file, side)
+    else:
+        totals = None
+        for df in iter_usd_prices(csv_file, chunksize):
+            with stage("aggregate"):
+                chunk = _side_totals(df, csv_file, side)
+                if totals is not None:
+                    # Keep the coins in order of first appearance, as in one pass
+                    chunk = group_sum(pd.concat([totals, chunk]))
+            totals = chunk
+        if totals is None:
+            totals = pd.DataFrame(columns=["amount", "usd_value"], dtype=np.int64)
+    decimals = asset_decimals(totals.index)
+    amounts = totals["amount"].to_numpy()
+    held = amounts != 0
+    average = np.full(len(totals), np.nan)
+    average[held] = to_float(
+        divide(
+            totals["usd_value"].to_numpy()[held],
+            USD_DECIMALS,
+            amounts[held],
+            decimals[held],
+            USD_DECIMALS,
+        ),
+        USD_DECIMALS,
+    )
+    return pd.DataFrame(
+        {
+            f"avg_{side}_value": average,
+            "total_amount": to_float(amounts, decimals),
+        },
+        index=totals.index,
+    ).rename_axis(None)
@@ -0,0 +1,314 @@
+import argparse
+import contextlib
+import cProfile
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+SAMPLE_INTERVAL = 0.005
+
+_profiler = None
+_disabled = contextlib.nullcontext()
+
+
+class StageRecord:
+    """
+    Accumulated measurements of every call to one pipeline stage.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = 0
+        self.memory_increase = 0
+
+
+class StackSampler:
+    """
+    Sample the stacks of every thread at a fixed interval, in collapsed form.
+
+    Each sample is a semicolon-separated line of frames, outermost first and
+    rooted at the thread name, so the counts can be fed to flamegraph.pl or
+    speedscope as is. Worker threads, e.g. ledger writes run through
+    asyncio.to_thread, are sampled as well.
+
+    Args:
+        interval (float, optional): The seconds between two samples.
+            Defaults to SAMPLE_INTERVAL.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                # Spaces separate the stack from its count
+                stack = ";".join(reversed(frames)).replace(" ", "_")
+                self.stacks[stack] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> None:
+        """
+        Write the collapsed stacks, one "stack count" line each.
+
+        Args:
+            path (Path): The output file.
+        """
+        with open(path, "w") as stacks_file:
+            for stack, count in self.stacks.most_common():
+                stacks_file.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Per-stage wall time, CPU time and peak memory of the pipeline.
+
+    Stages are named blocks of the fetch, normalize and value code paths,
+    accumulated over every call. The tracemalloc peak is read and reset each
+    time a stage starts or ends, and folded into every stage open at that
+    moment, so peaks stay correct when stages nest or interleave across
+    concurrent tasks. CPU time is process-wide, so concurrent stages share it.
+
+    Args:
+        cprofile (bool, optional): Whether to run cProfile for the whole run.
+            Defaults to False.
+        sample_interval (float, optional): The seconds between two stack
+            samples, or None not to sample stacks. Defaults to None.
+    """
+
+    def __init__(
+        self, cprofile: bool = False, sample_interval: Optional[float] = None
+    ) -> None:
+        self.stages: Dict[str, StageRecord] = {}
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.sampler = StackSampler(sample_interval) if sample_interval else None
+        self._open: Dict[int, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._started = None
+        self._wall_time = 0.0
+        self._cpu_time = 0.0
+        self._peak_memory = 0
+        self._tracing = False
+
+    def _fold_peak(self) -> int:
+        # Called with the lock held
+        current, peak = tracemalloc.get_traced_memory()
+        for entry in self._open.values():
+            entry[3] = max(entry[3], peak)
+        self._peak_memory = max(self._peak_memory, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measure a block as one call of a stage.
+
+        Args:
+            name (str): The stage name.
+        """
+        with self._lock:
+            current = self._fold_peak()
+            # [wall start, cpu start, memory at start, peak so far]
+            entry = [time.perf_counter(), time.process_time(), current, current]
+            self._open[id(entry)] = entry
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - entry[0]
+            cpu_time = time.process_time() - entry[1]
+            with self._lock:
+                self._fold_peak()
+                del self._open[id(entry)]
+                record = self.stages.setdefault(name, StageRecord())
+                record.calls += 1
+                record.wall_time += wall_time
+                record.cpu_time += cpu_time
+                record.peak_memory = max(record.peak_memory, entry[3])
+                record.memory_increase = max(
+                    record.memory_increase, entry[3] - entry[2]
+                )
+
+    def start(self) -> None:
+        """
+        Start tracing memory and, if enabled, cProfile and stack sampling.
+        """
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        self._started = (time.perf_counter(), time.process_time())
+        if self.sampler is not None:
+            self.sampler.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop(self) -> None:
+        """
+        Stop every collector started by start.
+        """
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self._wall_time = time.perf_counter() - self._started[0]
+        self._cpu_time = time.process_time() - self._started[1]
+        with self._lock:
+            self._fold_peak()
+        if self._tracing:
+            tracemalloc.stop()
+
+    def report(self, label: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build the run report.
+
+        Args:
+            label (str, optional): A label identifying the run, e.g. a version.
+
+        Returns:
+            Dict[str, Any]: The totals and the measurements of each stage, with
+            times in seconds and memory in MiB.
+        """
+        mib = lambda size: round(size / 2**20, 3)
+        return {
+            "label": label,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "wall_time": round(self._wall_time, 6),
+            "cpu_time": round(self._cpu_time, 6),
+            "peak_memory_mb": mib(self._peak_memory),
+            "stages": {
+                name: {
+                    "calls": record.calls,
+                    "wall_time": round(record.wall_time, 6),
+                    "cpu_time": round(record.cpu_time, 6),
+                    "peak_memory_mb": mib(record.peak_memory),
+                    "memory_increase_mb": mib(record.memory_increase),
+                }
+                for name, record in self.stages.items()
+            },
+        }
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Measure a block as one call of a pipeline stage, if profiling is active.
+
+    Args:
+        name (str): The stage name.
+
+    Returns:
+        ContextManager[None]: The stage measurement, or a shared no-op context
+        when profiling is off.
+    """
+    if _profiler is None:
+        return _disabled
+    return _profiler.stage(name)
+
+
+@contextlib.contextmanager
+def profiling(
+    output: Optional[Path] = None,
+    cprofile_path: Optional[Path] = None,
+    collapsed_path: Optional[Path] = None,
+    sample_interval: float = SAMPLE_INTERVAL,
+    label: Optional[str] = None,
+) -> Iterator[Profiler]:
+    """
+    Profile the pipeline stages run inside the block.
+
+    Args:
+        output (Path, optional): Write the run report there as JSON.
+        cprofile_path (Path, optional): Run cProfile and dump its stats there,
+            for pstats or snakeviz.
+        collapsed_path (Path, optional): Sample the stacks of every thread and
+            write them there in collapsed form, for flamegraphs.
+        sample_interval (float, optional): The seconds between two stack
+            samples. Defaults to SAMPLE_INTERVAL.
+        label (str, optional): A label identifying the run in the report.
+
+    Yields:
+        Profiler: The active profiler.
+    """
+    global _profiler
+    profiler = Profiler(
+        cprofile=cprofile_path is not None,
+        sample_interval=sample_interval if collapsed_path is not None else None,
+    )
+    _profiler = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _profiler = None
+        if cprofile_path is not None:
+            profiler.cprofile.dump_stats(cprofile_path)
+        if collapsed_path is not None:
+            profiler.sampler.write(collapsed_path)
+        if output is not None:
+            with open(output, "w") as report_file:
+                json.dump(profiler.report(label), report_file, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile a sync of the account followed by a valuation pass."
+    )
+    parser.add_argument("--output", type=Path, required=True, help="JSON report.")
+    parser.add_argument("--cprofile", type=Path, help="Dump cProfile stats there.")
+    parser.add_argument("--collapsed", type=Path, help="Write collapsed stacks.")
+    parser.add_argument("--sample-interval", type=float, default=SAMPLE_INTERVAL)
+    parser.add_argument("--label", help="A label for the run, e.g. a version.")
+    parser.add_argument("--skip-sync", action="store_true")
+    args = parser.parse_args()
+
+    from tools.process_csv import all_coins_avg
+    from tools.sync_all import sync_all
+
+    with profiling(
+        args.output, args.cprofile, args.collapsed, args.sample_interval, args.label
+    ) as profiler:
+        if not args.skip_sync:
+            with stage("sync"):
+                sync_all(verbose=False)
+        for transaction_type in ("convert", "fiat"):
+            with stage("all_coins_avg"):
+                all_coins_avg(transaction_type, "buy")
+    for name, record in profiler.report()["stages"].items():
+        print(
+            f"{name:<12} {record['calls']:>6} calls {record['wall_time']:>9.3f}s wall "
+            f"{record['cpu_time']:>9.3f}s cpu {record['peak_memory_mb']:>9.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+# Weight limits of each rate-limit pool, per minute unless BUCKET_PERIODS
+# sets another period in seconds, and the header reporting the weight used by
+# this IP/account in the current minute
+BUCKET_LIMITS = {
+    "api": 6_000,
+    "sapi_ip": 12_000,
+    "sapi_uid": 180_000,
+    "sapi_ip_1s": 180_000,
+}
+BUCKET_PERIODS = {"sapi_ip_1s": 1}
+BUCKET_HEADERS = {
+    "x-mbx-used-weight-1m": "api",
+    "x-sapi-used-ip-weight-1m": "sapi_ip",
+    "x-sapi-used-uid-weight-1m": "sapi_uid",
+}
+ENDPOINT_WEIGHTS: Dict[str, Tuple[str, int]] = {
+    "/api/v3/myTrades": ("api", 20),
+    "/api/v3/account": ("api", 20),
+    "/api/v3/klines": ("api", 2),
+    "/api/v3/time": ("api", 1),
+    "/api/v3/exchangeInfo": ("api", 20),
+    "/api/v3/userDataStream": ("api", 2),
+    "/api/v3/ticker/price": ("api", 2),
+    "/sapi/v1/fiat/payments": ("sapi_uid", 1),
+    "/sapi/v1/convert/tradeFlow": ("sapi_uid", 3_000),
+    "/sapi/v1/capital/deposit/hisrec": ("sapi_ip", 1),
+    "/sapi/v1/capital/withdraw/history": ("sapi_ip_1s", 18_000),
+}
+DEFAULT_WEIGHT = ("api", 1)
+SAFETY_MARGIN = 0.9
+MAX_ATTEMPTS = 5
+MAX_RETRY_AFTER = 300.0
+RATE_LIMIT_STATUSES = (418, 429)
+
+_limiter = None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously over a period, one minute by default.
+
+    Args:
+        capacity (float): The number of tokens available per period.
+        period (float, optional): The refill period in seconds. Defaults to 60.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0) -> None:
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, weight: float, now: float) -> float:
+        """
+        Take tokens from the bucket if enough are available.
+
+        Args:
+            weight (float): The number of tokens to take.
+            now (float): The current monotonic time.
+
+        Returns:
+            float: 0 if the tokens were taken, else the seconds to wait for them.
+        """
+        self._refill(now)
+        if self.tokens >= weight:
+            self.tokens -= weight
+            return 0.0
+        return (weight - self.tokens) / self.rate
+
+    def sync(self, used: float, now: float) -> None:
+        """
+        Align the bucket with the weight reported as used by the server.
+
+        Args:
+            used (float): The weight used in the current minute.
+            now (float): The current monotonic time.
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, self.capacity - used)
+
+
+class RateLimiter:
+    """
+    Shared rate-limit governor for every request to the Binance API.
+
+    Each endpoint draws its weight from the token bucket of its rate-limit pool
+    before being sent. Buckets are kept in sync with the used weight reported
+    in the response headers, and a 429/418 response blocks every request until
+    its Retry-After delay has elapsed.
+
+    Args:
+        limits (Dict[str, int], optional): The weight limit per period of each
+            pool. Defaults to BUCKET_LIMITS.
+        weights (Dict[str, Tuple[str, int]], optional): The pool and weight of
+            each endpoint. Defaults to ENDPOINT_WEIGHTS.
+        periods (Dict[str, float], optional): The period in seconds of the
+            pools not limited per minute. Defaults to BUCKET_PERIODS.
+        safety_margin (float, optional): The fraction of each limit to use.
+            Defaults to SAFETY_MARGIN.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, Tuple[str, int]]] = None,
+        periods: Optional[Dict[str, float]] = None,
+        safety_margin: float = SAFETY_MARGIN,
+    ) -> None:
+        self.weights = weights or ENDPOINT_WEIGHTS
+        periods = BUCKET_PERIODS if periods is None else periods
+        self.buckets = {
+            pool: TokenBucket(limit * safety_margin, periods.get(pool, 60.0))
+            for pool, limit in (limits or BUCKET_LIMITS).items()
+        }
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, endpoint: str) -> float:
+        pool, weight = self.weights.get(endpoint, DEFAULT_WEIGHT)
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            bucket = self.buckets[pool]
+            return bucket.take(min(weight, bucket.capacity), now)
+
+    def acquire(self, endpoint: str) -> None:
+        """
+        Block until the weight of an endpoint is available, then take it.
+
+        Args:
+            endpoint (str): The endpoint URL path.
+        """
+        while (wait := self._wait_time(endpoint)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """
+        Wait until the weight of an endpoint is available, then take it.
+
+        Args:
+            endpoint (str): The endpoint URL path.
+        """
+        import asyncio
+
+        while (wait := self._wait_time(endpoint)) > 0:
+            await asyncio.sleep(wait)
+
+    def update(self, headers: Mapping[str, str], status: int) -> Optional[float]:
+        """
+        Update the limiter from the headers and status of a response.
+
+        Args:
+            headers (Mapping[str, str]): The response headers.
+            status (int): The response HTTP status.
+
+        Returns:
+            Optional[float]: The seconds to wait before retrying if the request
+            was rejected for exceeding a rate limit, else None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for header, value in headers.items():
+                pool = BUCKET_HEADERS.get(header.lower())
+                if pool is not None:
+                    self.buckets[pool].sync(float(value), now)
+            if status not in RATE_LIMIT_STATUSES:
+                return None
+            retry_after = float(headers.get("Retry-After", 60))
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            return retry_after
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the rate limiter shared by every request path.
+
+    Returns:
+        RateLimiter: The shared rate limiter.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
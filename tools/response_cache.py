@@ -0,0 +1,284 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from tools.paths import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "response_cache"
+# off: no caching, record: read-through cache, replay: cache only, no network
+CACHE_MODES = ("off", "record", "replay")
+# Parameters that change on every call without changing the response
+VOLATILE_PARAMS = {"timestamp", "signature", "recvWindow"}
+UNCACHED_ENDPOINTS = {"/api/v3/time", "/api/v3/ticker/price"}
+OPEN_TTL = 300.0
+# Windows ending less than SETTLE_MS ago may still receive late rows
+SETTLE_MS = 3_600_000
+REPLAY_MISS = -9000
+
+_cache = None
+
+
+def canonical_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Get the parameters identifying a response, as sorted strings.
+
+    Args:
+        params (Dict[str, Any]): The request parameters.
+
+    Returns:
+        Dict[str, str]: The parameters, without the volatile ones.
+    """
+    return {
+        key: str(value)
+        for key, value in sorted(params.items())
+        if key not in VOLATILE_PARAMS
+    }
+
+
+def is_open(params: Dict[str, Any]) -> bool:
+    """
+    Check whether a request covers a window of history that has not settled.
+
+    Args:
+        params (Dict[str, Any]): The request parameters.
+
+    Returns:
+        bool: True if the window ends less than SETTLE_MS ago.
+    """
+    end = params.get("endTime")
+    return end is not None and int(end) >= time.time() * 1000 - SETTLE_MS
+
+
+def is_closed(url_path: str, params: Dict[str, Any], response: Any) -> bool:
+    """
+    Check whether a response covers a closed window of history.
+
+    A window is closed once its end time has settled, or when it is a full page
+    of trades fetched by id: neither can change anymore.
+
+    Args:
+        url_path (str): The endpoint URL path.
+        params (Dict[str, Any]): The request parameters.
+        response (Any): The decoded response.
+
+    Returns:
+        bool: True if the response can be cached permanently.
+    """
+    if params.get("endTime") is not None and not is_open(params):
+        return True
+    return (
+        url_path == "/api/v3/myTrades"
+        and "fromId" in params
+        and isinstance(response, list)
+        and len(response) == int(params.get("limit", 500))
+    )
+
+
+def is_error(response: Any) -> bool:
+    """
+    Check whether a response is an API error payload.
+
+    Args:
+        response (Any): The decoded response.
+
+    Returns:
+        bool: True for a {"code": ..., "msg": ...} error payload.
+    """
+    return isinstance(response, dict) and "code" in response and "msg" in response
+
+
+class ResponseCache:
+    """
+    Record/replay cache of API responses, stored in a content-addressed directory.
+
+    Responses are keyed by endpoint and canonical parameters. Each key points to
+    a gzipped blob named after the hash of its content, so identical responses
+    (e.g. empty windows) are stored once. Closed windows never expire, other
+    responses expire after ttl seconds. Error responses are never cached.
+
+    The last window of a sync ends at the time it runs, so open windows are
+    keyed without their end time: a later request for the same start is
+    answered by the latest recording, within ttl in record mode and whatever
+    its age in replay mode. The settle overlap of the next sync fetches what
+    such a response missed.
+
+    Args:
+        path (Path, optional): The cache directory. Defaults to CACHE_DIR.
+        mode (str, optional): One of CACHE_MODES. Defaults to the
+            CRYPTO_TRACKER_CACHE environment variable, or off.
+        ttl (float, optional): The lifetime of open windows in seconds.
+            Defaults to OPEN_TTL.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        mode: Optional[str] = None,
+        ttl: float = OPEN_TTL,
+    ) -> None:
+        self.path = Path(path or CACHE_DIR)
+        self.mode = mode or os.environ.get("CRYPTO_TRACKER_CACHE", "off")
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Invalid cache mode: {self.mode}")
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url_path: str, params: Dict[str, Any]) -> str:
+        """
+        Get the cache key of a request.
+
+        Args:
+            url_path (str): The endpoint URL path.
+            params (Dict[str, Any]): The request parameters.
+
+        Returns:
+            str: The SHA256 hex digest of the endpoint and canonical parameters,
+            without the end time of an open window.
+        """
+        canonical = canonical_params(params)
+        if is_open(params):
+            canonical.pop("endTime")
+        request = json.dumps([url_path, canonical])
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _ref_path(self, key: str) -> Path:
+        return self.path / "refs" / key[:2] / f"{key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.path / "blobs" / digest[:2] / f"{digest}.json.gz"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+
+    def _cacheable(self, http_method: str, url_path: str) -> bool:
+        return (
+            self.mode != "off"
+            and http_method == "GET"
+            and url_path not in UNCACHED_ENDPOINTS
+        )
+
+    def get(self, url_path: str, params: Dict[str, Any]) -> Optional[Any]:
+        """
+        Get a cached response, unless it is missing or, outside of replay
+        mode, expired.
+
+        Args:
+            url_path (str): The endpoint URL path.
+            params (Dict[str, Any]): The request parameters.
+
+        Returns:
+            Optional[Any]: The decoded response, or None.
+        """
+        try:
+            with open(self._ref_path(self.key(url_path, params)), "r") as ref_file:
+                ref = json.load(ref_file)
+            expired = ref["expires"] is not None and ref["expires"] < time.time()
+            # Replay has nothing fresher to offer than the latest recording
+            if expired and self.mode != "replay":
+                return None
+            with gzip.open(self._blob_path(ref["blob"]), "rb") as blob_file:
+                return json.loads(blob_file.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, url_path: str, params: Dict[str, Any], response: Any) -> None:
+        """
+        Cache a response, permanently if it covers a closed window.
+
+        Args:
+            url_path (str): The endpoint URL path.
+            params (Dict[str, Any]): The request parameters.
+            response (Any): The decoded response.
+        """
+        if is_error(response):
+            return
+        data = json.dumps(response, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        closed = is_closed(url_path, params, response)
+        ref = {
+            "endpoint": url_path,
+            "params": canonical_params(params),
+            "blob": digest,
+            "expires": None if closed else time.time() + self.ttl,
+        }
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            self._write(blob_path, gzip.compress(data))
+        self._write(
+            self._ref_path(self.key(url_path, params)), json.dumps(ref).encode("utf-8")
+        )
+
+    def lookup(
+        self, http_method: str, url_path: str, params: Dict[str, Any]
+    ) -> Optional[Any]:
+        """
+        Look a request up before sending it.
+
+        Args:
+            http_method (str): The HTTP method.
+            url_path (str): The endpoint URL path.
+            params (Dict[str, Any]): The request parameters.
+
+        Returns:
+            Optional[Any]: The cached response, an error response on a miss in
+            replay mode, or None if the request must be sent.
+        """
+        if not self._cacheable(http_method, url_path):
+            # Uncached requests, e.g. live prices, would otherwise reach the
+            # network in replay mode
+            return self._replay_miss(url_path) if self.mode == "replay" else None
+        response = self.get(url_path, params)
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if response is None and self.mode == "replay":
+            return self._replay_miss(url_path)
+        return response
+
+    def _replay_miss(self, url_path: str) -> Dict[str, Any]:
+        return {
+            "code": REPLAY_MISS,
+            "msg": f"No cached response for {url_path} in replay mode.",
+        }
+
+    def store(
+        self, http_method: str, url_path: str, params: Dict[str, Any], response: Any
+    ) -> None:
+        """
+        Record the response of a request that was sent.
+
+        Args:
+            http_method (str): The HTTP method.
+            url_path (str): The endpoint URL path.
+            params (Dict[str, Any]): The request parameters.
+            response (Any): The decoded response.
+        """
+        if self._cacheable(http_method, url_path):
+            self.put(url_path, params, response)
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the response cache shared by every request path.
+
+    Returns:
+        ResponseCache: The shared response cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -1,15 +1,26 @@
 import hashlib
 import hmac
-import requests
+import os
 import time
-from dateutil import parser
+import ujson
+from functools import partial
 from tools.get_key import get_key
-from typing import Dict, Any
+from tools.metrics import get_metrics
+from tools.moving_window import ENDPOINT_LIMITS
+from tools.rate_limit import MAX_ATTEMPTS, MAX_RETRY_AFTER, get_rate_limiter
+from tools.response_cache import get_response_cache
+from typing import TYPE_CHECKING, Callable, Dict, Any
 from urllib.parse import urlencode
 
-KEY = get_key("BINANCE_API_KEY")
-SECRET = get_key("BINANCE_SECRET_KEY")
-BASE_URL = "https://api.binance.com"
+if TYPE_CHECKING:
+    from tools.http_client import HttpClient
+
+BASE_URL = os.environ.get("BINANCE_BASE_URL", "https://api.binance.com")
+TIME_ENDPOINT = "/api/v3/time"
+TIMESTAMP_ERROR = -1021
+
+_client = None
+_time_offset = None
 
 
 def get_endpoint(transaction_type: str) -> str:
@@ -73,19 +84,42 @@ def match_endpoint(endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
     match endpoint:
         case "/sapi/v1/fiat/payments":
             params["beginTime"] = params.pop("startTime")
+            params["rows"] = ENDPOINT_LIMITS[endpoint][1]
+        case "/sapi/v1/convert/tradeFlow":
+            params["limit"] = ENDPOINT_LIMITS[endpoint][1]
         case "/sapi/v1/capital/deposit/hisrec":
             params["includeSource"] = (True,)
             params["status"] = 1
+            params["limit"] = ENDPOINT_LIMITS[endpoint][1]
         case "/sapi/v1/capital/withdraw/history":
             params["status"] = 6
+            params["limit"] = ENDPOINT_LIMITS[endpoint][1]
         case "/api/v3/klines":
-            params["interval"] = "1s"
-            params["limit"] = 1
+            params.setdefault("interval", "1s")
+            params.setdefault("limit", 1)
         case _:
             pass
     return params
 
 
+def to_milliseconds(date: str | int) -> int:
+    """
+    Convert a day-first date string to a timestamp in milliseconds.
+
+    Args:
+        date (str | int): The date string, or a timestamp in milliseconds which is
+            returned unchanged.
+
+    Returns:
+        int: The timestamp in milliseconds.
+    """
+    if isinstance(date, int):
+        return date
+    from dateutil import parser
+
+    return int(parser.parse(date, dayfirst=True).timestamp() * 1000)
+
+
 def set_payload(endpoint: str, **kwargs: Any) -> Dict[str, Any]:
     """
     Set the parameters for the endpoint.
@@ -105,13 +139,19 @@ def set_payload(endpoint: str, **kwargs: Any) -> Dict[str, Any]:
     elif endpoint != "/api/v3/myTrades":
         start, end = kwargs.get("start"), kwargs.get("end")
         if start is not None:
-            params["startTime"] = int(
-                parser.parse(start, dayfirst=True).timestamp() * 1000
-            )
+            params["startTime"] = to_milliseconds(start)
         if end is not None:
-            params["endTime"] = int(parser.parse(end, dayfirst=True).timestamp() * 1000)
+            params["endTime"] = to_milliseconds(end)
         if endpoint == "/sapi/v1/fiat/payments":
             params["transactionType"] = kwargs.get("side")
+        if endpoint == "/api/v3/klines":
+            for key in ("interval", "limit"):
+                if kwargs.get(key) is not None:
+                    params[key] = kwargs[key]
+    else:
+        for key in ("fromId", "limit"):
+            if kwargs.get(key) is not None:
+                params[key] = kwargs[key]
     params["symbol"] = kwargs.get("symbol")
     params = match_endpoint(endpoint, params)
     return params
@@ -127,19 +167,109 @@ def hashing(query_string: str) -> str:
     Returns:
         str: The generated HMAC SHA256 signature.
     """
+    secret = get_key("BINANCE_SECRET_KEY")
     return hmac.new(
-        SECRET.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256
+        secret.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256
     ).hexdigest()
 
 
 def get_timestamp() -> int:
     """
-    Get the current timestamp in milliseconds.
+    Get the current timestamp in milliseconds, on the server's clock.
+
+    Returns:
+        int: The current timestamp in milliseconds, corrected by the cached
+        offset to the server time once it is known.
+    """
+    return int(time.time() * 1000) + (_time_offset or 0)
+
+
+def set_time_offset(server_time: int, sent: int, received: int) -> None:
+    """
+    Cache the offset between the server clock and the local clock.
+
+    Args:
+        server_time (int): The server time in milliseconds.
+        sent (int): The local time the time request was sent, in milliseconds.
+        received (int): The local time the response was received, in milliseconds.
+    """
+    global _time_offset
+    _time_offset = server_time - (sent + received) // 2
+
+
+def sync_server_time() -> None:
+    """
+    Fetch the server time and cache its offset to the local clock.
+    """
+    sent = int(time.time() * 1000)
+    response = send_public_request(TIME_ENDPOINT)
+    set_time_offset(response["serverTime"], sent, int(time.time() * 1000))
+
+
+def build_signed_query(payload: Dict[str, Any]) -> str:
+    """
+    Build a timestamped and signed query string.
+
+    Args:
+        payload (Dict[str, Any]): The payload for the request.
 
     Returns:
-        int: The current timestamp in milliseconds.
+        str: The query string, ending with its HMAC SHA256 signature.
     """
-    return int(time.time() * 1000)
+    query_str = urlencode(payload, True)
+    if query_str:
+        query_str = f"{query_str}&timestamp={get_timestamp()}"
+    else:
+        query_str = f"timestamp={get_timestamp()}"
+    return query_str + "&signature=" + hashing(query_str)
+
+
+def api_headers() -> Dict[str, str]:
+    """
+    Build the headers sent with every request.
+
+    The API key is resolved on first use, and left out if it is not configured
+    so public requests still work without credentials.
+
+    Returns:
+        Dict[str, str]: The request headers.
+    """
+    headers = {"Content-Type": "application/json;charset=utf-8"}
+    key = get_key("BINANCE_API_KEY", required=False)
+    if key:
+        headers["X-MBX-APIKEY"] = key
+    return headers
+
+
+def configure_client(**kwargs: Any) -> "HttpClient":
+    """
+    Replace the shared HTTP client with one built from the given options.
+
+    Args:
+        **kwargs (Any): Keyword arguments passed to HttpClient (pool_size,
+            timeout, retries, backoff_factor).
+
+    Returns:
+        HttpClient: The new shared client.
+    """
+    # requests is slow to import, so load it with the first request
+    from tools.http_client import HttpClient
+
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = HttpClient(headers=api_headers(), **kwargs)
+    return _client
+
+
+def get_client() -> "HttpClient":
+    """
+    Get the shared HTTP client, creating it on first use.
+
+    Returns:
+        HttpClient: The shared client.
+    """
+    return _client or configure_client()
 
 
 def dispatch_request(http_method: str) -> Any:
@@ -152,16 +282,48 @@ def dispatch_request(http_method: str) -> Any:
     Returns:
         Any: The request method to be called.
     """
-    session = requests.Session()
-    session.headers.update(
-        {"Content-Type": "application/json;charset=utf-8", "X-MBX-APIKEY": KEY}
-    )
-    return {
-        "GET": session.get,
-        "DELETE": session.delete,
-        "PUT": session.put,
-        "POST": session.post,
-    }.get(http_method)
+    if http_method not in ("GET", "DELETE", "PUT", "POST"):
+        return None
+    return partial(get_client().request, http_method)
+
+
+def _send(http_method: str, url_path: str, build_url: Callable[[], str]) -> Any:
+    """
+    Send a request through the rate limiter, retrying when rate limited.
+
+    Args:
+        http_method (str): The HTTP method (GET, POST, PUT, DELETE).
+        url_path (str): The URL path for the request.
+        build_url (Callable[[], str]): Builds the full URL of each attempt, so
+            signed requests get a fresh timestamp.
+
+    Returns:
+        Any: The decoded response from the API.
+    """
+    limiter = get_rate_limiter()
+    metrics = get_metrics()
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire(url_path)
+        sent = time.perf_counter()
+        response = dispatch_request(http_method)(url=build_url(), params={})
+        received = time.perf_counter()
+        data = ujson.loads(response.content)
+        if metrics.enabled:
+            metrics.record(
+                url_path,
+                response.status_code,
+                received - sent,
+                len(response.content),
+                time.perf_counter() - received,
+                response.headers,
+                attempt,
+                data,
+            )
+        retry_after = limiter.update(response.headers, response.status_code)
+        # Retry once the limiter has waited out Retry-After, unless it is too long
+        if retry_after is None or retry_after > MAX_RETRY_AFTER:
+            break
+    return data
 
 
 def send_signed_request(
@@ -178,16 +340,17 @@ def send_signed_request(
     Returns:
         Dict[str, Any]: The response from the API.
     """
-    query_str = urlencode(payload, True)
-    if query_str:
-        query_str = f"{query_str}&timestamp={get_timestamp()}"
-    else:
-        query_str = f"timestamp={get_timestamp()}"
-
-    url = BASE_URL + url_path + "?" + query_str + "&signature=" + hashing(query_str)
-    params = {"url": url, "params": {}}
-    response = dispatch_request(http_method)(**params)
-    return response.json()
+    cache = get_response_cache()
+    if (response := cache.lookup(http_method, url_path, payload)) is not None:
+        return response
+    build_url = lambda: BASE_URL + url_path + "?" + build_signed_query(payload)
+    response = _send(http_method, url_path, build_url)
+    if isinstance(response, dict) and response.get("code") == TIMESTAMP_ERROR:
+        # The local clock drifted from the server's: resync it once and retry
+        sync_server_time()
+        response = _send(http_method, url_path, build_url)
+    cache.store(http_method, url_path, payload, response)
+    return response
 
 
 def send_public_request(url_path: str, payload: Dict[str, Any] = {}) -> Dict[str, Any]:
@@ -201,9 +364,13 @@ def send_public_request(url_path: str, payload: Dict[str, Any] = {}) -> Dict[str
     Returns:
         Dict[str, Any]: The response from the API.
     """
+    cache = get_response_cache()
+    if (response := cache.lookup("GET", url_path, payload)) is not None:
+        return response
     query_str = urlencode(payload, True)
     url = BASE_URL + url_path
     if query_str:
         url = url + "?" + query_str
-    response = dispatch_request("GET")(url=url)
-    return response.json()
+    response = _send("GET", url_path, lambda: url)
+    cache.store("GET", url_path, payload, response)
+    return response
@@ -0,0 +1,89 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.paths import DATA_DIR
+from tools.send_request import send_public_request
+
+EXCHANGE_INFO_ENDPOINT = "/api/v3/exchangeInfo"
+EXCHANGE_INFO_TTL = 24 * 3600
+QUOTE_ASSETS = ("USDT", "USDC")
+
+_symbols = None
+
+
+def get_exchange_symbols(
+    path: Optional[Path] = None, max_age: float = EXCHANGE_INFO_TTL
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Get every symbol listed on the exchange, with its base and quote assets.
+
+    exchangeInfo is heavy, so only the symbol list is kept, cached on disk and
+    in memory, and refreshed once it is older than max_age.
+
+    Args:
+        path (Path, optional): The cache file.
+            Defaults to DATA_DIR / "exchange_info.json".
+        max_age (float, optional): The maximum age of the cache in seconds.
+            Defaults to EXCHANGE_INFO_TTL.
+
+    Returns:
+        Dict[str, Tuple[str, str]]: The (base asset, quote asset) of each symbol.
+    """
+    global _symbols
+    path = Path(path or DATA_DIR / "exchange_info.json")
+    if _symbols is not None and time.time() - _symbols[0] < max_age:
+        return _symbols[1]
+    if path.exists() and time.time() - os.path.getmtime(path) < max_age:
+        with open(path, "r") as cache_file:
+            symbols = json.load(cache_file)
+    else:
+        response = send_public_request(EXCHANGE_INFO_ENDPOINT)
+        if "symbols" not in response:
+            raise ValueError(f"Error fetching exchange info: {response}")
+        symbols = {
+            s["symbol"]: [s["baseAsset"], s["quoteAsset"]] for s in response["symbols"]
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as cache_file:
+            json.dump(symbols, cache_file)
+    symbols = {symbol: tuple(assets) for symbol, assets in symbols.items()}
+    _symbols = (time.time(), symbols)
+    return symbols
+
+
+def candidate_symbols(
+    assets: Iterable[str], quotes: Iterable[str] = QUOTE_ASSETS
+) -> List[str]:
+    """
+    Get the existing symbols pairing each asset with one of the quote assets.
+
+    Args:
+        assets (Iterable[str]): The base assets.
+        quotes (Iterable[str], optional): The quote assets. Defaults to QUOTE_ASSETS.
+
+    Returns:
+        List[str]: The symbols listed on the exchange, sorted.
+    """
+    assets, quotes = set(assets), set(quotes)
+    return sorted(
+        symbol
+        for symbol, (base, quote) in get_exchange_symbols().items()
+        if base in assets and quote in quotes
+    )
+
+
+def base_asset(symbol: str) -> Optional[str]:
+    """
+    Get the base asset of a symbol.
+
+    Args:
+        symbol (str): The symbol.
+
+    Returns:
+        Optional[str]: The base asset, or None if the symbol is not listed.
+    """
+    assets = get_exchange_symbols().get(symbol)
+    return assets[0] if assets else None
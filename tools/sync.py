@@ -0,0 +1,334 @@
+import aiohttp
+import asyncio
+import pandas as pd
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+from tools.async_request import (
+    MAX_CONCURRENCY,
+    create_session,
+    fetch_windows,
+    send_signed_request_async,
+)
+from tools.decode import decode_page
+from tools.get_account_info import get_account_info
+from tools.ledger_store import (
+    TRADE_KEYS,
+    LedgerAccumulator,
+    append_ledger,
+    read_ledger,
+)
+from tools.profiling import stage
+from tools.response_cache import SETTLE_MS
+from tools.send_request import get_endpoint, get_timestamp, set_payload
+from tools.symbols import base_asset, candidate_symbols
+from tools.sync_state import SyncState
+
+DEFAULT_START = "01-07-2023"
+TRADES_LIMIT = 1000
+
+
+async def _fetch_windowed(
+    transaction_type: str,
+    start: str | int,
+    end: str | int,
+    session: Optional[aiohttp.ClientSession] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> pd.DataFrame:
+    """
+    Fetch and normalize every window of a windowed transaction type.
+
+    Args:
+        transaction_type (str): The type of transaction.
+        start (str | int): The start of the range, as a day-first date string or
+            a timestamp in milliseconds.
+        end (str | int): The end of the range (inclusive).
+        session (aiohttp.ClientSession, optional): A session to reuse.
+        semaphore (asyncio.Semaphore, optional): Bounds the number of requests
+            in flight, shared with the other stages of a sync.
+
+    Returns:
+        pd.DataFrame: The distinct normalized transactions, in time order.
+    """
+    if session is None:
+        async with create_session() as session:
+            return await _fetch_windowed(
+                transaction_type, start, end, session, semaphore
+            )
+    endpoint = get_endpoint(transaction_type)
+    semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENCY)
+    # Fiat payments are listed separately for each side (0: buy, 1: sell)
+    sides = [0, 1] if transaction_type == "fiat" else [None]
+
+    def decode(response: Any) -> pd.DataFrame:
+        with stage("normalize"):
+            return decode_page(response, transaction_type)
+
+    with stage("fetch"):
+        responses = await asyncio.gather(
+            *(
+                fetch_windows(
+                    endpoint,
+                    start,
+                    end,
+                    session=session,
+                    semaphore=semaphore,
+                    decode=decode,
+                    side=side,
+                )
+                for side in sides
+            )
+        )
+    accumulator = LedgerAccumulator(transaction_type, keys=["id"])
+    with stage("concat"):
+        for side, windows in zip(sides, responses):
+            for frame in windows:
+                if side is not None and not frame.empty:
+                    frame["side"] = "BUY" if not side else "SELL"
+                accumulator.add(frame)
+        return accumulator.assemble()
+
+
+async def sync_transactions_async(
+    transaction_type: str,
+    start: str = DEFAULT_START,
+    state: Optional[SyncState] = None,
+    ledger_path: Optional[Path] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> pd.DataFrame:
+    """
+    Fetch the transactions of a windowed type newer than its sync cursor.
+
+    The range resumes SETTLE_MS before the last synced time, since deposits
+    and withdrawals still pending at that time are only listed once settled,
+    at their original time. Transactions fetched twice are skipped by id. New
+    transactions are appended to the ledger and the cursor is only moved once
+    they are stored, so an interrupted or failed sync is simply picked up again
+    by the next run.
+
+    Args:
+        transaction_type (str): The type of transaction (convert, deposit,
+            withdraw or fiat).
+        start (str, optional): The start date of the first sync (dd-mm-YYYY).
+            Defaults to DEFAULT_START.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+        session (aiohttp.ClientSession, optional): A session to reuse.
+        semaphore (asyncio.Semaphore, optional): Bounds the number of requests
+            in flight, shared with the other stages of a sync.
+
+    Returns:
+        pd.DataFrame: The transactions appended to the ledger.
+    """
+    state = state or SyncState()
+    cursor = state.get(transaction_type)
+    if cursor is not None:
+        start = cursor["time"] + 1 - SETTLE_MS
+    end = get_timestamp()
+    df = await _fetch_windowed(transaction_type, start, end, session, semaphore)
+    with stage("store"):
+        df = await asyncio.to_thread(
+            append_ledger, df, transaction_type, keys=["id"], path=ledger_path
+        )
+    state.update(transaction_type, time=end)
+    return df
+
+
+def sync_transactions(
+    transaction_type: str,
+    start: str = DEFAULT_START,
+    state: Optional[SyncState] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Fetch the transactions of a windowed type newer than its sync cursor.
+
+    See sync_transactions_async.
+
+    Args:
+        transaction_type (str): The type of transaction (convert, deposit,
+            withdraw or fiat).
+        start (str, optional): The start date of the first sync (dd-mm-YYYY).
+            Defaults to DEFAULT_START.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The transactions appended to the ledger.
+    """
+    return asyncio.run(
+        sync_transactions_async(transaction_type, start, state, ledger_path)
+    )
+
+
+def discover_trade_symbols(ledger_path: Optional[Path] = None) -> List[str]:
+    """
+    Get the listed symbols that may hold trades of the account.
+
+    Assets come from the current balances and from every asset seen in the
+    ledger, so assets already sold out are still synced.
+
+    Args:
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        List[str]: The symbols pairing those assets with a quote asset.
+    """
+    assets = set(get_account_info().index)
+    ledger = read_ledger(
+        columns=["from_asset", "to_asset", "fee_asset", "pair"], path=ledger_path
+    )
+    for column in ("from_asset", "to_asset", "fee_asset"):
+        assets.update(ledger[column].dropna().astype(str))
+    assets.update(filter(None, map(base_asset, ledger["pair"].dropna().unique())))
+    return candidate_symbols(assets)
+
+
+async def _fetch_symbol_trades(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    symbol: str,
+    from_id: int,
+) -> Tuple[List[pd.DataFrame], Optional[int]]:
+    """
+    Fetch every trade of a symbol from a trade id, one full page at a time.
+
+    Each page is decoded as soon as it arrives, so only its ledger columns are
+    kept while the next pages are fetched.
+
+    Args:
+        session (aiohttp.ClientSession): The session used to send the requests.
+        semaphore (asyncio.Semaphore): Bounds the number of requests in flight.
+        symbol (str): The symbol.
+        from_id (int): The first trade id to fetch.
+
+    Returns:
+        Tuple[List[pd.DataFrame], Optional[int]]: The decoded pages, in id
+        order, and the id of the last trade, or None if there is none.
+    """
+    endpoint = get_endpoint("trade")
+    frames = []
+    last_id = None
+    while True:
+        params = set_payload(
+            endpoint, symbol=symbol, fromId=from_id, limit=TRADES_LIMIT
+        )
+        async with semaphore:
+            response = await send_signed_request_async(session, "GET", endpoint, params)
+        if "code" in response:
+            raise ValueError(f"Error fetching {endpoint} {symbol}: {response}")
+        if response:
+            with stage("normalize"):
+                frames.append(decode_page(response, "trade"))
+            last_id = response[-1]["id"]
+        if len(response) < TRADES_LIMIT:
+            break
+        from_id = last_id + 1
+    return frames, last_id
+
+
+async def _fetch_trades(
+    symbols: List[str],
+    from_ids: List[int],
+    session: Optional[aiohttp.ClientSession] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> List[Union[Tuple[List[pd.DataFrame], Optional[int]], BaseException]]:
+    if session is None:
+        async with create_session() as session:
+            return await _fetch_trades(symbols, from_ids, session, semaphore)
+    semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENCY)
+    return await asyncio.gather(
+        *(
+            _fetch_symbol_trades(session, semaphore, symbol, from_id)
+            for symbol, from_id in zip(symbols, from_ids)
+        ),
+        return_exceptions=True,
+    )
+
+
+async def sync_trades_async(
+    symbols: Optional[Iterable[str]] = None,
+    state: Optional[SyncState] = None,
+    ledger_path: Optional[Path] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> pd.DataFrame:
+    """
+    Fetch the trades of each symbol newer than its sync cursor.
+
+    Symbols are fetched in parallel, each one paginated by trade id until its
+    history is exhausted. The trades of the symbols fetched in full are stored
+    even if another symbol fails, and the cursors of the failed symbols are
+    left unchanged so the next sync retries them.
+
+    Args:
+        symbols (Iterable[str], optional): The symbols to sync. Defaults to the
+            symbols found by discover_trade_symbols.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+        session (aiohttp.ClientSession, optional): A session to reuse.
+        semaphore (asyncio.Semaphore, optional): Bounds the number of requests
+            in flight, shared with the other stages of a sync.
+
+    Returns:
+        pd.DataFrame: The trades appended to the ledger.
+
+    Raises:
+        Exception: The error of the first symbol that failed, once the others
+            are stored.
+    """
+    state = state or SyncState()
+    if symbols is None:
+        symbols = await asyncio.to_thread(discover_trade_symbols, ledger_path)
+    symbols = list(symbols)
+    from_ids = []
+    for symbol in symbols:
+        cursor = state.get("trade", symbol)
+        from_ids.append(cursor["id"] + 1 if cursor is not None else 0)
+    with stage("fetch"):
+        results = await _fetch_trades(symbols, from_ids, session, semaphore)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    trades_by_symbol = {
+        symbol: result
+        for symbol, result in zip(symbols, results)
+        if not isinstance(result, BaseException)
+    }
+    accumulator = LedgerAccumulator("trade", keys=TRADE_KEYS)
+    with stage("concat"):
+        for pages, _ in trades_by_symbol.values():
+            for frame in pages:
+                accumulator.add(frame)
+        df = accumulator.assemble()
+    with stage("store"):
+        df = await asyncio.to_thread(
+            append_ledger, df, "trade", keys=TRADE_KEYS, path=ledger_path
+        )
+    for symbol, (_, last_id) in trades_by_symbol.items():
+        if last_id is not None:
+            state.update("trade", symbol, id=last_id)
+    if errors:
+        raise errors[0]
+    return df
+
+
+def sync_trades(
+    symbols: Optional[Iterable[str]] = None,
+    state: Optional[SyncState] = None,
+    ledger_path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Fetch the trades of each symbol newer than its sync cursor.
+
+    See sync_trades_async.
+
+    Args:
+        symbols (Iterable[str], optional): The symbols to sync. Defaults to the
+            symbols found by discover_trade_symbols.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+
+    Returns:
+        pd.DataFrame: The trades appended to the ledger.
+    """
+    return asyncio.run(sync_trades_async(symbols, state, ledger_path))
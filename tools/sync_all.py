@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+import pandas as pd
+
+from tools.async_request import MAX_CONCURRENCY, create_session
+from tools.metrics import get_metrics
+from tools.sync import (
+    DEFAULT_START,
+    discover_trade_symbols,
+    sync_trades_async,
+    sync_transactions_async,
+)
+from tools.sync_state import SyncState
+
+STAGES = ("trade", "convert", "deposit", "withdraw", "fiat")
+# Assets first seen in these stages may hold trades on symbols not yet synced
+DISCOVERY_STAGES = ("convert", "deposit", "withdraw", "fiat")
+PROGRESS_INTERVAL = 1.0
+
+
+class StageGate:
+    """
+    Shared request semaphore seen through one stage, counting its requests.
+
+    Args:
+        name (str): The stage name.
+        semaphore (asyncio.Semaphore): The semaphore shared by every stage.
+        on_request (callable): Called after each request of the stage.
+    """
+
+    def __init__(self, name: str, semaphore: asyncio.Semaphore, on_request) -> None:
+        self.name = name
+        self.semaphore = semaphore
+        self.on_request = on_request
+
+    async def __aenter__(self) -> None:
+        await self.semaphore.acquire()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.semaphore.release()
+        self.on_request(self.name)
+
+
+class SyncOrchestrator:
+    """
+    Sync every transaction type into one ledger as a single task graph.
+
+    Every stage runs concurrently on one session, and their requests share one
+    semaphore and the process-wide rate limiter, so a full refresh is bounded
+    by the API weight limits rather than by the latency of each stage. The
+    trade stage starts right away with the symbols known from the balances
+    and the ledger, then syncs the symbols of any asset the other stages
+    brought in once they are done.
+
+    Args:
+        stages (Iterable[str], optional): The stages to run. Defaults to STAGES.
+        start (str, optional): The start date of the first sync (dd-mm-YYYY).
+            Defaults to DEFAULT_START.
+        symbols (Iterable[str], optional): The trade symbols to sync. Defaults
+            to the symbols found by discover_trade_symbols.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+        max_concurrency (int, optional): The maximum requests in flight across
+            every stage. Defaults to MAX_CONCURRENCY.
+        verbose (bool, optional): Whether to print the progress of each stage.
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[str] = STAGES,
+        start: str = DEFAULT_START,
+        symbols: Optional[Iterable[str]] = None,
+        state: Optional[SyncState] = None,
+        ledger_path: Optional[Path] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        verbose: bool = True,
+    ) -> None:
+        self.stages = list(stages)
+        for stage in self.stages:
+            if stage not in STAGES:
+                raise ValueError(f"Invalid stage: {stage}")
+        self.start = start
+        self.symbols = list(symbols) if symbols is not None else None
+        self.state = state or SyncState()
+        self.ledger_path = ledger_path
+        self.max_concurrency = max_concurrency
+        self.verbose = verbose
+        self.stats: Dict[str, Dict[str, Any]] = {
+            stage: {"status": "pending", "requests": 0, "rows": 0, "wall_time": None}
+            for stage in self.stages
+        }
+        self._started = 0.0
+        self._printed = 0.0
+        self._done: Dict[str, asyncio.Event] = {}
+
+    def _on_request(self, stage: str) -> None:
+        self.stats[stage]["requests"] += 1
+        if time.perf_counter() - self._printed >= PROGRESS_INTERVAL:
+            self._print_progress()
+
+    def _print_progress(self) -> None:
+        if not self.verbose:
+            return
+        self._printed = time.perf_counter()
+        elapsed = self._printed - self._started
+        progress = ", ".join(
+            f"{stage} {stats['status']} {stats['requests']} req"
+            for stage, stats in self.stats.items()
+        )
+        print(f"[{elapsed:7.1f}s] {progress}")
+
+    async def _sync_trades(
+        self, session: aiohttp.ClientSession, gate: StageGate
+    ) -> List[pd.DataFrame]:
+        symbols = self.symbols
+        if symbols is None:
+            symbols = await asyncio.to_thread(discover_trade_symbols, self.ledger_path)
+        frames = [
+            await sync_trades_async(
+                symbols, self.state, self.ledger_path, session, gate
+            )
+        ]
+        if self.symbols is not None:
+            return frames
+        await asyncio.gather(*(self._done[stage].wait() for stage in DISCOVERY_STAGES))
+        discovered = await asyncio.to_thread(discover_trade_symbols, self.ledger_path)
+        new_symbols = sorted(set(discovered) - set(symbols))
+        if new_symbols:
+            frames.append(
+                await sync_trades_async(
+                    new_symbols, self.state, self.ledger_path, session, gate
+                )
+            )
+        return frames
+
+    async def _run_stage(
+        self,
+        stage: str,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        stats = self.stats[stage]
+        gate = StageGate(stage, semaphore, self._on_request)
+        started = time.perf_counter()
+        stats["status"] = "running"
+        try:
+            if stage == "trade":
+                frames = await self._sync_trades(session, gate)
+            else:
+                frames = [
+                    await sync_transactions_async(
+                        stage, self.start, self.state, self.ledger_path, session, gate
+                    )
+                ]
+            stats["rows"] = sum(len(df) for df in frames)
+            stats["status"] = "done"
+        except Exception as e:
+            # A failed stage keeps its cursor, so the next run resumes it
+            stats["status"] = "failed"
+            stats["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            stats["wall_time"] = round(time.perf_counter() - started, 3)
+            self._done[stage].set()
+            self._print_progress()
+
+    async def run_async(self) -> Dict[str, Any]:
+        """
+        Run every stage concurrently until all of them are done.
+
+        Returns:
+            Dict[str, Any]: The run report, with the wall time, requests and
+            rows appended of each stage.
+        """
+        self._started = time.perf_counter()
+        # Stages that are not run count as done for the trade rediscovery
+        self._done = {stage: asyncio.Event() for stage in STAGES}
+        for stage in STAGES:
+            if stage not in self.stages:
+                self._done[stage].set()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with create_session(self.max_concurrency) as session:
+            await asyncio.gather(
+                *(self._run_stage(stage, session, semaphore) for stage in self.stages)
+            )
+        return {
+            "wall_time": round(time.perf_counter() - self._started, 3),
+            "requests": sum(stats["requests"] for stats in self.stats.values()),
+            "rows": sum(stats["rows"] for stats in self.stats.values()),
+            "stages": self.stats,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every stage concurrently until all of them are done.
+
+        Returns:
+            Dict[str, Any]: The run report, see run_async.
+        """
+        return asyncio.run(self.run_async())
+
+
+def sync_all(**kwargs: Any) -> Dict[str, Any]:
+    """
+    Refresh the whole account into the ledger.
+
+    Args:
+        **kwargs (Any): The options of SyncOrchestrator.
+
+    Returns:
+        Dict[str, Any]: The run report.
+    """
+    return SyncOrchestrator(**kwargs).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync every transaction type of the account into the ledger."
+    )
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--start", default=DEFAULT_START, help="dd-mm-YYYY")
+    parser.add_argument("--symbols", nargs="+", help="The trade symbols to sync.")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON.")
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        help="Write the request metrics, as JSON for a .json file, else in the "
+        "Prometheus text format.",
+    )
+    args = parser.parse_args()
+
+    if args.metrics:
+        get_metrics().enabled = True
+
+    report = sync_all(
+        stages=args.stages,
+        start=args.start,
+        symbols=args.symbols,
+        max_concurrency=args.concurrency,
+        verbose=not args.quiet,
+    )
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:<10} {stats['status']:<7} {stats['wall_time']:>8.2f}s "
+            f"{stats['requests']:>6} requests {stats['rows']:>8} rows"
+        )
+        if "error" in stats:
+            print(f"Error: {stats['error']}")
+    print(
+        f"{'total':<18} {report['wall_time']:>8.2f}s {report['requests']:>6} requests"
+    )
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+    if args.metrics:
+        get_metrics().export(args.metrics)
+    failed = any(stats["status"] == "failed" for stats in report["stages"].values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from tools.paths import DATA_DIR
+
+
+class SyncState:
+    """
+    Persisted sync cursors, one per transaction type and symbol.
+
+    A cursor records how far a (transaction type, symbol) pair has been synced,
+    as the end of the last synced time range ("time", in milliseconds) and/or
+    the last trade id seen ("id"). The state is rewritten atomically on every
+    update so a crash never leaves a half-written file behind.
+
+    Args:
+        path (Path, optional): The JSON state file.
+            Defaults to DATA_DIR / "sync_state.json".
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path or DATA_DIR / "sync_state.json")
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path, "r") as state_file:
+                self._cursors = json.load(state_file)
+
+    @staticmethod
+    def _key(transaction_type: str, symbol: Optional[str]) -> str:
+        return f"{transaction_type}:{symbol or '*'}"
+
+    def get(
+        self, transaction_type: str, symbol: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the cursor of a transaction type and symbol.
+
+        Args:
+            transaction_type (str): The type of transaction.
+            symbol (str, optional): The symbol, for per-symbol transaction types.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cursor, or None if never synced.
+        """
+        return self._cursors.get(self._key(transaction_type, symbol))
+
+    def update(
+        self, transaction_type: str, symbol: Optional[str] = None, **cursor: Any
+    ) -> None:
+        """
+        Update the cursor of a transaction type and symbol and persist it.
+
+        Args:
+            transaction_type (str): The type of transaction.
+            symbol (str, optional): The symbol, for per-symbol transaction types.
+            **cursor (Any): The cursor fields to set, e.g. time or id.
+        """
+        with self._lock:
+            key = self._key(transaction_type, symbol)
+            self._cursors[key] = {**self._cursors.get(key, {}), **cursor}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w") as state_file:
+                json.dump(self._cursors, state_file, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,405 @@
+import math
+import random
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+DAY_MS = 86_400_000
+QUOTE_ASSET = "USDT"
+FIAT_CURRENCY = "EUR"
+INTERVAL_UNITS_MS = {
+    "s": 1_000,
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": DAY_MS,
+    "w": 7 * DAY_MS,
+}
+BASE_PRICES = {"BTC": 60_000.0, "ETH": 3_000.0, "BNB": 500.0, "EUR": 1.08}
+
+
+def _amount(value: float) -> str:
+    return f"{value:.8f}"
+
+
+def interval_ms(interval: str) -> int:
+    """
+    Get the length of a kline interval in milliseconds.
+
+    Args:
+        interval (str): The interval, e.g. 1s, 15m, 4h or 1d.
+
+    Returns:
+        int: The length of the interval in milliseconds.
+    """
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+
+def _price_curve(symbol: str) -> tuple[float, float]:
+    base_asset = symbol.removesuffix(QUOTE_ASSET)
+    base = BASE_PRICES.get(base_asset, 1 + zlib.crc32(base_asset.encode()) % 100)
+    phase = zlib.crc32(symbol.encode()) % 1000 / 1000
+    return base, phase
+
+
+def price_at(symbol: str, timestamp: int) -> float:
+    """
+    Get the deterministic synthetic price of a symbol at a given time.
+
+    Prices oscillate daily around a base price derived from the symbol, so the
+    same (symbol, time) always gives the same price.
+
+    Args:
+        symbol (str): The symbol, e.g. BTCUSDT.
+        timestamp (int): The time in milliseconds.
+
+    Returns:
+        float: The price.
+    """
+    base, phase = _price_curve(symbol)
+    return base * (1 + 0.05 * math.sin(2 * math.pi * (timestamp / DAY_MS + phase)))
+
+
+def prices_at(symbol: str, timestamps: np.ndarray) -> np.ndarray:
+    """
+    Get the synthetic prices of a symbol at many times at once.
+
+    See price_at.
+
+    Args:
+        symbol (str): The symbol, e.g. BTCUSDT.
+        timestamps (np.ndarray): The times in milliseconds.
+
+    Returns:
+        np.ndarray: The prices.
+    """
+    base, phase = _price_curve(symbol)
+    days = np.asarray(timestamps, dtype=np.float64) / DAY_MS
+    return base * (1 + 0.05 * np.sin(2 * np.pi * (days + phase)))
+
+
+def generate_klines(
+    symbol: str, interval_ms: int, start: int, end: int, limit: int
+) -> List[List[Any]]:
+    """
+    Generate the klines of a symbol, as returned by /api/v3/klines.
+
+    Args:
+        symbol (str): The symbol.
+        interval_ms (int): The kline interval in milliseconds.
+        start (int): The start time in milliseconds.
+        end (int): The end time in milliseconds (inclusive).
+        limit (int): The maximum number of klines.
+
+    Returns:
+        List[List[Any]]: The klines.
+    """
+    first = -(-start // interval_ms) * interval_ms
+    klines = []
+    for open_time in range(first, end + 1, interval_ms):
+        if len(klines) >= limit:
+            break
+        price = price_at(symbol, open_time)
+        klines.append(
+            [
+                open_time,
+                _amount(price),
+                _amount(price * 1.001),
+                _amount(price * 0.999),
+                _amount(price),
+                "1.00000000",
+                open_time + interval_ms - 1,
+                _amount(price),
+                1,
+                "0.50000000",
+                _amount(price / 2),
+                "0",
+            ]
+        )
+    return klines
+
+
+def _times(rng: random.Random, n: int, start: int, end: int) -> List[int]:
+    return sorted(rng.randrange(start, end) for _ in range(n))
+
+
+def generate_trades(
+    rng: random.Random, n: int, symbol: str, start: int, end: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate the trades of a symbol, as returned by /api/v3/myTrades.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n (int): The number of trades.
+        symbol (str): The symbol.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        List[Dict[str, Any]]: The trades, in id order.
+    """
+    trades = []
+    trade_id = rng.randrange(1_000_000, 10_000_000)
+    for time in _times(rng, n, start, end):
+        trade_id += rng.randrange(1, 50)
+        price = price_at(symbol, time)
+        qty = rng.uniform(0.01, 10) * 100 / price
+        trades.append(
+            {
+                "symbol": symbol,
+                "id": trade_id,
+                "orderId": trade_id * 10,
+                "orderListId": -1,
+                "price": _amount(price),
+                "qty": _amount(qty),
+                "quoteQty": _amount(qty * price),
+                "commission": _amount(qty * 0.001),
+                "commissionAsset": symbol.removesuffix(QUOTE_ASSET),
+                "time": time,
+                "isBuyer": rng.random() < 0.5,
+                "isMaker": rng.random() < 0.5,
+                "isBestMatch": True,
+            }
+        )
+    return trades
+
+
+def generate_converts(
+    rng: random.Random, n: int, assets: List[str], start: int, end: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate convert trades, as listed by /sapi/v1/convert/tradeFlow.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n (int): The number of converts.
+        assets (List[str]): The crypto assets to convert between.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        List[Dict[str, Any]]: The converts, in time order.
+    """
+    converts = []
+    for i, time in enumerate(_times(rng, n, start, end)):
+        from_asset, to_asset = rng.sample(assets + [QUOTE_ASSET], 2)
+        from_price = price_at(from_asset + QUOTE_ASSET, time)
+        to_price = price_at(to_asset + QUOTE_ASSET, time)
+        from_price = 1.0 if from_asset == QUOTE_ASSET else from_price
+        to_price = 1.0 if to_asset == QUOTE_ASSET else to_price
+        from_amount = rng.uniform(10, 1000) / from_price
+        to_amount = from_amount * from_price / to_price
+        converts.append(
+            {
+                "quoteId": f"{rng.getrandbits(64):x}",
+                "orderId": 900_000_000_000 + i,
+                "orderStatus": "SUCCESS",
+                "fromAsset": from_asset,
+                "fromAmount": _amount(from_amount),
+                "toAsset": to_asset,
+                "toAmount": _amount(to_amount),
+                "ratio": _amount(to_amount / from_amount),
+                "inverseRatio": _amount(from_amount / to_amount),
+                "createTime": time,
+            }
+        )
+    return converts
+
+
+def generate_deposits(
+    rng: random.Random, n: int, assets: List[str], start: int, end: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate deposits, as listed by /sapi/v1/capital/deposit/hisrec.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n (int): The number of deposits.
+        assets (List[str]): The deposited assets.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        List[Dict[str, Any]]: The deposits, in time order.
+    """
+    return [
+        {
+            "id": str(700_000_000 + i),
+            "amount": _amount(rng.uniform(0.1, 100)),
+            "coin": rng.choice(assets),
+            "network": "ETH",
+            "status": 1,
+            "address": f"0x{rng.getrandbits(160):040x}",
+            "addressTag": "",
+            "txId": f"0x{rng.getrandbits(256):064x}",
+            "insertTime": time,
+            "transferType": 0,
+            "confirmTimes": "12/12",
+            "unlockConfirm": 0,
+            "walletType": 0,
+            "sourceAddress": f"0x{rng.getrandbits(160):040x}",
+        }
+        for i, time in enumerate(_times(rng, n, start, end))
+    ]
+
+
+def generate_withdrawals(
+    rng: random.Random, n: int, assets: List[str], start: int, end: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate withdrawals, as listed by /sapi/v1/capital/withdraw/history.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n (int): The number of withdrawals.
+        assets (List[str]): The withdrawn assets.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        List[Dict[str, Any]]: The withdrawals, in time order.
+    """
+    withdrawals = []
+    for time in _times(rng, n, start, end):
+        complete_time = datetime.fromtimestamp((time + 60_000) / 1000, timezone.utc)
+        withdrawals.append(
+            {
+                "id": f"{rng.getrandbits(128):032x}",
+                "amount": _amount(rng.uniform(0.1, 100)),
+                "transactionFee": _amount(rng.uniform(0.0001, 0.01)),
+                "coin": rng.choice(assets),
+                "status": 6,
+                "address": f"0x{rng.getrandbits(160):040x}",
+                "txId": f"0x{rng.getrandbits(256):064x}",
+                "applyTime": datetime.fromtimestamp(time / 1000, timezone.utc).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                ),
+                "network": "ETH",
+                "transferType": 0,
+                "info": "",
+                "confirmNo": 12,
+                "walletType": 0,
+                "txKey": "",
+                "completeTime": complete_time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+    return withdrawals
+
+
+def generate_fiat_payments(
+    rng: random.Random, n: int, assets: List[str], start: int, end: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate fiat payments, as listed by /sapi/v1/fiat/payments.
+
+    About one in ten payments failed.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n (int): The number of payments.
+        assets (List[str]): The crypto assets bought or sold.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        List[Dict[str, Any]]: The payments, in time order.
+    """
+    payments = []
+    for i, time in enumerate(_times(rng, n, start, end)):
+        crypto = rng.choice(assets + [QUOTE_ASSET])
+        usd_price = 1.0 if crypto == QUOTE_ASSET else price_at(crypto + "USDT", time)
+        price = usd_price / price_at(FIAT_CURRENCY + QUOTE_ASSET, time)
+        source_amount = rng.uniform(20, 2000)
+        payments.append(
+            {
+                "orderNo": f"{rng.getrandbits(96):024x}",
+                "sourceAmount": _amount(source_amount),
+                "fiatCurrency": FIAT_CURRENCY,
+                "obtainAmount": _amount(source_amount / price),
+                "cryptoCurrency": crypto,
+                "totalFee": _amount(source_amount * 0.02),
+                "price": _amount(price),
+                "status": "Failed" if rng.random() < 0.1 else "Completed",
+                "paymentMethod": "Credit Card",
+                "createTime": time,
+                "updateTime": time + 1_000,
+            }
+        )
+    return payments
+
+
+def _usd_prices(
+    coins: np.ndarray, index: np.ndarray, timestamps: np.ndarray
+) -> np.ndarray:
+    prices = np.ones(len(index))
+    for i, coin in enumerate(coins):
+        if coin != QUOTE_ASSET:
+            rows = index == i
+            prices[rows] = prices_at(coin + QUOTE_ASSET, timestamps[rows])
+    return prices
+
+
+def generate_ledger(
+    seed: int, n: int, transaction_type: str, assets: List[str], start: int, end: int
+) -> pd.DataFrame:
+    """
+    Generate normalized convert or fiat transactions in bulk, as stored in
+    the ledger.
+
+    Unlike the payload generators, rows are drawn column by column with NumPy,
+    so that millions of them can be generated in seconds.
+
+    Args:
+        seed (int): The seed of the random generator.
+        n (int): The number of transactions.
+        transaction_type (str): "convert" or "fiat".
+        assets (List[str]): The crypto assets traded.
+        start (int): The start of the history in milliseconds.
+        end (int): The end of the history in milliseconds.
+
+    Returns:
+        pd.DataFrame: The transactions, in time order, with dt in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    dt = np.sort(rng.integers(start, end, n))
+    coins = np.array(assets + [QUOTE_ASSET], dtype=object)
+    if transaction_type == "convert":
+        # Two distinct assets per convert
+        from_index = rng.integers(0, len(coins), n)
+        to_index = (from_index + rng.integers(1, len(coins), n)) % len(coins)
+        from_price = _usd_prices(coins, from_index, dt)
+        from_amount = rng.uniform(10, 1000, n) / from_price
+        to_amount = from_amount * from_price / _usd_prices(coins, to_index, dt)
+        return pd.DataFrame(
+            {
+                "id": (900_000_000_000 + np.arange(n)).astype(str),
+                "dt": dt,
+                "from_amount": from_amount.round(8),
+                "from_asset": coins[from_index],
+                "to_amount": to_amount.round(8),
+                "to_asset": coins[to_index],
+            }
+        )
+    if transaction_type == "fiat":
+        crypto = rng.integers(0, len(coins), n)
+        usd_price = _usd_prices(coins, crypto, dt)
+        price = usd_price / prices_at(FIAT_CURRENCY + QUOTE_ASSET, dt)
+        source_amount = rng.uniform(20, 2000, n)
+        return pd.DataFrame(
+            {
+                "id": np.arange(n).astype(str),
+                "dt": dt,
+                "status": "Completed",
+                "to_amount": (source_amount / price).round(8),
+                "to_asset": coins[crypto],
+                "from_asset": FIAT_CURRENCY,
+                "from_amount": source_amount.round(8),
+                "price": price.round(8),
+                "fee_cost": (source_amount * 0.02).round(8),
+                "side": np.where(rng.random(n) < 0.5, "BUY", "SELL"),
+            }
+        )
+    raise ValueError(f"Unsupported transaction type: {transaction_type}")
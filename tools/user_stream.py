@@ -0,0 +1,229 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+import ujson
+import websockets
+
+from tools.async_request import _send_async, create_session
+from tools.decode import decode_page
+from tools.ledger_store import TRADE_KEYS, append_ledger
+from tools.send_request import BASE_URL
+from tools.sync import sync_trades
+from tools.sync_state import SyncState
+
+STREAM_URL = os.environ.get("BINANCE_STREAM_URL", "wss://stream.binance.com:9443")
+LISTEN_KEY_ENDPOINT = "/api/v3/userDataStream"
+# A listenKey expires after 60 minutes without a keepalive
+KEEPALIVE_INTERVAL = 30 * 60
+FLUSH_INTERVAL = 0.5
+MAX_BACKOFF = 60.0
+
+
+def normalize_execution(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an executionReport fill to the shape of a /api/v3/myTrades trade.
+
+    Args:
+        event (Dict[str, Any]): The executionReport event.
+
+    Returns:
+        Dict[str, Any]: The trade, ready for decode_page.
+    """
+    return {
+        "id": event["t"],
+        "orderId": event["i"],
+        "time": event["T"],
+        "symbol": event["s"],
+        "qty": event["l"],
+        "quoteQty": event["Y"],
+        "commission": event["n"],
+        "commissionAsset": event["N"],
+        "isBuyer": event["S"] == "BUY",
+    }
+
+
+def normalize_balance(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a balanceUpdate event to the shape of the balance configuration.
+
+    Args:
+        event (Dict[str, Any]): The balanceUpdate event.
+
+    Returns:
+        Dict[str, Any]: The balance update, ready for decode_page.
+    """
+    return {
+        "updateId": f"{event['E']}-{event['a']}",
+        "clearTime": event["T"],
+        "delta": event["d"],
+        "asset": event["a"],
+    }
+
+
+class UserStream:
+    """
+    Long-running listener appending account events to the ledger in real time.
+
+    The user-data stream is opened with a listenKey, kept alive in the
+    background, and reopened with exponential backoff when the connection
+    drops. Every (re)connection first catches up on the trades missed since
+    the sync cursors through REST, while the stream buffers new events. Fills
+    (executionReport events of type TRADE) and balanceUpdate events are
+    normalized with the transaction configurations, then appended in batches
+    every flush_interval. Balance updates are kept under their own "balance"
+    transaction type, as deposits and withdrawals are still synced from REST.
+
+    Args:
+        symbols (Iterable[str], optional): The symbols to catch up on. Defaults
+            to the symbols found by discover_trade_symbols.
+        state (SyncState, optional): The sync state. Defaults to the shared one.
+        ledger_path (Path, optional): The ledger directory. Defaults to LEDGER_DIR.
+        catch_up (bool, optional): Whether to catch up through REST on each
+            connection. Defaults to True.
+        flush_interval (float, optional): The seconds between two appends to
+            the ledger. Defaults to FLUSH_INTERVAL.
+    """
+
+    def __init__(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        state: Optional[SyncState] = None,
+        ledger_path: Optional[Path] = None,
+        catch_up: bool = True,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.symbols = list(symbols) if symbols is not None else None
+        self.state = state or SyncState()
+        self.ledger_path = ledger_path
+        self.catch_up = catch_up
+        self.flush_interval = flush_interval
+        self.events = 0
+        self.fills = 0
+        self.connections = 0
+        self._trades: List[Dict[str, Any]] = []
+        self._balances: List[Dict[str, Any]] = []
+
+    async def _listen_key(
+        self,
+        session: aiohttp.ClientSession,
+        http_method: str,
+        listen_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        query = f"?{urlencode({'listenKey': listen_key})}" if listen_key else ""
+        url = BASE_URL + LISTEN_KEY_ENDPOINT + query
+        return await _send_async(session, http_method, LISTEN_KEY_ENDPOINT, lambda: url)
+
+    async def _keepalive(self, session: aiohttp.ClientSession, listen_key: str):
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            await self._listen_key(session, "PUT", listen_key)
+
+    def handle(self, message: str) -> None:
+        """
+        Buffer the ledger rows of a stream message.
+
+        Args:
+            message (str): The raw stream message.
+        """
+        event = ujson.loads(message)
+        self.events += 1
+        if event.get("e") == "executionReport" and event.get("x") == "TRADE":
+            self._trades.append(normalize_execution(event))
+        elif event.get("e") == "balanceUpdate":
+            self._balances.append(normalize_balance(event))
+
+    def flush(self) -> None:
+        """
+        Append the buffered rows to the ledger and advance the trade cursors.
+        """
+        trades, self._trades = self._trades, []
+        balances, self._balances = self._balances, []
+        if trades:
+            df = decode_page(trades, "trade")
+            self.fills += len(
+                append_ledger(df, "trade", keys=TRADE_KEYS, path=self.ledger_path)
+            )
+            last_ids: Dict[str, int] = {}
+            for trade in trades:
+                last_ids[trade["symbol"]] = max(
+                    trade["id"], last_ids.get(trade["symbol"], -1)
+                )
+            for symbol, last_id in last_ids.items():
+                cursor = self.state.get("trade", symbol) or {}
+                if last_id > cursor.get("id", -1):
+                    self.state.update("trade", symbol, id=last_id)
+        if balances:
+            df = decode_page(balances, "balance")
+            append_ledger(df, "balance", keys=["id"], path=self.ledger_path)
+
+    def _catch_up(self) -> None:
+        sync_trades(self.symbols, state=self.state, ledger_path=self.ledger_path)
+
+    async def _listen(
+        self, session: aiohttp.ClientSession, stop: asyncio.Event
+    ) -> None:
+        response = await self._listen_key(session, "POST")
+        if "listenKey" not in response:
+            raise ValueError(f"Error creating listen key: {response}")
+        listen_key = response["listenKey"]
+        async with websockets.connect(f"{STREAM_URL}/ws/{listen_key}") as socket:
+            self.connections += 1
+            keepalive = asyncio.create_task(self._keepalive(session, listen_key))
+            try:
+                if self.catch_up:
+                    await asyncio.to_thread(self._catch_up)
+                flushed = time.monotonic()
+                while not stop.is_set():
+                    try:
+                        message = await asyncio.wait_for(
+                            socket.recv(), timeout=self.flush_interval
+                        )
+                        self.handle(message)
+                    except asyncio.TimeoutError:
+                        pass
+                    if time.monotonic() - flushed >= self.flush_interval:
+                        await asyncio.to_thread(self.flush)
+                        flushed = time.monotonic()
+            finally:
+                keepalive.cancel()
+                await asyncio.to_thread(self.flush)
+        await self._listen_key(session, "DELETE", listen_key)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Listen until stop is set, reconnecting whenever the stream drops.
+
+        Args:
+            stop (asyncio.Event, optional): Stops the listener once set.
+                Defaults to listening forever.
+        """
+        stop = stop or asyncio.Event()
+        backoff = 1.0
+        async with create_session() as session:
+            while not stop.is_set():
+                connections = self.connections
+                try:
+                    await self._listen(session, stop)
+                except (websockets.ConnectionClosed, OSError, aiohttp.ClientError) as e:
+                    print(f"User stream disconnected: {e}")
+                    # Back off only while reconnecting keeps failing
+                    backoff = 1.0 if self.connections > connections else backoff
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+def main():
+    stream = UserStream()
+    try:
+        asyncio.run(stream.run())
+    except KeyboardInterrupt:
+        print(f"{stream.fills} new fills from {stream.events} events")
+
+
+if __name__ == "__main__":
+    main()